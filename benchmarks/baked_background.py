@@ -0,0 +1,121 @@
+"""Benchmark of the baked (pre-rendered, looping) background against the live shader.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.baked_background [--frames N] [--seconds S] [--fps F]
+
+Runs in a fresh (headless if needed) process with an empty cache directory:
+- bake: time to shade the clip (cold), then to read it back from the disk cache (warm),
+  and the size of the compressed frames against the raw block images
+- loop: the step from the last frame back to the first one must not be bigger than the
+  biggest step between two consecutive frames of the clip (no visible jump)
+- playback: time of a BakedBackground frame (after glFinish) against the GPU shader frame,
+  the playback must be the faster one
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+
+def _child(frames: int, seconds: float, fps: float, cache_dir: str):
+    """Bake, reload and play the background back, print the measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import numpy as np
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import BackgroundBake, BakedBackground, GPUBackground
+
+    size = (640, 360)
+    uniforms = {"colour_1": (0.54, 0.17, 0.89, 1.0), "colour_2": (0.0, 0.5, 0.0, 1.0), "colour_3": (0.94, 0.97, 1.0, 1.0)}
+    pygame.init()
+    pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+
+    start = time.perf_counter()
+    bake = BackgroundBake.load_or_bake(*size, uniforms, seconds=seconds, fps=fps, cache_dir=cache_dir)
+    cold_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    reloaded = BackgroundBake.load_or_bake(*size, uniforms, seconds=seconds, fps=fps, cache_dir=cache_dir)
+    warm_ms = (time.perf_counter() - start) * 1000.0
+
+    images = [bake.frame(index).astype(np.float32) / 255.0 for index in range(len(bake.frames))]
+    steps = [float(np.abs(images[index + 1] - images[index]).mean()) for index in range(len(images) - 1)]
+    loop_step = float(np.abs(images[0] - images[-1]).mean())
+
+    def frame_times(bg) -> list:
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            bg.render()
+            glFinish()
+            pygame.display.flip()
+            times.append((time.perf_counter() - start) * 1000.0)
+        return times
+
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    gpu = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+        uniforms,
+    )
+    print(json.dumps({
+        "frames": len(bake.frames),
+        "blocks": list(bake.blocks),
+        "cold_ms": cold_ms,
+        "warm_ms": warm_ms,
+        "same_after_reload": reloaded.frames == bake.frames,
+        "compressed_bytes": bake.nbytes,
+        "raw_bytes": len(bake.frames) * bake.blocks[0] * bake.blocks[1] * 3,
+        "max_step": max(steps) if steps else 0.0,
+        "loop_step": loop_step,
+        "baked_ms": statistics.median(frame_times(BakedBackground(*size, bake))),
+        "gpu_ms": statistics.median(frame_times(gpu)),
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="frames timed per background")
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of the baked clip")
+    parser.add_argument("--fps", type=float, default=24.0, help="frame rate of the baked clip")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames, args.seconds, args.fps, args.child)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-baked-bg-") as cache_dir:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.baked_background", "--child", cache_dir,
+             "--frames", str(args.frames), "--seconds", str(args.seconds), "--fps", str(args.fps)],
+            cwd=REPO_ROOT, env=_headless_env(cache_dir), capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print(
+        f"{result['frames']} frames of {result['blocks'][1]}x{result['blocks'][0]} blocks: "
+        f"bake {result['cold_ms']:.0f} ms, cache reload {result['warm_ms']:.0f} ms, "
+        f"{result['compressed_bytes'] / 1e6:.1f} MB compressed ({result['raw_bytes'] / 1e6:.1f} MB raw)"
+    )
+    print(f"loop step {result['loop_step'] * 100:.2f}% (biggest frame step {result['max_step'] * 100:.2f}%)")
+    print(f"frame: baked {result['baked_ms']:.1f} ms, shader {result['gpu_ms']:.1f} ms")
+
+    ok = (
+        result["same_after_reload"]
+        and result["loop_step"] <= result["max_step"]
+        and result["baked_ms"] < result["gpu_ms"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark of the NumPy fallback of the background shader, against the shader itself.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.cpu_background [--frames N] [--size WxH]
+
+Runs in a fresh (headless if needed) process:
+- accuracy: the shader and CPUBackground render the same instant with the same pixelation,
+  the mean difference of the read back pixels must stay under 3% (block edges differ by a
+  pixel at most since the CPU blocks are stretched to whole numbers)
+- speed: time of a CPUBackground frame (NumPy shading, upload and draw, after glFinish),
+  it must stay under 33 ms (30 FPS); the GPU shader frame is printed for comparison
+- selection: the shared background of the game is a CPUBackground when RPS_CPU_BACKGROUND=1
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+FRAME_BUDGET_MS = 1000.0 / 30.0
+MAX_MEAN_ERROR = 0.03
+
+
+def _child(frames: int, size: tuple):
+    """Render with both backgrounds and print the timings and the error as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import numpy as np
+    import pygame
+    from OpenGL.GL import GL_RGB, GL_UNSIGNED_BYTE, glFinish, glReadPixels
+    from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import CPUBackground, GPUBackground, gl_version
+    from src.scripts.gui_version.gui_game.gui_game import _create_shared_background
+
+    pygame.init()
+    pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    vertex_src = (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8")
+    fragment_src = (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8")
+    uniforms = {"colour_1": (1.0, 0.65, 0.0, 1.0), "colour_2": (1.0, 0.27, 0.0, 1.0), "colour_3": (1.0, 0.75, 0.8, 1.0)}
+
+    def read_back() -> np.ndarray:
+        glFinish()
+        data = glReadPixels(0, 0, size[0], size[1], GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, dtype=np.uint8).reshape(size[1], size[0], 3).astype(np.float32) / 255.0
+
+    def frame_times(bg) -> list:
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            bg.render()
+            glFinish()
+            pygame.display.flip()
+            times.append((time.perf_counter() - start) * 1000.0)
+        return times
+
+    cpu = CPUBackground(*size, uniforms)
+    # same pixelation on the GPU: the error only measures the shading
+    gpu = GPUBackground(*size, vertex_src, fragment_src, dict(uniforms, pixel_filter=cpu.pixel_filter))
+    errors = []
+    for instant in (0.0, 7.5, 42.0):
+        now = time.time()
+        gpu.start_time = cpu.start_time = now - instant
+        gpu.render()
+        expected = read_back()
+        cpu.render()
+        errors.append(float(np.abs(read_back() - expected).mean()))
+
+    cpu_times = frame_times(cpu)
+    shade_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        cpu.frame(time.time() - cpu.start_time)
+        shade_times.append((time.perf_counter() - start) * 1000.0)
+    gpu_times = frame_times(gpu)
+
+    assets = AssetManager()
+    assets.load_text("shaders/main_menu_background.vert", shaders_folder / "main_menu_background.vert")
+    assets.load_text("shaders/main_menu_background.frag", shaders_folder / "main_menu_background.frag")
+    assets.wait()
+    shared = _create_shared_background(assets, *size)
+    assets.shutdown()
+
+    print(json.dumps({
+        "gl_version": list(gl_version()),
+        "blocks": list(cpu.blocks),
+        "errors": errors,
+        "cpu_ms": statistics.median(cpu_times),
+        "shade_ms": statistics.median(shade_times),
+        "gpu_ms": statistics.median(gpu_times),
+        "shared": type(shared).__name__,
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="frames timed per background")
+    parser.add_argument("--size", default="640x360", help="window size")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+    if args.child:
+        _child(args.frames, size)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-cpu-bg-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env["RPS_CPU_BACKGROUND"] = "1"
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cpu_background", "--child", "--frames", str(args.frames), "--size", args.size],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print(
+        f"{args.size}, GL {result['gl_version'][0]}.{result['gl_version'][1]}, "
+        f"{result['blocks'][1]}x{result['blocks'][0]} blocks: "
+        f"CPU frame {result['cpu_ms']:.1f} ms ({result['shade_ms']:.1f} ms of NumPy), "
+        f"GPU frame {result['gpu_ms']:.1f} ms, "
+        f"mean error {max(result['errors']) * 100:.2f}%, shared background: {result['shared']}"
+    )
+
+    ok = (
+        result["cpu_ms"] <= FRAME_BUDGET_MS
+        and max(result["errors"]) <= MAX_MEAN_ERROR
+        and result["shared"] == "CPUBackground"
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmark of the frame profiler: its overhead and what it records.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.frame_profiler [--frames N]
+
+Runs in a fresh (headless if needed) process a GameMenu driven like the main loop of
+`start_gui_game` (every phase wrapped the same way):
+- overhead: cost of a phase while the profiler is off (measured on a million calls) times
+  the phases of a frame, it must stay under 0.1% of a frame; the median frame with the
+  profiler off, recording to CSV and showing the overlay is printed for comparison
+- CSV: one row per frame, the phases of a row must add up to its total, and the
+  background, UI composition and upload phases must all be seen
+- overlay: the panel must be drawn in the top left corner of the window
+"""
+
+import argparse
+import csv
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+MAX_OFF_OVERHEAD = 0.001
+
+
+def _child(frames: int, cache_dir: str):
+    """Run the loop with the profiler off, recording to CSV and with the overlay, print JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import numpy as np
+    import pygame
+    from OpenGL.GL import GL_RGB, GL_UNSIGNED_BYTE, glFinish, glReadPixels
+    from src.scripts.gui_version.frame_profiler import frame_profiler
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+    )
+    manager = StateManager(None)
+    manager.current_state = GameMenu(manager, screen, bg)
+
+    def run(profiler) -> list:
+        frame_profiler._default_profiler = profiler
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            profiler.begin_frame()
+            with profiler.phase("events"):
+                events = pygame.event.get()
+                manager.handle_event(events)
+            with profiler.phase("update"):
+                manager.update(1 / 60)
+            with profiler.phase("draw"):
+                manager.draw(screen)
+            profiler.draw_overlay(size[1])
+            with profiler.phase("flip"):
+                # offscreen flips do not wait for the GPU like a real swap does
+                glFinish()
+                pygame.display.flip()
+            profiler.end_frame()
+            times.append((time.perf_counter() - start) * 1000.0)
+        return times
+
+    off = frame_profiler.FrameProfiler()
+    off_times = run(off)
+    # main loop: 5 phases, plus the background and the upload of the menu
+    phases_per_frame = 7
+    phase = off.phase("update")
+    calls = 1_000_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        with phase:
+            pass
+    phase_us = (time.perf_counter() - start) / calls * 1e6
+
+    csv_path = pathlib.Path(cache_dir) / "frames.csv"
+    recording = frame_profiler.FrameProfiler(str(csv_path))
+    csv_times = run(recording)
+    recording.close()
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    parts = ("events", "update", "background", "ui", "upload", "flip", "other")
+    sum_errors = [abs(sum(float(row[name]) for name in parts) - float(row["total"])) for row in rows]
+
+    overlay = frame_profiler.FrameProfiler()
+    overlay.toggle_overlay()
+    overlay_times = run(overlay)
+    glFinish()
+    margin = frame_profiler.OVERLAY_MARGIN
+    corner = glReadPixels(margin + 1, size[1] - margin - 2, 1, 1, GL_RGB, GL_UNSIGNED_BYTE)
+
+    print(json.dumps({
+        "off_ms": statistics.median(off_times),
+        "csv_ms": statistics.median(csv_times),
+        "overlay_ms": statistics.median(overlay_times),
+        "phase_us": phase_us,
+        "phases_per_frame": phases_per_frame,
+        "rows": len(rows),
+        "max_sum_error_ms": max(sum_errors) if sum_errors else 0.0,
+        "means": {name: statistics.mean(float(row[name]) for row in rows) for name in ("total",) + parts},
+        "percentiles": recording.percentiles(),
+        "overlay_lines": overlay.overlay_lines(),
+        "corner": np.frombuffer(corner, dtype=np.uint8).tolist(),
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=120, help="frames run per configuration")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames, args.child)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-profiler-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env.pop("RPS_PROFILE_CSV", None)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.frame_profiler", "--child", cache_dir, "--frames", str(args.frames)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    off_overhead = result["phase_us"] * result["phases_per_frame"] / 1000.0 / result["off_ms"]
+    print(
+        f"frame: off {result['off_ms']:.2f} ms, CSV {result['csv_ms']:.2f} ms, overlay {result['overlay_ms']:.2f} ms; "
+        f"phase while off {result['phase_us'] * 1000.0:.0f} ns ({off_overhead * 100:.4f}% of a frame)"
+    )
+    print(f"CSV: {result['rows']} rows, phases off their total by {result['max_sum_error_ms'] * 1000.0:.1f} us at most")
+    print("mean ms: " + ", ".join(f"{name} {value:.2f}" for name, value in result["means"].items()))
+    print("\n".join(result["overlay_lines"]))
+
+    means = result["means"]
+    ok = (
+        off_overhead <= MAX_OFF_OVERHEAD
+        and result["rows"] == args.frames
+        and result["max_sum_error_ms"] < 0.01
+        and all(means[name] > 0.0 for name in ("background", "ui", "upload", "flip"))
+        and result["corner"] == [16, 16, 24]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark of the GPU timer queries of the frame profiler.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.gpu_timers [--frames N]
+
+Runs in a fresh (headless if needed) process a GameMenu driven like the main loop of
+`start_gui_game`, with the frame profiler recording:
+- results: the background and UI passes must get GPU timings, read back a few frames after
+  they were issued (at most GPU_QUERY_FRAMES), for most frames
+- no stall: reading the results back (in `end_frame`) must stay under 1 ms at p99, and the
+  median frame must not be more than 10% slower than with the GPU timers off (the two
+  configurations alternate in chunks of frames)
+- calibration: timing the shader tiers (which runs its own queries) while the profiler is
+  recording must still work
+"""
+
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+MAX_COLLECT_MS = 1.0
+MAX_SLOWDOWN = 1.10
+CHUNKS = 4
+
+
+def _child(frames: int):
+    """Run the loop with and without GPU timers and print the measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import pygame
+    from OpenGL.GL import GL_NO_ERROR, glFinish, glGetError
+    from src.scripts.gui_version.frame_profiler import frame_profiler
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.shader_quality.shader_quality import time_background
+
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    vertex_src = (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8")
+    fragment_src = (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8")
+    bg = GPUBackground(*size, vertex_src, fragment_src)
+    manager = StateManager(None)
+    manager.current_state = GameMenu(manager, screen, bg)
+
+    def run(profiler, frames: int) -> tuple:
+        frame_profiler._default_profiler = profiler
+        times, collect_times = [], []
+        for _ in range(frames):
+            start = time.perf_counter()
+            profiler.begin_frame()
+            manager.handle_event(pygame.event.get())
+            manager.update(1 / 60)
+            with profiler.phase("draw"):
+                manager.draw(screen)
+            with profiler.phase("flip"):
+                # offscreen flips do not wait for the GPU like a real swap does
+                glFinish()
+                pygame.display.flip()
+            collect_start = time.perf_counter()
+            profiler.end_frame()
+            now = time.perf_counter()
+            collect_times.append((now - collect_start) * 1000.0)
+            times.append((now - start) * 1000.0)
+        return times, collect_times
+
+    untimed = frame_profiler.FrameProfiler()
+    untimed.toggle_overlay()
+    untimed.gpu_timer.available = False
+    timed = frame_profiler.FrameProfiler()
+    timed.toggle_overlay()
+    # alternate the two in chunks: the speed of a shared machine drifts over a run
+    untimed_times, timed_times, collect_times = [], [], []
+    for _ in range(CHUNKS):
+        untimed_times += run(untimed, frames // CHUNKS)[0]
+        chunk_times, chunk_collect_times = run(timed, frames // CHUNKS)
+        timed_times += chunk_times
+        collect_times += chunk_collect_times
+    rows = timed.history[:timed.count]
+    gpu_columns = [frame_profiler.COLUMNS.index("gpu_" + name) for name in frame_profiler.GPU_PASSES]
+
+    # the calibration nests the background pass in its own query
+    calibrated_ms = time_background(bg)
+    error = glGetError()
+
+    print(json.dumps({
+        "untimed_ms": statistics.median(untimed_times),
+        "timed_ms": statistics.median(timed_times),
+        "collect_p99_ms": sorted(collect_times)[int(len(collect_times) * 0.99) - 1],
+        "results": {
+            name: sum(1 for row in rows if not math.isnan(row[column]))
+            for name, column in zip(frame_profiler.GPU_PASSES, gpu_columns)
+        },
+        "skipped": timed.gpu_timer.skipped,
+        "percentiles": {name: timed.percentiles()["gpu_" + name] for name in frame_profiler.GPU_PASSES},
+        "latency_frames": frame_profiler.GPU_QUERY_FRAMES,
+        "calibrated_ms": calibrated_ms,
+        "gl_error": int(error) != GL_NO_ERROR,
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=120, help="frames run per configuration")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-gpu-timers-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env.pop("RPS_PROFILE_CSV", None)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.gpu_timers", "--child", "--frames", str(args.frames)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print(
+        f"frame: {result['untimed_ms']:.2f} ms without GPU timers, {result['timed_ms']:.2f} ms with them; "
+        f"read back p99 {result['collect_p99_ms']:.3f} ms, {result['skipped']} passes skipped (query still pending)"
+    )
+    for name, values in result["percentiles"].items():
+        print(
+            f"gpu {name:<10} {result['results'][name]}/{args.frames // CHUNKS * CHUNKS} frames with a result, "
+            f"p50 {values[0]:.3f} ms, p95 {values[1]:.3f} ms, p99 {values[2]:.3f} ms"
+        )
+    print(f"calibration while recording: {result['calibrated_ms']:.2f} ms, GL error: {result['gl_error']}")
+
+    frames = args.frames // CHUNKS * CHUNKS
+    # every switch to the other profiler leaves the queries of the last frames unread
+    expected = frames - CHUNKS * result["latency_frames"] - result["skipped"]
+    ok = (
+        all(count >= expected for count in result["results"].values())
+        and result["collect_p99_ms"] <= MAX_COLLECT_MS
+        and result["timed_ms"] <= result["untimed_ms"] * MAX_SLOWDOWN
+        and result["calibrated_ms"] > 0.0
+        and not result["gl_error"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Headless rendering benchmark of every GUI state, compared against JSON baselines.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.gui_states [--frames N] [--quality TIER] [--threshold X] [--update-baseline]
+
+Runs in a fresh process on SDL's offscreen video driver with a software GL context (Mesa
+llvmpipe through EGL when there is no display, so it works on a GPU-less Linux box). Each
+state is drawn like the main loop draws it (handle_event, update, draw, flip) for a fixed
+number of frames on a virtual clock: pygame ticks and the background time advance by
+1/60 s per frame whatever the real frame time, so every run draws the same frames. A
+state that would end by itself (an animation stage) is set up again when it does.
+
+States: MainMenu, ChoseGameModeMenu and the GameMenu stages idle, shake, reveal, result
+and paused. For each state:
+- frame time: mean/p95/p99 of the wall time of a frame, glFinish included
+- allocations: Python heap allocated during a frame on top of what was live when it
+  started (tracemalloc peak, measured on a separate pass) and the net blocks it left
+- uploads: texture and buffer bytes sent to the GPU per frame (GPUResourceManager)
+
+Results are compared with the baseline of the same GL driver in BASELINE_FILE: a metric
+more than `threshold` above its baseline (plus a small absolute slack) is a regression.
+`--update-baseline` stores the run as the new baseline of the driver.
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+BASELINE_FILE = pathlib.Path(__file__).resolve().parent / "baselines" / "gui_states.json"
+FRAME_MS = 1000.0 / 60.0
+WARMUP_FRAMES = 10
+ALLOCATION_FRAMES = 20
+# metric -> absolute slack added to the threshold (timings of a shared machine jitter)
+COMPARED_METRICS = {"mean_ms": 0.5, "p95_ms": 1.0, "alloc_kib": 4.0, "upload_kib": 1.0}
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def _child(frames: int, quality: str):
+    """Run every state and print the measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import time
+    import tracemalloc
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.gpu_resources.gpu_resources import get_gpu_resources
+    from src.scripts.gui_version.menus.chose_gamemode_menu.chose_gamemode_menu import ChoseGameModeMenu
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
+    from src.scripts.gui_version.shader_manager.shader_manager import get_shader_manager
+    from src.scripts.gui_version.shader_quality.shader_quality import get_tier
+
+    # virtual clock read by the menus through pygame.time.get_ticks
+    clock = {"ms": 0.0}
+    pygame.time.get_ticks = lambda: int(clock["ms"])
+
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = get_tier(quality).create_background(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+        {"colour_1": (1.0, 0.65, 0.0, 1.0), "colour_2": (1.0, 0.27, 0.0, 1.0), "colour_3": (1.0, 0.75, 0.8, 1.0)},
+    )
+    gpu_resources = get_gpu_resources()
+
+    def round_stage(animation_stage: int):
+        def setup(menu):
+            menu.reset()
+            menu.player1_menu_choice, menu.player2_menu_choice = "rock", "scissors"
+            menu.animate_hand_idle = False
+            menu.game_stage, menu.animation_stage = 3, animation_stage
+            menu.animation_start_time = pygame.time.get_ticks()
+        return setup, lambda menu: menu.game_stage == 3 and menu.animation_stage == animation_stage
+
+    def result_setup(menu):
+        menu.reset()
+        menu.player1_menu_choice, menu.player2_menu_choice = "rock", "scissors"
+        menu.animate_hand_idle = False
+        menu.game_stage, menu.animation_stage = 4, 3
+        menu.animation_start_time = None
+        menu.update_scores()
+
+    def paused_setup(menu):
+        menu.reset()
+        menu.is_paused = True
+
+    # name -> (menu factory, setup, predicate telling whether the menu is still in the state)
+    states = {
+        "main_menu": (MainMenu, lambda menu: menu.reset(), lambda menu: True),
+        "chose_gamemode_menu": (ChoseGameModeMenu, lambda menu: menu.reset(), lambda menu: True),
+        "game_idle": (GameMenu, lambda menu: menu.reset(), lambda menu: menu.game_stage == 0),
+        "game_shake": (GameMenu,) + round_stage(1),
+        "game_reveal": (GameMenu,) + round_stage(2),
+        "game_result": (GameMenu, result_setup, lambda menu: menu.game_stage == 4),
+        "game_paused": (GameMenu, paused_setup, lambda menu: menu.is_paused),
+    }
+
+    results = {}
+    for name, (factory, setup, in_state) in states.items():
+        manager = StateManager(None)
+        menu = factory(manager, screen, bg)
+        manager.current_state = menu
+        clock["ms"] = 0.0
+        setup(menu)
+
+        def frame():
+            if manager.current_state is not menu or not in_state(menu):
+                manager.current_state = menu
+                setup(menu)
+            bg.start_time = time.time() - clock["ms"] / 1000.0
+            manager.handle_event([])
+            manager.update(FRAME_MS / 1000.0)
+            manager.draw(screen)
+            glFinish()
+            pygame.display.flip()
+            gpu_resources.end_frame()
+            clock["ms"] += FRAME_MS
+
+        for _ in range(WARMUP_FRAMES):
+            frame()
+        times = []
+        uploaded = gpu_resources.uploaded_bytes
+        for _ in range(frames):
+            start = time.perf_counter()
+            frame()
+            times.append((time.perf_counter() - start) * 1000.0)
+        upload_bytes = (gpu_resources.uploaded_bytes - uploaded) / frames
+
+        tracemalloc.start()
+        allocated, blocks = [], []
+        for _ in range(ALLOCATION_FRAMES):
+            tracemalloc.reset_peak()
+            live = tracemalloc.get_traced_memory()[0]
+            live_blocks = sys.getallocatedblocks()
+            frame()
+            allocated.append(tracemalloc.get_traced_memory()[1] - live)
+            blocks.append(sys.getallocatedblocks() - live_blocks)
+        tracemalloc.stop()
+
+        results[name] = {
+            "mean_ms": statistics.mean(times),
+            "p95_ms": _percentile(times, 95),
+            "p99_ms": _percentile(times, 99),
+            "alloc_kib": statistics.mean(allocated) / 1024.0,
+            "net_blocks": statistics.mean(blocks),
+            "upload_kib": upload_bytes / 1024.0,
+        }
+        menu.release()
+
+    print(json.dumps({"driver": get_shader_manager().driver_id(), "states": results}))
+    pygame.quit()
+
+
+def _compare(states: dict, baseline: dict, threshold: float) -> list:
+    """Return the (state, metric, value, baseline value) of the regressions."""
+    regressions = []
+    for name, metrics in states.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, slack in COMPARED_METRICS.items():
+            if metric in base and metrics[metric] > base[metric] * (1.0 + threshold) + slack:
+                regressions.append((name, metric, metrics[metric], base[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="frames timed per state")
+    parser.add_argument("--quality", default="medium", help="quality tier of the background shader")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative increase counted as a regression")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_FILE, help="JSON file of the baselines")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline of the driver")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames, args.quality)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-gui-states-") as cache_dir:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.gui_states", "--child", "--frames", str(args.frames), "--quality", args.quality],
+            cwd=REPO_ROOT, env=_headless_env(cache_dir), capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print(f"{result['driver']}, {args.frames} frames per state, {args.quality} background")
+    print(f"{'state':<20}{'mean ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'alloc KiB':>11}{'net blocks':>12}{'upload KiB':>12}")
+    for name, metrics in result["states"].items():
+        print(
+            f"{name:<20}{metrics['mean_ms']:9.2f}{metrics['p95_ms']:9.2f}{metrics['p99_ms']:9.2f}"
+            f"{metrics['alloc_kib']:11.1f}{metrics['net_blocks']:12.1f}{metrics['upload_kib']:12.1f}"
+        )
+
+    try:
+        baselines = json.loads(args.baseline.read_text())
+    except (OSError, ValueError):
+        baselines = {}
+    key = f"{result['driver']}|{args.quality}|{args.frames}"
+    if args.update_baseline:
+        baselines[key] = result["states"]
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        print("OK")
+        return
+    if key not in baselines:
+        print(f"no baseline for this driver and settings in {args.baseline}, create it with --update-baseline")
+        print("OK")
+        return
+
+    regressions = _compare(result["states"], baselines[key], args.threshold)
+    for name, metric, value, base in regressions:
+        print(f"regression: {name} {metric} {value:.2f} (baseline {base:.2f}, +{(value / base - 1.0) * 100 if base else float('inf'):.0f}%)")
+    if regressions:
+        print("FAILED")
+        sys.exit(1)
+    print(f"no regression above {args.threshold * 100:.0f}% of the baseline")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark of the latency from a key press to the presented frame showing it, per state.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.input_latency [--interval S]
+
+Runs in a fresh (headless if needed) process the main loop of `start_gui_game` (60 fps
+frame cap, events stamped when polled, latency recorded when the flip returns) over the
+main menu, the game mode choice and a GameMenu against the computer, while a
+`SyntheticInput` thread posts key presses every `interval` seconds (with jitter, so they
+land at every point of a frame): selection moves in each menu, Enter to the next one,
+pause toggles and a choice lock-in in the GameMenu, and a key doing nothing in the main
+menu and during the round animation.
+
+Checks:
+- every press is accounted: the ones changing the menu (or the state) get a latency for
+  the state that handled them, the ones doing nothing are counted without visible change
+- a posted press waits at most one frame in the queue and is shown by the next flip: no
+  latency may exceed two of the longest frame intervals
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+
+# Key presses posted (pygame.K_<name>): selection moves in the main menu, a key doing nothing,
+# Enter, the same in the game mode choice, then in the GameMenu selection moves, pause
+# toggles, the lock-in and a press during the animation of the round
+SCRIPT = (
+    ["DOWN", "UP"] * 5 + ["a", "RETURN"]
+    + ["DOWN", "UP"] * 4 + ["RETURN"]
+    + ["RIGHT", "LEFT"] * 4 + ["ESCAPE", "DOWN", "UP", "ESCAPE", "RETURN", "LEFT"]
+)
+# presses of the script changing what each state shows, and doing nothing
+EXPECTED_CHANGED = {"MainMenu": 11, "ChoseGameModeMenu": 9, "GameMenu": 13}
+EXPECTED_UNCHANGED = {"MainMenu": 1, "GameMenu": 1}
+WARMUP_FRAMES = 10
+
+
+def _child(interval: float):
+    """Run the main loop with synthetic key presses and print the measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import time
+    import pygame
+    from src.scripts.gui_version.game_state_manager.game_state_manager import PooledFactory, StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.input_latency.input_latency import SyntheticInput, get_input_latency
+    from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
+
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+    )
+    manager = StateManager(None)
+    manager.change(PooledFactory(MainMenu.POOL_KEY, lambda mgr: MainMenu(mgr, screen, bg)))
+    latency = get_input_latency()
+    keys = [getattr(pygame, "K_" + name) for name in SCRIPT]
+    synthetic = SyntheticInput(keys, interval=interval, jitter=interval / 3)
+
+    # the first frames draw the menu textures and run the shader for the first time
+    for _ in range(WARMUP_FRAMES):
+        manager.handle_event(pygame.event.get())
+        manager.update(1 / 60)
+        manager.draw(screen)
+        pygame.display.flip()
+
+    clock = pygame.time.Clock()
+    intervals = []
+    last_flip = time.perf_counter()
+    end = None
+    synthetic.start()
+    # the frames after the last press let it be presented
+    while end is None or time.perf_counter() < end:
+        dt = clock.tick(60) / 1000.0
+        events = pygame.event.get()
+        latency.stamp(events)
+        manager.handle_event(events)
+        manager.update(dt)
+        manager.draw(screen)
+        pygame.display.flip()
+        latency.presented()
+        now = time.perf_counter()
+        intervals.append(now - last_flip)
+        last_flip = now
+        manager.process_prefetch()
+        if end is None and synthetic.done():
+            end = now + 0.5
+    synthetic.stop()
+
+    print(json.dumps({
+        "posted": synthetic.posted,
+        "percentiles": latency.percentiles(),
+        "counts": {name: len(values) for name, values in latency.latencies.items()},
+        "unchanged": latency.unchanged,
+        "max_latency_ms": max((max(values) for values in latency.latencies.values()), default=0.0) * 1000.0,
+        "min_latency_ms": min((min(values) for values in latency.latencies.values()), default=0.0) * 1000.0,
+        "max_interval_ms": max(intervals) * 1000.0,
+        "median_interval_ms": sorted(intervals)[len(intervals) // 2] * 1000.0,
+        "final_state": type(manager.current_state).__name__,
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between two key presses")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.interval)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-input-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env["RPS_SHADER_QUALITY"] = "low"
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.input_latency", "--child", "--interval", str(args.interval)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+
+    print(f"frames: median {result['median_interval_ms']:.2f} ms apart, longest {result['max_interval_ms']:.2f} ms")
+    print(f"{'key to flip ms':<22}{'presses':>8}" + "".join(f"{'p' + str(q):>9}" for q in (50, 95, 99)))
+    for name, (count, values) in result["percentiles"].items():
+        print(f"{name:<22}{count:8d}" + "".join(f"{value:9.2f}" for value in values))
+    print(f"without visible change: {result['unchanged']}")
+    print(f"latency: {result['min_latency_ms']:.2f} to {result['max_latency_ms']:.2f} ms "
+          f"(at most {2 * result['max_interval_ms']:.2f} ms expected)")
+
+    ok = (
+        result["posted"] == len(SCRIPT)
+        and result["counts"] == EXPECTED_CHANGED
+        and result["unchanged"] == EXPECTED_UNCHANGED
+        and result["final_state"] == "GameMenu"
+        and 0.0 < result["min_latency_ms"]
+        and result["max_latency_ms"] <= 2 * result["max_interval_ms"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
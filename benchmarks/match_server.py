@@ -0,0 +1,370 @@
+"""Benchmark and self-check of the online match server against localhost.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.match_server [--matches N]
+
+The server runs alone in a child process (one core) and the bots in this process:
+- N matches are played concurrently by 2N bot connections, first to 3 points
+- the CPU time used by the server, the matches/s and the round latency are reported
+- self-checks: cheating reveal, commit ordering, move timeout, the GUI MatchClient and a
+  restart during a match (forfeit rating, back in the queue)
+
+The number of concurrent matches is bounded by the open files limit of the processes
+(each match uses two sockets on each side).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from src.scripts.game_rules.game_rules import WINNING_SCORE
+from src.scripts.network.match_client.match_client import MatchClient
+from src.scripts.network.match_protocol.match_protocol import (
+    PROTOCOL_VERSION,
+    JOIN,
+    MATCH_START,
+    COMMIT,
+    REVEAL_REQUEST,
+    REVEAL,
+    ROUND_RESULT,
+    MATCH_ABORTED,
+    ABORT_BAD_REVEAL,
+    ABORT_TIMEOUT,
+    FrameDecoder,
+    commit_digest,
+    encode,
+    new_nonce,
+)
+from src.scripts.network.match_server.match_server import MatchServer, SPECTATOR_BUFFER_LIMIT
+from src.scripts.network.matchmaking.matchmaking import DEFAULT_RATING
+
+MOVE_TIMEOUT = 2.0
+
+
+def _serve(spectator_buffer: int, move_timeout: float):
+    """Child process: run the server, print its port, print its stats when stdin closes."""
+
+    async def _main():
+        server = MatchServer(port=0, move_timeout=move_timeout, spectator_buffer=spectator_buffer)
+        await server.start()
+        print(json.dumps({"port": server.port}), flush=True)
+        cpu_start = time.process_time()
+        loop = asyncio.get_running_loop()
+        # stdin closed by the parent: report and stop
+        await loop.run_in_executor(None, sys.stdin.read)
+        print(json.dumps({
+            "cpu_s": time.process_time() - cpu_start,
+            "matches_started": server.matches_started,
+            "matches_finished": server.matches_finished,
+            "matches_aborted": server.matches_aborted,
+            "rounds_played": server.rounds_played,
+            "spectators_dropped": server.spectators_dropped,
+        }), flush=True)
+        await server.close()
+
+    _raise_open_files_limit()
+    asyncio.run(_main())
+
+
+class Bot(asyncio.Protocol):
+    """Scripted player speaking the binary protocol."""
+
+    def __init__(
+        self,
+        latencies: list,
+        cheat: bool = False,
+        commit_delay: float = 0.0,
+        idle: bool = False,
+        rating: Optional[int] = None,
+    ):
+        self.latencies = latencies
+        self.cheat = cheat
+        self.commit_delay = commit_delay
+        self.idle = idle
+        self.rating = rating if rating is not None else random.randint(800, 1200)
+        self.decoder = FrameDecoder()
+        self.transport = None
+        self.done = asyncio.get_running_loop().create_future()
+        self.match_id = 0
+        self.seat = 0
+        self.round = 0
+        self.move = 0
+        self.nonce = b""
+        self.committed_at = 0.0
+        self.committed = False
+        self.result = None
+        self.saw_result_before_commit = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(encode(JOIN, PROTOCOL_VERSION, self.rating))
+
+    def _commit(self):
+        if self.done.done() or self.transport is None:
+            return
+        self.move = random.randrange(3)
+        self.nonce = new_nonce()
+        self.committed = True
+        self.committed_at = time.perf_counter()
+        self.transport.write(encode(COMMIT, self.round, commit_digest(self.match_id, self.round, self.move, self.nonce)))
+
+    def _schedule_commit(self):
+        if self.idle:
+            return
+        if self.commit_delay:
+            asyncio.get_running_loop().call_later(self.commit_delay, self._commit)
+        else:
+            self._commit()
+
+    def data_received(self, data):
+        for message in self.decoder.feed(data):
+            msg_type = message[0]
+            if msg_type == MATCH_START:
+                self.match_id, self.seat = message[1], message[2]
+                self._schedule_commit()
+            elif msg_type == REVEAL_REQUEST:
+                if not self.committed:
+                    self.saw_result_before_commit = True
+                move = (self.move + 1) % 3 if self.cheat else self.move
+                self.transport.write(encode(REVEAL, self.round, move, self.nonce))
+            elif msg_type == ROUND_RESULT:
+                if not self.committed:
+                    self.saw_result_before_commit = True
+                self.latencies.append(time.perf_counter() - self.committed_at)
+                self.committed = False
+                self.round = (message[1] + 1) & 0xFF
+                if message[7]:
+                    self._finish(("over", message[5], message[6]))
+                else:
+                    self._schedule_commit()
+            elif msg_type == MATCH_ABORTED:
+                self._finish(("aborted", message[1], message[2]))
+
+    def _finish(self, result):
+        self.result = result
+        if not self.done.done():
+            self.done.set_result(result)
+        self.transport.close()
+
+    def connection_lost(self, exc):
+        if not self.done.done():
+            self.done.set_result(("lost", None, None))
+
+
+async def _open_bot(port: int, latencies: list, **kwargs) -> Bot:
+    loop = asyncio.get_running_loop()
+    _, bot = await loop.create_connection(lambda: Bot(latencies, **kwargs), "127.0.0.1", port)
+    return bot
+
+
+async def _play_matches(port: int, matches: int) -> dict:
+    latencies: list[float] = []
+    start = time.perf_counter()
+    # open the connections in batches so the listen backlog never overflows
+    bots = []
+    for i in range(0, 2 * matches, 1000):
+        bots += await asyncio.gather(*(_open_bot(port, latencies) for _ in range(min(1000, 2 * matches - i))))
+    connected = time.perf_counter()
+    results = await asyncio.gather(*(bot.done for bot in bots))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def _percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0 if latencies else 0.0
+
+    finished = [r for r in results if r[0] == "over"]
+    return {
+        "matches": matches,
+        "seconds": elapsed,
+        "connect_seconds": connected - start,
+        "matches_per_s": matches / elapsed,
+        "rounds": len(latencies) // 2,
+        "first_to_3": all(max(r[1], r[2]) == WINNING_SCORE for r in finished),
+        "finished_bots": len(finished),
+        "round_latency_ms": {"p50": _percentile(0.5), "p99": _percentile(0.99), "max": _percentile(1.0)},
+    }
+
+
+async def _check_cheating(port: int) -> bool:
+    """A reveal that does not match its commitment loses the match."""
+    honest = await _open_bot(port, [], rating=DEFAULT_RATING)
+    cheater = await _open_bot(port, [], cheat=True, rating=DEFAULT_RATING)
+    results = await asyncio.gather(honest.done, cheater.done)
+    return all(r[0] == "aborted" and r[1] == cheater.seat and r[2] == ABORT_BAD_REVEAL for r in results)
+
+
+async def _check_commit_ordering(port: int) -> bool:
+    """A slow player never learns anything about the round before committing."""
+    fast = await _open_bot(port, [], rating=DEFAULT_RATING)
+    slow = await _open_bot(port, [], commit_delay=0.05, rating=DEFAULT_RATING)
+    results = await asyncio.gather(fast.done, slow.done)
+    return all(r[0] == "over" for r in results) and not slow.saw_result_before_commit
+
+
+async def _check_timeout(port: int) -> bool:
+    """A player who never moves loses the match after the move timeout."""
+    # the bots of the self-checks share a rating: paired right away, the wait is only the timeout
+    active = await _open_bot(port, [], rating=DEFAULT_RATING)
+    idle = await _open_bot(port, [], idle=True, rating=DEFAULT_RATING)
+    results = await asyncio.wait_for(asyncio.gather(active.done, idle.done), MOVE_TIMEOUT * 3)
+    return all(r[0] == "aborted" and r[1] == idle.seat and r[2] == ABORT_TIMEOUT for r in results)
+
+
+def _check_gui_client(port: int) -> bool:
+    """Two GUI MatchClients play a full match, polled like the game loop does."""
+    clients = [MatchClient("127.0.0.1", port), MatchClient("127.0.0.1", port)]
+    for client in clients:
+        client.connect()
+    final = [None, None]
+    deadline = time.perf_counter() + 10.0
+    while None in final and time.perf_counter() < deadline:
+        for i, client in enumerate(clients):
+            client.poll()
+            if client.state == "playing" and client._pending_move is None:
+                client.submit_move(random.choice(["rock", "paper", "scissors"]))
+            result = client.pop_result()
+            if result is not None and result.game_over:
+                final[i] = result
+        time.sleep(0.001)
+    for client in clients:
+        client.close()
+    if None in final:
+        return False
+    first, second = final
+    return (
+        first.my_score == second.opponent_score
+        and first.opponent_score == second.my_score
+        and first.my_move == second.opponent_move
+        and max(first.my_score, first.opponent_score) == WINNING_SCORE
+    )
+
+
+def _check_rejoin(port: int) -> bool:
+    """A player restarting mid-match forfeits it (rating included) and waits for the next opponent."""
+    clients = [MatchClient("127.0.0.1", port), MatchClient("127.0.0.1", port)]
+    newcomer = MatchClient("127.0.0.1", port)
+
+    def _poll_until(condition, seconds: float = 5.0) -> bool:
+        deadline = time.perf_counter() + seconds
+        while not condition() and time.perf_counter() < deadline:
+            for client in (*clients, newcomer):
+                client.poll()
+            time.sleep(0.001)
+        return condition()
+
+    for client in clients:
+        client.connect()
+    try:
+        if not _poll_until(lambda: all(client.state == "playing" for client in clients)):
+            return False
+        # the seat 1 player restarts: what the pause menu of the GameMenu does
+        leaver, opponent = sorted(clients, key=lambda client: -client.seat)
+        leaver.leave()
+        leaver.join()
+        if not _poll_until(lambda: opponent.state == "over"):
+            return False
+        # let the stale MATCH_ABORTED of the forfeit reach the leaver
+        _poll_until(lambda: False, 0.2)
+        forfeit_ok = (
+            leaver.rating < DEFAULT_RATING < opponent.rating
+            and leaver.state == "waiting"
+            and leaver.aborted is None
+            and opponent.aborted is not None and opponent.aborted[0] == 1
+        )
+        newcomer.connect()
+        return forfeit_ok and _poll_until(lambda: leaver.state == "playing" and newcomer.state == "playing")
+    finally:
+        for client in (*clients, newcomer):
+            client.close()
+
+
+def start_server(spectator_buffer: Optional[int] = None, move_timeout: Optional[float] = None) -> tuple[subprocess.Popen, int]:
+    """Start the server in a child process, returns the process and the port it listens on."""
+    command = [sys.executable, "-m", "benchmarks.match_server", "--serve"]
+    if spectator_buffer is not None:
+        command += ["--spectator-buffer", str(spectator_buffer)]
+    if move_timeout is not None:
+        command += ["--move-timeout", str(move_timeout)]
+    server = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    return server, json.loads(server.stdout.readline())["port"]
+
+
+def stop_server(server: subprocess.Popen) -> Optional[dict]:
+    """Stop a server started by `start_server`, returns its stats."""
+    stats = None
+    if not server.stdin.closed:
+        server.stdin.close()
+        line = server.stdout.readline()
+        stats = json.loads(line) if line else None
+    server.wait(timeout=10)
+    return stats
+
+
+def _raise_open_files_limit():
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=5000, help="number of concurrent matches")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spectator-buffer", type=int, default=SPECTATOR_BUFFER_LIMIT, help=argparse.SUPPRESS)
+    parser.add_argument("--move-timeout", type=float, default=MOVE_TIMEOUT, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        _serve(args.spectator_buffer, args.move_timeout)
+        return
+
+    _raise_open_files_limit()
+    server, port = start_server()
+    try:
+        async def _run():
+            result = await _play_matches(port, args.matches)
+            result["cheating_ok"] = await _check_cheating(port)
+            result["commit_ordering_ok"] = await _check_commit_ordering(port)
+            result["timeout_ok"] = await _check_timeout(port)
+            return result
+
+        result = asyncio.run(_run())
+        result["gui_client_ok"] = _check_gui_client(port)
+        result["rejoin_ok"] = _check_rejoin(port)
+    finally:
+        stats = stop_server(server)
+    result["server"] = stats
+
+    latency = result["round_latency_ms"]
+    print(
+        f"{result['matches']} concurrent matches in {result['seconds']:.2f} s ({result['matches_per_s']:.0f} matches/s, "
+        f"{result['rounds']} rounds), server CPU {result['server']['cpu_s']:.2f} s"
+    )
+    print(f"round latency: p50 {latency['p50']:.2f} ms | p99 {latency['p99']:.2f} ms | max {latency['max']:.2f} ms")
+    print(json.dumps(result))
+    ok = (
+        result["finished_bots"] == 2 * result["matches"]
+        and result["first_to_3"]
+        and result["cheating_ok"]
+        and result["commit_ordering_ok"]
+        and result["timeout_ok"]
+        and result["gui_client_ok"]
+        and result["rejoin_ok"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
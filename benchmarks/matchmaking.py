@@ -0,0 +1,185 @@
+"""Benchmark and self-check of the matchmaking queue under join/leave churn.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.matchmaking [--rate JOINS_PER_S] [--seconds S] [--leave-ratio R]
+
+Players join at a fixed rate on a simulated clock (ratings ~ N(1000, 200)), a share of
+them leave before being paired and the matchmaker ticks every 100 ms like the server.
+Running the simulation faster than real time proves the rate is sustainable on one core:
+- the wall-clock cost per join and the highest sustainable join rate are reported
+- the pairing latency (simulated wait) and the rating gap of the pairs are compared
+  with a run at a tenth of the rate: more churn must not make players wait longer
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from src.scripts.network.matchmaking.matchmaking import Matchmaker, MAX_WINDOW
+
+TICK = 0.1
+
+
+class _Clock:
+    """Simulated clock driven by the benchmark."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _simulate(rate: float, seconds: float, leave_ratio: float, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    clock = _Clock()
+    matchmaker = Matchmaker(clock)
+    joins = int(rate * seconds)
+    per_tick = max(1, int(rate * TICK))
+    # ratings and leave decisions drawn ahead of time so only the matchmaker is timed
+    ratings = [max(0, int(rng.gauss(1000, 200))) for _ in range(joins)]
+    leavers = [rng.random() < leave_ratio for _ in range(joins)]
+    waits: list[float] = []
+    joined_at: dict[int, float] = {}
+    pending_leaves: list[int] = []
+    max_queue = 0
+
+    def _record(pair):
+        for player in pair:
+            waits.append(clock.now - joined_at.pop(player))
+
+    start = time.perf_counter()
+    player = 0
+    while player < joins:
+        # one tick worth of arrivals, spread over the tick
+        batch = min(per_tick, joins - player)
+        for i in range(batch):
+            clock.now += TICK / batch
+            joined_at[player] = clock.now
+            pair = matchmaker.join(player, ratings[player])
+            if pair is not None:
+                _record(pair)
+            elif leavers[player]:
+                pending_leaves.append(player)
+            player += 1
+        # the leavers of the previous tick give up
+        for leaver in pending_leaves:
+            if matchmaker.leave(leaver):
+                del joined_at[leaver]
+        pending_leaves.clear()
+        for pair in matchmaker.tick():
+            _record(pair)
+        max_queue = max(max_queue, len(matchmaker))
+    elapsed = time.perf_counter() - start
+
+    waits.sort()
+
+    def _percentile(p: float) -> float:
+        return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000.0 if waits else 0.0
+
+    return {
+        "rate": rate,
+        "joins": joins,
+        "wall_seconds": elapsed,
+        "sustainable_joins_per_s": joins / elapsed,
+        "us_per_join": elapsed / joins * 1e6,
+        "pairs": matchmaker.pairs_made,
+        "left_waiting": len(matchmaker),
+        "max_queue": max_queue,
+        "mean_rating_gap": matchmaker.total_rating_gap / max(1, matchmaker.pairs_made),
+        "wait_ms": {"p50": _percentile(0.5), "p99": _percentile(0.99), "max": _percentile(1.0)},
+    }
+
+
+def _check_pairing() -> bool:
+    """Close ratings pair at once, far ones only once their windows widened enough."""
+    clock = _Clock()
+    matchmaker = Matchmaker(clock)
+    ok = matchmaker.join("a", 1000) is None and matchmaker.join("b", 1020) == ("b", "a")
+    ok = ok and matchmaker.join("low", 1000) is None and matchmaker.join("high", 1300) is None
+    ok = ok and not matchmaker.tick() and "low" in matchmaker
+    ok = ok and matchmaker.leave("low") and not matchmaker.leave("low") and "low" not in matchmaker
+    ok = ok and matchmaker.join("low", 1000) is None
+    paired_at = None
+    while paired_at is None and clock.now < 60.0:
+        clock.now += TICK
+        if matchmaker.tick():
+            paired_at = clock.now
+    # a 300 points gap needs the window to widen from 50 to 300
+    return ok and paired_at is not None and 4.0 <= paired_at <= 8.0 and not len(matchmaker)
+
+
+def _check_window_limit() -> bool:
+    """Players further apart than the largest window are never paired."""
+    clock = _Clock()
+    matchmaker = Matchmaker(clock)
+    matchmaker.join("a", 100)
+    matchmaker.join("b", 100 + MAX_WINDOW + 100)
+    for _ in range(1000):
+        clock.now += TICK
+        if matchmaker.tick():
+            return False
+    return len(matchmaker) == 2
+
+
+def _check_symmetry() -> bool:
+    """A pair needs both windows to cover the gap, whichever of the two players searches."""
+    clock = _Clock()
+    matchmaker = Matchmaker(clock)
+    matchmaker.join("old", 1000)
+    # alone for 6 s: its window covers 350 points
+    while clock.now < 6.0:
+        clock.now += TICK
+        matchmaker.tick()
+    joined_at = clock.now
+    if matchmaker.join("new", 1250) is not None:
+        return False
+    paired_at = None
+    while paired_at is None and clock.now < joined_at + 60.0:
+        clock.now += TICK
+        if matchmaker.tick():
+            paired_at = clock.now
+    # the window of the newcomer has to widen from 50 to 250 first
+    return paired_at is not None and 3.0 <= paired_at - joined_at <= 6.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50000, help="joins per second")
+    parser.add_argument("--seconds", type=float, default=10.0, help="simulated seconds")
+    parser.add_argument("--leave-ratio", type=float, default=0.3, help="share of players leaving before a match")
+    args = parser.parse_args()
+
+    baseline = _simulate(args.rate / 10, args.seconds, args.leave_ratio)
+    result = _simulate(args.rate, args.seconds, args.leave_ratio)
+    result["baseline"] = baseline
+    result["pairing_ok"] = _check_pairing()
+    result["window_limit_ok"] = _check_window_limit()
+    result["symmetry_ok"] = _check_symmetry()
+
+    for run in (baseline, result):
+        wait = run["wait_ms"]
+        print(
+            f"{run['rate']:.0f} joins/s: {run['us_per_join']:.2f} us/join "
+            f"(sustains {run['sustainable_joins_per_s']:.0f} joins/s), queue <= {run['max_queue']}, "
+            f"wait p50 {wait['p50']:.0f} ms | p99 {wait['p99']:.0f} ms, gap {run['mean_rating_gap']:.1f}"
+        )
+    print(json.dumps(result))
+    ok = (
+        result["sustainable_joins_per_s"] >= args.rate
+        # more churn must not degrade the pairing latency
+        and result["wait_ms"]["p99"] <= max(baseline["wait_ms"]["p99"], TICK * 1000.0)
+        and result["pairing_ok"]
+        and result["window_limit_ok"]
+        and result["symmetry_ok"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark of the memory accounting (RPS_MEMORY_PROFILE): attribution and the report of the menus.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.memory_profiler [--frames N]
+
+Runs in a fresh (headless if needed) process, with the memory profiler recording, a probe
+state and then the main menu and a GameMenu, each for N steady frames drawn like the main
+loop of `start_gui_game` draws them:
+- attribution: the probe allocates PROBE_BYTES in its update and one PROBE_SIZE surface in
+  its draw every frame; the report must give them to the probe's update and draw phases
+  (within 5%) and the surface to the line of the probe creating it
+- steady state: the frames before the first STEADY_FRAMES of a state must not count
+- stop: the pygame functions must be restored and tracemalloc stopped
+
+The report of the menus (their per-frame allocations and the hotspots) is printed; the menus
+are not held to the zero allocation budget here, only the attribution is checked.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+PROBE_BYTES = 64 * 1024
+PROBE_SIZE = (64, 64)
+
+
+def _child(frames: int):
+    """Run the states with the memory profiler and print its measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import contextlib
+    import io
+    import tracemalloc
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.frame_profiler import frame_profiler
+    from src.scripts.gui_version.game_state_manager.game_state_manager import State, StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.memory_profiler import memory_profiler
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
+
+    original_surface = pygame.Surface
+
+    class _ProbeState(State):
+        def __init__(self, manager):
+            super().__init__(manager)
+            self.buffer = None
+
+        def update(self, dt):
+            # replaced every frame: allocated, but nothing retained
+            self.buffer = bytearray(PROBE_BYTES)
+
+        def draw(self, screen):
+            pygame.Surface(PROBE_SIZE, pygame.SRCALPHA)
+
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+    )
+    manager = StateManager(None)
+    states = [_ProbeState(manager), MainMenu(manager, screen, bg), GameMenu(manager, screen, bg)]
+
+    memory = memory_profiler.MemoryProfiler(True)
+    memory.attach(manager)
+    profiler = frame_profiler.FrameProfiler(memory=memory)
+    frame_profiler._default_profiler = profiler
+    for state in states:
+        manager.current_state = state
+        for _ in range(memory_profiler.STEADY_FRAMES + frames):
+            profiler.begin_frame()
+            with profiler.phase("events"):
+                events = pygame.event.get()
+                manager.handle_event(events)
+            with profiler.phase("update"):
+                manager.update(1 / 60)
+            with profiler.phase("draw"):
+                manager.draw(screen)
+            with profiler.phase("flip"):
+                glFinish()
+                pygame.display.flip()
+            profiler.end_frame()
+
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        memory.print_report()
+    per_frame = memory.per_frame()
+    hotspots = memory.hotspots()
+    memory.stop()
+    probe = per_frame.get("_ProbeState", {})
+    print(json.dumps({
+        "report": report.getvalue(),
+        "frames": memory.frames,
+        "probe_update_bytes": probe.get("update", (0,) * 5)[0],
+        "probe_draw_surfaces": probe.get("draw", (0,) * 5)[2],
+        "probe_draw_surface_bytes": probe.get("draw", (0,) * 5)[3],
+        "probe_sites": [row[3] for row in hotspots if row[4] == "_ProbeState"],
+        "probe_line": _ProbeState.draw.__code__.co_firstlineno + 1,
+        "restored": pygame.Surface is original_surface and not hasattr(pygame.transform.rotate, "__wrapped__"),
+        "tracing": tracemalloc.is_tracing(),
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="steady frames run per state")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-memory-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env.pop("RPS_MEMORY_PROFILE", None)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory_profiler", "--child", "--frames", str(args.frames)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print(result["report"], end="")
+
+    surface_bytes = PROBE_SIZE[0] * PROBE_SIZE[1] * 4
+    print(
+        f"probe: update {result['probe_update_bytes'] / 1024:.1f} KiB per frame (expected {PROBE_BYTES / 1024:.1f}), "
+        f"draw {result['probe_draw_surfaces']:.2f} surfaces of {result['probe_draw_surface_bytes'] / 1024:.1f} KiB "
+        f"(expected 1 of {surface_bytes / 1024:.1f}) at {', '.join(result['probe_sites'])}"
+    )
+    ok = (
+        abs(result["probe_update_bytes"] / PROBE_BYTES - 1.0) <= 0.05
+        and result["probe_draw_surfaces"] == 1.0
+        and result["probe_draw_surface_bytes"] == surface_bytes
+        and len(result["probe_sites"]) == 1
+        and result["probe_sites"][0].endswith(f"benchmarks/memory_profiler.py:{result['probe_line']}")
+        and len(result["frames"]) == 3
+        and all(count == args.frames for count in result["frames"].values())
+        and result["restored"]
+        and not result["tracing"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Micro-benchmarks of the non-GUI hot paths, tracked per commit.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.micro [--repeats N] [--sample-ms MS] [--against COMMIT] [--history PATH] [--no-save]
+
+Runs in a fresh process (SDL dummy video driver, nothing is drawn):
+- rules: `round_winner`, `GameMenu.get_winner` and the modular formula of
+  `TerminalSession.play`, over the 9 pairs of moves
+- moves: opponent move generation with the `random` module and with a `random.Random`
+  (as the terminal sessions do)
+- terminal: `set_text_color`, and `TerminalScreen.compose` of a frame with one changed
+  line and of a full frame
+- states: construction of a `TerminalSession`, of a `GameMenu` (sprites cached) and
+  reset of a pooled `GameMenu`
+
+Each case is timed `repeats` times (samples of about `sample-ms`, the cases taking turns
+so a drift of the machine speed hits them all) and the samples, in ns per call, are
+appended to the history file with the commit they were measured on. The run is compared
+with the last run of another commit on the same machine (or `--against`): a case whose
+mean is more than MIN_SLOWDOWN slower with a one-sided Welch t-test p-value under ALPHA
+is flagged, and the run fails. Samples are compared relative to a reference loop timed in
+the same rounds, so a machine running slower as a whole (frequency scaling, other load)
+is not taken for a regression.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+HISTORY_FILE = pathlib.Path(__file__).resolve().parent / "history" / "micro.jsonl"
+ALPHA = 0.01
+MIN_SLOWDOWN = 0.05
+# Plain Python loop timed with the cases: comparisons divide each sample by the reference
+# sample of the same round, which cancels the speed changes of the machine between runs
+REFERENCE_CASE = "reference.loop"
+
+
+def _cases() -> dict:
+    """name -> function timed (imports the game, so only called in the child)."""
+    import random
+    import types
+    import pygame
+    from src.scripts.game_rules.game_rules import MOVES, round_winner
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.terminal_version.terminal_renderer.terminal_renderer import TerminalScreen
+    from src.scripts.terminal_version.terminal_session.terminal_session import TerminalSession
+    from src.scripts.terminal_version.terminal_utils.terminal_utils import set_text_color
+
+    pairs = [(first, second) for first in MOVES for second in MOVES]
+    menus = [types.SimpleNamespace(player1_menu_choice=first, player2_menu_choice=second) for first, second in pairs]
+    choices = list(MOVES)
+    rng = random.Random(1)
+
+    def rules_round_winner():
+        for first, second in pairs:
+            round_winner(first, second)
+
+    def rules_get_winner():
+        for menu in menus:
+            GameMenu.get_winner(menu)
+
+    def rules_terminal_modular():
+        # the formula of TerminalSession.play
+        for first, second in pairs:
+            first == second or (choices.index(first) - choices.index(second)) % 3 == 1
+
+    screen = TerminalScreen(size=(80, 24))
+    for index in range(20):
+        screen.print(f"{set_text_color(94, 'First player')}: choose rock, paper, or scissors: {MOVES[index % 3]}")
+    screen.compose()
+    changed = [f"{set_text_color(93, 'Scores')}: {index} - 0" for index in range(2)]
+    frame = {"index": 0}
+
+    def terminal_compose_changed_line():
+        frame["index"] ^= 1
+        screen.set_line(-1, changed[frame["index"]])
+        screen.compose("prompt: ")
+
+    def terminal_compose_full():
+        screen._drawn = None
+        screen.compose("prompt: ")
+
+    pygame.init()
+    display = pygame.display.set_mode((640, 360))
+    GameMenu._load_sprite_caches()
+    manager = StateManager(None)
+    pooled = GameMenu(manager, display, None)
+
+    def reference_loop():
+        total = 0
+        for value in range(200):
+            total += value
+        return total
+
+    return {
+        REFERENCE_CASE: reference_loop,
+        "rules.round_winner": rules_round_winner,
+        "rules.game_menu_get_winner": rules_get_winner,
+        "rules.terminal_modular": rules_terminal_modular,
+        "moves.random_choice": lambda: random.choice(choices),
+        "moves.rng_choice": lambda: rng.choice(choices),
+        "terminal.set_text_color": lambda: set_text_color(94, "First player"),
+        "terminal.compose_changed_line": terminal_compose_changed_line,
+        "terminal.compose_full": terminal_compose_full,
+        "states.terminal_session": lambda: TerminalSession(None, None, size=(80, 24)),
+        "states.game_menu": lambda: GameMenu(manager, display, None),
+        "states.game_menu_reset": pooled.reset,
+    }
+
+
+def _child(repeats: int, sample_ms: float):
+    """Time every case and print the samples (ns per call) as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import timeit
+
+    cases = _cases()
+    timers = {}
+    for name, function in cases.items():
+        timer = timeit.Timer(function)
+        # calls per sample: about `sample_ms` each
+        number = 1
+        while True:
+            elapsed = timer.timeit(number)
+            if elapsed >= 0.001:
+                break
+            number *= 4
+        timers[name] = (timer, max(1, int(sample_ms / 1000.0 / (elapsed / number))))
+    samples = {name: [] for name in cases}
+    for _ in range(repeats):
+        for name, (timer, number) in timers.items():
+            samples[name].append(timer.timeit(number) / number * 1e9)
+    print(json.dumps(samples))
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b) (continued fraction, Lentz's method)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1.0) / (a + b + 2.0):
+        # the continued fraction converges quickly on this side only
+        return 1.0 - _betainc(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * result
+
+
+def welch_p_slower(before: list, after: list) -> float:
+    """One-sided p-value of Welch's t-test for `after` having a greater mean than `before`."""
+    mean_before, mean_after = statistics.mean(before), statistics.mean(after)
+    var_before = statistics.variance(before) / len(before)
+    var_after = statistics.variance(after) / len(after)
+    se2 = var_before + var_after
+    if se2 == 0.0:
+        return 0.0 if mean_after > mean_before else 1.0
+    t = (mean_after - mean_before) / math.sqrt(se2)
+    df = se2 ** 2 / (var_before ** 2 / (len(before) - 1) + var_after ** 2 / (len(after) - 1))
+    tail = 0.5 * _betainc(df / 2.0, 0.5, df / (df + t * t))  # P(T > |t|)
+    return tail if t > 0 else 1.0 - tail
+
+
+def _relative(values: list, samples: dict) -> list:
+    """`values` divided by the reference sample of the same round (unchanged without reference)."""
+    reference = samples.get(REFERENCE_CASE)
+    if not reference or len(reference) != len(values):
+        return values
+    return [value / base for value, base in zip(values, reference)]
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _machine() -> str:
+    return f"{platform.node()}|{platform.machine()}|{platform.processor()}|{platform.python_version()}"
+
+
+def _load_history(path: pathlib.Path) -> list:
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=20, help="samples per case")
+    parser.add_argument("--sample-ms", type=float, default=5.0, help="duration of a sample")
+    parser.add_argument("--against", help="commit (prefix) to compare with, the last other commit by default")
+    parser.add_argument("--history", type=pathlib.Path, default=HISTORY_FILE, help="JSON lines history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.repeats, args.sample_ms)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-micro-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env["SDL_VIDEODRIVER"] = "dummy"
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.micro", "--child", "--repeats", str(args.repeats), "--sample-ms", str(args.sample_ms)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    samples = json.loads(out.strip().splitlines()[-1])
+    entry = {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": _machine(),
+        "samples_ns": samples,
+    }
+
+    history = [old for old in _load_history(args.history) if old.get("machine") == entry["machine"]]
+    if args.against:
+        candidates = [old for old in history if old.get("commit", "").startswith(args.against)]
+    else:
+        candidates = [old for old in history if old.get("commit") != entry["commit"]]
+    reference = candidates[-1] if candidates else None
+
+    label = f"{entry['commit'][:10]}{'+' if entry['dirty'] else ''}"
+    if reference is not None:
+        print(f"{label} against {reference['commit'][:10]}{'+' if reference['dirty'] else ''} ({reference['time']})")
+    else:
+        print(f"{label}, no earlier commit in {args.history} to compare with")
+    print(f"{'case':<32}{'median ns':>12}{'before':>12}{'change':>9}{'p':>9}")
+    slower = []
+    for name, values in samples.items():
+        line = f"{name:<32}{statistics.median(values):12.1f}"
+        before = reference["samples_ns"].get(name) if reference is not None else None
+        if before and name != REFERENCE_CASE:
+            relative = _relative(values, samples)
+            relative_before = _relative(before, reference["samples_ns"])
+            change = statistics.mean(relative) / statistics.mean(relative_before) - 1.0
+            p = welch_p_slower(relative_before, relative)
+            flagged = p < ALPHA and change > MIN_SLOWDOWN
+            line += f"{statistics.median(before):12.1f}{change * 100:+8.1f}%{p:9.4f}{'  SLOWER' if flagged else ''}"
+            if flagged:
+                slower.append(name)
+        print(line)
+
+    if not args.no_save:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as history_file:
+            history_file.write(json.dumps(entry) + "\n")
+    if slower:
+        print(f"significantly slower (p < {ALPHA}, more than {MIN_SLOWDOWN * 100:.0f}%): {', '.join(slower)}")
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Latency harness of online rounds: how much of the network the GameMenu animation hides.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.online_latency [--rounds N] [--delays MS,MS,...] [--jitter MS] [--speed X]
+
+The match server runs in a child process and every client reaches it through a local
+LatencyProxy delaying each chunk of bytes by `delay` +- `jitter` ms in both directions.
+For every delay, a headless GameMenu plays `rounds` online rounds against a scripted
+opponent answering at once, with and without prediction (RPS_PREDICTION), and measures
+after glFinish:
+- feedback: from locking in a move to the first frame showing the hands animation
+- reveal delay: from locking in a move to the first frame showing the moves, minus the
+  time the animation takes (0 when the network is fully hidden)
+With prediction the feedback must take at most two frames, and the reveal must not wait
+for the network while a round trip chain fits in the animation (four frames of slack: the
+animation stages only end on frames). The animation durations
+are divided by `speed` to keep the runs short.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.match_server import start_server, stop_server
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+
+class LatencyProxy:
+    """TCP proxy delaying every chunk by `delay` +- `jitter` seconds in both directions (bytes stay in order)."""
+
+    def __init__(self, target: tuple, delay: float = 0.0, jitter: float = 0.0, seed: int = 1):
+        self.target = target
+        self.delay = delay
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.server = None
+        self.port = 0
+        self.connections: set = set()
+
+    async def start(self) -> int:
+        """Start listening on a free local port and return it."""
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        task.add_done_callback(self.connections.discard)
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            client_writer.close()
+            return
+        try:
+            await asyncio.gather(
+                self._pump(client_reader, server_writer),
+                self._pump(server_reader, client_writer),
+            )
+        except asyncio.CancelledError:
+            # the proxy is closing: drop the connection
+            client_writer.close()
+            server_writer.close()
+
+    async def _pump(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        last = 0.0
+        while True:
+            try:
+                data = await reader.read(65536)
+            except OSError:
+                data = b""
+            # a chunk never overtakes the previous one, whatever its jitter
+            when = max(last, loop.time() + max(0.0, self.delay + self.rng.uniform(-self.jitter, self.jitter)))
+            last = when
+            if not data:
+                loop.call_at(when, writer.close)
+                return
+            loop.call_at(when, lambda data=data: None if writer.is_closing() else writer.write(data))
+
+
+def _child(rounds: int, speed: float):
+    """Play `rounds` online rounds in a headless GameMenu and print the latencies as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.network.match_client.match_client import MatchClient
+
+    for name in ("MOVE_TO_CENTER_MS", "SHAKE_MS", "REVEAL_MS", "NEXT_ROUND_MS", "TIE_RESTART_MS"):
+        setattr(GameMenu, name, getattr(GameMenu, name) / speed)
+    animation_ms = GameMenu.MOVE_TO_CENTER_MS + GameMenu.SHAKE_MS
+
+    pygame.init()
+    size = (640, 360)
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+    )
+    player = MatchClient()
+    player.connect()
+    opponent = MatchClient()
+    opponent.connect()
+    menu = GameMenu(None, screen, bg, back_factory=None, remote=player)
+    rng = random.Random(1)
+    enter = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN)
+
+    feedback, reveal_delay, frame_times = [], [], []
+    locked_at = None
+    feedback_seen = False
+    clock = pygame.time.Clock()
+    deadline = time.perf_counter() + 60.0 + rounds * 10.0 / speed
+    while len(reveal_delay) < rounds and time.perf_counter() < deadline:
+        opponent.poll()
+        if opponent.state == "playing" and opponent._pending_move is None:
+            # the scripted opponent answers at once: only the network delays the rounds
+            opponent.submit_move(rng.choice(["rock", "paper", "scissors"]))
+        elif opponent.state == "over" and not opponent.results:
+            opponent.join()
+        opponent.results.clear()
+
+        events = []
+        if player.state == "playing" and menu.game_stage == 0 and menu.player1_menu_choice is None:
+            menu.player1_menu_index = rng.randrange(3)
+            events.append(enter)
+        elif menu.game_stage == 4 and menu.is_game_over():
+            events.append(enter)  # look for the next match
+        start = time.perf_counter()
+        menu.handle_event(events)
+        if events and menu.player1_menu_choice is not None and locked_at is None:
+            locked_at, feedback_seen = start, False
+        menu.update(clock.tick() or 1)
+        animating, revealing = menu.game_stage == 3, menu.game_stage == 3 and menu.animation_stage >= 2
+        menu.draw(screen)
+        glFinish()
+        pygame.display.flip()
+        now = time.perf_counter()
+        frame_times.append((now - start) * 1000.0)
+        if locked_at is not None:
+            if animating and not feedback_seen:
+                feedback.append((now - locked_at) * 1000.0)
+                feedback_seen = True
+            if revealing:
+                reveal_delay.append(max(0.0, (now - locked_at) * 1000.0 - animation_ms))
+                locked_at = None
+
+    player.close()
+    opponent.close()
+    print(json.dumps({
+        "rounds": len(reveal_delay),
+        "frame_ms": statistics.mean(frame_times),
+        "animation_ms": animation_ms,
+        "feedback_ms": feedback,
+        "reveal_delay_ms": reveal_delay,
+    }))
+    pygame.quit()
+
+
+def _summary(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"p50": 0.0, "max": 0.0}
+    return {"p50": values[len(values) // 2], "max": values[-1]}
+
+
+async def _run(port: int, delay_ms: float, jitter_ms: float, predict: bool, rounds: int, speed: float) -> dict:
+    proxy = LatencyProxy(("127.0.0.1", port), delay_ms / 1000.0, jitter_ms / 1000.0)
+    proxy_port = await proxy.start()
+    with tempfile.TemporaryDirectory(prefix="rps-latency-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env["RPS_SERVER"] = f"127.0.0.1:{proxy_port}"
+        env["RPS_PREDICTION"] = "1" if predict else "0"
+        child = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks.online_latency", "--child",
+            "--rounds", str(rounds), "--speed", str(speed),
+            cwd=REPO_ROOT, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await child.communicate()
+    await proxy.close()
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    result["feedback"] = _summary(result.pop("feedback_ms"))
+    result["reveal_delay"] = _summary(result.pop("reveal_delay_ms"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=6, help="rounds measured per run")
+    parser.add_argument("--delays", default="0,50,150", help="one-way delays of the proxy in ms")
+    parser.add_argument("--jitter", type=float, default=20.0, help="jitter of the proxy in ms")
+    parser.add_argument("--speed", type=float, default=4.0, help="animation speed-up")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.rounds, args.speed)
+        return
+
+    runs = []
+    # the GUI takes seconds between rounds: keep the short move timeout of the server benchmark away
+    server, port = start_server(move_timeout=60.0)
+    try:
+        for delay in (float(value) for value in args.delays.split(",")):
+            jitter = min(args.jitter, delay)
+            for predict in (False, True):
+                run = asyncio.run(_run(port, delay, jitter, predict, args.rounds, args.speed))
+                run.update({"delay_ms": delay, "jitter_ms": jitter, "prediction": predict})
+                runs.append(run)
+                print(
+                    f"delay {delay:5.0f} +- {jitter:3.0f} ms, prediction {'on ' if predict else 'off'}: "
+                    f"feedback p50 {run['feedback']['p50']:7.1f} ms | max {run['feedback']['max']:7.1f} ms, "
+                    f"reveal delay p50 {run['reveal_delay']['p50']:7.1f} ms | max {run['reveal_delay']['max']:7.1f} ms "
+                    f"({run['rounds']} rounds, {run['frame_ms']:.1f} ms frames)"
+                )
+    finally:
+        stop_server(server)
+    print(json.dumps(runs))
+
+    ok = all(run["rounds"] == args.rounds for run in runs)
+    for run in runs:
+        if not run["prediction"]:
+            continue
+        frames = 2 * run["frame_ms"]
+        # commit, reveal request, reveal and result: four one-way trips before the moves are known
+        hidden = 4 * (run["delay_ms"] + run["jitter_ms"]) + frames < run["animation_ms"]
+        ok = ok and run["feedback"]["p50"] <= frames
+        if hidden:
+            # each of the two animation stages ends on the first frame past its duration
+            ok = ok and run["reveal_delay"]["p50"] <= 2 * frames
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
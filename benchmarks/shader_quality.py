@@ -0,0 +1,128 @@
+"""Benchmark of the quality tiers of the background shader and of their calibration.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.shader_quality [--frames N] [--size WxH]
+
+Runs in a fresh (headless if needed) process with an empty cache directory:
+- tiers: time of a frame of every tier (GL_TIME_ELAPSED queries, or the wall time up to
+  glFinish when longer) and the mean difference of its image with the "high" tier; every
+  cheaper tier must cost less than high
+- calibration: tier chosen on the first launch (calibrated) and on the second one (read back
+  from the user cache), which must agree, the second one without timing anything; the
+  chosen tier must fit the budget unless it is the cheapest one
+- override: RPS_SHADER_QUALITY forces a tier
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+
+def _child(frames: int, size: tuple, cache_dir: str):
+    """Time every tier, calibrate twice and print the results as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import numpy as np
+    import pygame
+    from OpenGL.GL import GL_RGB, GL_UNSIGNED_BYTE, glFinish, glReadPixels
+    from src.scripts.gui_version.shader_quality import shader_quality
+
+    pygame.init()
+    pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    vertex_src = (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8")
+    fragment_src = (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8")
+
+    def read_back() -> np.ndarray:
+        glFinish()
+        data = glReadPixels(0, 0, size[0], size[1], GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, dtype=np.uint8).reshape(size[1], size[0], 3).astype(np.float32) / 255.0
+
+    tiers, reference = {}, None
+    for tier in shader_quality.TIERS:
+        bg = tier.create_background(*size, vertex_src, fragment_src)
+        frame_ms = shader_quality.time_background(bg, frames)
+        bg.start_time = time.time() - 10.0
+        bg.render()
+        image = read_back()
+        reference = image if reference is None else reference
+        tiers[tier.name] = {"ms": frame_ms, "blocks": list(bg.block_grid()), "error": float(np.abs(image - reference).mean())}
+        bg.release_gl_resources()
+
+    start = time.perf_counter()
+    first = shader_quality.choose_tier(*size, vertex_src, fragment_src, cache_dir=cache_dir)
+    first_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    second = shader_quality.choose_tier(*size, vertex_src, fragment_src, cache_dir=cache_dir)
+    second_ms = (time.perf_counter() - start) * 1000.0
+    saved = json.loads((pathlib.Path(cache_dir) / shader_quality.QUALITY_FILE).read_text())
+    os.environ["RPS_SHADER_QUALITY"] = "minimal"
+    forced = shader_quality.choose_tier(*size, vertex_src, fragment_src, cache_dir=cache_dir)
+
+    print(json.dumps({
+        "tiers": tiers,
+        "budget_ms": shader_quality.BACKGROUND_BUDGET_MS,
+        "first": first.name,
+        "first_ms": first_ms,
+        "second": second.name,
+        "second_ms": second_ms,
+        "calibration": next(iter(saved.values()))["timings_ms"],
+        "forced": forced.name,
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=10, help="frames timed per tier")
+    parser.add_argument("--size", default="640x360", help="window size")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+    if args.child:
+        _child(args.frames, size, args.child)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-quality-") as cache_dir:
+        env = _headless_env(cache_dir)
+        env.pop("RPS_SHADER_QUALITY", None)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.shader_quality", "--child", cache_dir, "--frames", str(args.frames), "--size", args.size],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    for name, tier in result["tiers"].items():
+        print(
+            f"{name:<8} {tier['blocks'][1]:>4}x{tier['blocks'][0]:<4} blocks: "
+            f"{tier['ms']:6.2f} ms, image difference with high {tier['error'] * 100:5.2f}%"
+        )
+    print(
+        f"calibration ({result['budget_ms']:.1f} ms budget): {result['first']} in {result['first_ms']:.0f} ms "
+        f"(timed {json.dumps(result['calibration'])}), next launch: {result['second']} in {result['second_ms']:.1f} ms, "
+        f"forced: {result['forced']}"
+    )
+
+    tiers = result["tiers"]
+    chosen = result["calibration"][result["first"]]
+    names = list(tiers)
+    ok = (
+        all(tiers[name]["ms"] < tiers["high"]["ms"] for name in names[1:])
+        and result["first"] == result["second"]
+        and result["second_ms"] < result["first_ms"]
+        and (chosen <= result["budget_ms"] or result["first"] == names[-1])
+        and result["forced"] == "minimal"
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark of the GUI shader startup time, with a cold and a warm program binary cache.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.shader_startup [--runs N]
+
+Each run happens in a fresh process (fresh GL context):
+- cold: empty shader cache directory, every program is compiled and linked from GLSL
+- warm: same cache directory again, programs are reloaded with glProgramBinary
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _headless_env(cache_dir: str) -> dict:
+    """Environment for a child run: our cache dir, a fresh driver-side cache, offscreen if no display."""
+    env = dict(os.environ)
+    env["RPS_CACHE_DIR"] = cache_dir
+    # Mesa keeps its own shader cache which would hide the cost of a cold start; it cannot be
+    # disabled (program binaries depend on it) so give it a fresh directory with our cache
+    env["MESA_SHADER_CACHE_DIR"] = os.path.join(cache_dir, "mesa")
+    if sys.platform.startswith("linux") and not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("SDL_VIDEODRIVER", "offscreen")
+        env.setdefault("PYOPENGL_PLATFORM", "egl")
+    return env
+
+
+def _child():
+    """Create the GUI programs once and print the timings as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import time
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.shader_manager.shader_manager import get_shader_manager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.gui_utils.gui_utils import render_surface_fullscreen
+
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    vertex_src = (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8")
+    fragment_src = (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8")
+
+    pygame.init()
+    pygame.display.set_mode((640, 360), pygame.OPENGL | pygame.DOUBLEBUF)
+
+    start = time.perf_counter()
+    bg = GPUBackground(640, 360, vertex_src, fragment_src)
+    bg.render()
+    # the UI program is created lazily on the first UI draw
+    render_surface_fullscreen(pygame.Surface((640, 360), pygame.SRCALPHA))
+    glFinish()
+    elapsed = time.perf_counter() - start
+
+    stats = get_shader_manager().stats
+    print(json.dumps({
+        "startup_ms": elapsed * 1000.0,
+        "shader_ms": stats["seconds"] * 1000.0,
+        "binary_hits": stats["binary_hits"],
+        "compiled": stats["compiled"],
+        "rejected": stats["rejected"],
+    }))
+    pygame.quit()
+
+
+def _run_child(cache_dir: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.shader_startup", "--child"],
+        cwd=REPO_ROOT, env=_headless_env(cache_dir), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(runs: int = 5) -> dict:
+    """Run `runs` cold/warm pairs and return the median timings."""
+    cold, warm = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="rps-shader-cache-") as cache_dir:
+            cold.append(_run_child(cache_dir))
+            warm.append(_run_child(cache_dir))
+
+    def _summary(results):
+        return {
+            "startup_ms": statistics.median(r["startup_ms"] for r in results),
+            "shader_ms": statistics.median(r["shader_ms"] for r in results),
+            "binary_hits": results[-1]["binary_hits"],
+            "compiled": results[-1]["compiled"],
+        }
+
+    return {"cold": _summary(cold), "warm": _summary(warm)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of cold/warm pairs")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        return
+
+    result = run(args.runs)
+    for name in ("cold", "warm"):
+        r = result[name]
+        print(
+            f"{name:>4}: startup {r['startup_ms']:8.2f} ms | shaders {r['shader_ms']:8.2f} ms"
+            f" | {r['compiled']} compiled, {r['binary_hits']} from cache"
+        )
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
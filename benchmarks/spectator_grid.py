@@ -0,0 +1,294 @@
+"""Benchmark and self-check of the grid of live matches (SpectatorGridMenu).
+
+Usage (from the root folder of the project):
+    py -m benchmarks.spectator_grid [--tiles N] [--frames F] [--size WxH]
+
+Each renderer runs in a fresh process, headless (software GL) when there is no display:
+- instanced: the SpectatorGridMenu, every tile drawn from the sprite and glyph atlases in
+  one instanced draw call
+- overlay: the same rows blitted with pygame on a window-sized overlay uploaded every
+  frame, the way the other menus draw (scaled sprites and text cached, rotations per frame)
+The tiles follow simulated matches (a move every few frames, finished matches replaced)
+and the frame time is measured with glFinish for the background alone, the tiles alone
+and both. The tiles alone must fit in a 60 FPS frame and beat the overlay, and the grid
+must not create GL objects once running.
+
+A MultiSpectatorClient then fills its slots with distinct live matches of a real match
+server, and a slot whose match ended is given a new match.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.match_server import Bot, start_server, stop_server
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+from src.scripts.network.match_client.match_client import MultiSpectatorClient, WatchedMatch
+from src.scripts.network.matchmaking.matchmaking import DEFAULT_RATING
+from src.scripts.network.match_protocol.match_protocol import (
+    SPECTATE_START,
+    EVENT_COMMIT,
+    EVENT_REVEAL,
+)
+
+FRAME_BUDGET_MS = 1000.0 / 60.0
+# Simulated seconds between two events of a match (commit, commit, reveal)
+EVENT_SECONDS = 0.4
+
+
+class _Clock:
+    """Simulated clock advanced by 1/60 s per frame, so every run shows the same animations."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _SimulatedMatches:
+    """Plays random matches in the slots of a (never connected) MultiSpectatorClient."""
+
+    def __init__(self, spectator: MultiSpectatorClient, seed: int = 1):
+        self.spectator = spectator
+        self.rng = random.Random(seed)
+        self.next_id = 1
+        self.next_event = [0.0] * len(spectator.slots)
+        self.steps = [0] * len(spectator.slots)
+
+    def step(self, now: float):
+        slots = self.spectator.slots
+        for index, match in enumerate(slots):
+            if match is None or (match.ended_at is not None and now - match.ended_at >= self.spectator.HOLD_SECONDS):
+                rating1, rating2 = (self.rng.randint(800, 1200) for _ in range(2))
+                slots[index] = WatchedMatch((SPECTATE_START, self.next_id, 0, 0, 0, 0, rating1, rating2))
+                self.next_id += 1
+                # spread the events of the tiles over time
+                self.next_event[index] = now + self.rng.random() * EVENT_SECONDS
+                self.steps[index] = 0
+            elif match.ended_at is None and now >= self.next_event[index]:
+                step = self.steps[index] % 3
+                if step < 2:
+                    match.apply(EVENT_COMMIT, match.round, step, 0, now)
+                else:
+                    match.apply(EVENT_REVEAL, match.round, self.rng.randrange(3), self.rng.randrange(3), now)
+                self.steps[index] += 1
+                self.next_event[index] = now + EVENT_SECONDS
+
+
+class _OverlayRenderer:
+    """Draws the rows of the grid with pygame on one overlay, like the PyGameMenu subclasses."""
+
+    def __init__(self, menu, size: tuple):
+        import pygame
+        from src.scripts.gui_version.sprite_batch.sprite_batch import SOLID
+
+        self.pygame = pygame
+        self.menu = menu
+        self.size = size
+        self.solid_uv = menu.sprites.uvs[SOLID]
+        self._scaled = {}
+
+    def _image(self, row) -> "pygame.Surface":
+        """Source sprite of a row scaled to its size and tinted (cached like the GameMenu sprites)."""
+        pygame = self.pygame
+        w, h = max(1, round(float(row[2]))), max(1, round(float(row[3])))
+        key = (tuple(float(v) for v in row[4:12]), row[15], w, h)
+        image = self._scaled.get(key)
+        if image is None:
+            tint = tuple(int(round(float(c) * 255)) for c in row[8:12])
+            if key[0][:4] == self.solid_uv:
+                image = pygame.Surface((w, h), pygame.SRCALPHA)
+                image.fill(tint)
+            else:
+                atlas = (self.menu.sprites, self.menu.glyphs)[int(row[15])].surface
+                aw, ah = atlas.get_size()
+                u0, v0, u1, v1 = (float(v) for v in row[4:8])
+                source = atlas.subsurface(pygame.Rect(
+                    round(u0 * aw), round(v0 * ah), max(1, round((u1 - u0) * aw)), max(1, round((v1 - v0) * ah))
+                ))
+                image = pygame.transform.smoothscale(source, (w, h))
+                image.fill(tint, special_flags=pygame.BLEND_RGBA_MULT)
+            self._scaled[key] = image
+        return image
+
+    def draw(self, rows):
+        from src.scripts.gui_version.gui_utils.gui_utils import render_surface_fullscreen
+        from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+
+        pygame = self.pygame
+        overlay = pygame.Surface(self.size, pygame.SRCALPHA)
+        for row in rows:
+            image = self._image(row)
+            topleft = (int(row[0]), int(row[1]))
+            angle = float(row[14])
+            if angle:
+                GameMenu._blit_rotate(None, overlay, image, topleft, (int(row[12]), int(row[13])), angle)
+            else:
+                overlay.blit(image, topleft)
+        render_surface_fullscreen(overlay)
+
+
+def _child(renderer: str, tiles: int, frames: int, size: tuple):
+    """Render `frames` frames of the grid and print the frame times as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import math
+    import pygame
+    from OpenGL.GL import glFinish, glGetString, GL_RENDERER
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.gpu_resources.gpu_resources import get_gpu_resources
+    from src.scripts.gui_version.menus.spectator_grid_menu.spectator_grid_menu import SpectatorGridMenu
+
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *size,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+        {"colour_1": (1.0, 0.41, 0.38, 1.0), "colour_2": (0.39, 0.58, 0.93, 1.0), "colour_3": (1.0, 1.0, 0.0, 1.0)},
+    )
+
+    clock = _Clock()
+    spectator = MultiSpectatorClient(tiles, clock=clock)
+    # never connected: the simulation feeds the slots, do not draw the "not connected" message
+    spectator.state = "watching"
+    simulation = _SimulatedMatches(spectator)
+    columns = math.ceil(math.sqrt(tiles))
+    menu = SpectatorGridMenu(None, screen, bg, spectator, columns, math.ceil(tiles / columns))
+    overlay = _OverlayRenderer(menu, size) if renderer == "overlay" else None
+
+    def _draw_tiles():
+        if overlay is None:
+            menu.batch.draw(menu.build_rows(*size, clock()), *size)
+        else:
+            overlay.draw(menu.build_rows(*size, clock()))
+
+    phases = {"background": lambda: bg.render(), "tiles": _draw_tiles, "frame": lambda: (bg.render(), _draw_tiles())}
+    gpu_resources = get_gpu_resources()
+    result = {"renderer": renderer, "gl_renderer": glGetString(GL_RENDERER).decode()}
+    for phase, draw in phases.items():
+        times = []
+        for frame in range(frames + 10):
+            clock.now += 1.0 / 60.0
+            simulation.step(clock.now)
+            menu.update(1.0 / 60.0)
+            start = time.perf_counter()
+            draw()
+            glFinish()
+            elapsed = time.perf_counter() - start
+            pygame.display.flip()
+            gpu_resources.end_frame()
+            # the first frames upload the atlases and fill the caches
+            if frame >= 10:
+                times.append(elapsed * 1000.0)
+        result[phase] = {"mean_ms": statistics.mean(times), "p99_ms": sorted(times)[int(0.99 * (len(times) - 1))]}
+    result["instances"] = len(menu.build_rows(*size, clock()))
+    result["gl_objects_created"] = sum(created for created, _ in list(gpu_resources.churn_history)[-frames:])
+    result["matches_shown"] = simulation.next_id - 1
+    print(json.dumps(result))
+    pygame.quit()
+
+
+def _run_child(renderer: str, tiles: int, frames: int, size: tuple) -> dict:
+    with tempfile.TemporaryDirectory(prefix="rps-grid-") as cache_dir:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.spectator_grid", "--child", renderer,
+             "--tiles", str(tiles), "--frames", str(frames), "--size", f"{size[0]}x{size[1]}"],
+            cwd=REPO_ROOT, env=_headless_env(cache_dir), capture_output=True, text=True, check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+async def _check_live_slots(slots: int) -> bool:
+    """A MultiSpectatorClient watches `slots` distinct live matches, and refills a finished one."""
+    server, port = start_server(move_timeout=60.0)
+    try:
+        latencies = []
+        loop = asyncio.get_running_loop()
+        bots = [bot for _, bot in await asyncio.gather(*(
+            loop.create_connection(lambda: Bot(latencies, idle=True, rating=DEFAULT_RATING), "127.0.0.1", port)
+            for _ in range(2 * (slots + 4))
+        ))]
+        deadline = time.perf_counter() + 10.0
+        while any(bot.match_id == 0 for bot in bots) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        live = {bot.match_id for bot in bots}
+
+        client = MultiSpectatorClient(slots, "127.0.0.1", port)
+        client.HOLD_SECONDS = 0.2
+        client.connect()
+
+        async def _poll_until(condition, timeout: float) -> bool:
+            deadline = time.perf_counter() + timeout
+            while not condition() and time.perf_counter() < deadline:
+                client.poll()
+                await asyncio.sleep(0.005)
+            return condition()
+
+        filled = await _poll_until(lambda: all(client.slots), 5.0)
+        watched = {match.match_id for match in client.slots if match is not None}
+        ok = filled and len(watched) == slots and watched <= live
+        if ok:
+            # play the match of the first slot to its end: the slot shows it, then another match
+            first = client.slots[0]
+            for bot in bots:
+                if bot.match_id == first.match_id:
+                    bot.idle = False
+                    bot._schedule_commit()
+            ended = await _poll_until(lambda: first.ended_at is not None, 10.0)
+            replaced = await _poll_until(lambda: client.slots[0] is not None and client.slots[0] is not first, 5.0)
+            ok = ended and first.winner() > 0 and replaced and client.slots[0].match_id not in watched
+        client.close()
+        for bot in bots:
+            bot.transport.close()
+        return ok
+    finally:
+        stop_server(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=64, help="number of tiles of the grid")
+    parser.add_argument("--frames", type=int, default=120, help="frames measured per phase")
+    parser.add_argument("--size", default="640x360", help="window size")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+    if args.child:
+        _child(args.child, args.tiles, args.frames, size)
+        return
+
+    runs = {renderer: _run_child(renderer, args.tiles, args.frames, size) for renderer in ("instanced", "overlay")}
+    result = {"runs": runs, "live_slots_ok": asyncio.run(_check_live_slots(16))}
+    print(f"{args.tiles} tiles at {size[0]}x{size[1]} on {runs['instanced']['gl_renderer']}")
+    for renderer, run in runs.items():
+        print(
+            f"{renderer:>9}: tiles {run['tiles']['mean_ms']:6.2f} ms (p99 {run['tiles']['p99_ms']:6.2f}) | "
+            f"background {run['background']['mean_ms']:6.2f} ms | frame {run['frame']['mean_ms']:6.2f} ms "
+            f"({1000.0 / run['frame']['mean_ms']:5.1f} FPS), {run['gl_objects_created']} GL objects created"
+        )
+    instanced, overlay = runs["instanced"], runs["overlay"]
+    if instanced["background"]["mean_ms"] > FRAME_BUDGET_MS:
+        print("note: the background shader alone does not fit a 60 FPS frame on this GL driver")
+    print(json.dumps(result))
+    ok = (
+        instanced["tiles"]["mean_ms"] <= FRAME_BUDGET_MS
+        and instanced["tiles"]["mean_ms"] < overlay["tiles"]["mean_ms"]
+        and instanced["gl_objects_created"] == 0
+        and result["live_slots_ok"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Benchmark and self-check of the spectator fan-out of the match server.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.spectators [--matches N] [--viewers V] [--lobbies L]
+
+The server runs alone in a child process (see benchmarks.match_server):
+- N matches are played by bots taking MOVE_DELAY seconds per move, without spectators,
+  with L "lobby screens" watching every match but never reading their socket, then
+  with V viewers per match (in their own process) on top of the lobby screens
+- the stalled lobby screens must be dropped and must not slow the matches down: the
+  round latency stays the one of the run without spectators
+- the server CPU time per delivered frame is reported for the viewers run
+- every viewer rebuilds the scores from the deltas: they must match the players' ones
+- a GUI SpectatorClient follows a match to its end
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+
+from benchmarks.match_server import Bot, start_server, stop_server, _raise_open_files_limit
+from src.scripts.game_rules.game_rules import MOVES, round_winner
+from src.scripts.network.match_client.match_client import MatchClient, SpectatorClient
+from src.scripts.network.matchmaking.matchmaking import DEFAULT_RATING
+from src.scripts.network.match_protocol.match_protocol import (
+    WATCH,
+    SPECTATE_START,
+    SPECTATE_EVENT,
+    EVENT_REVEAL,
+    EVENT_ABORT,
+    FrameDecoder,
+    encode,
+)
+
+# Seconds a bot takes to choose its move, so the matches last long enough to be watched
+MOVE_DELAY = 0.3
+# Unread bytes after which the server drops a spectator (small so the check is quick)
+SPECTATOR_BUFFER = 4096
+
+
+class Viewer(asyncio.Protocol):
+    """Spectator rebuilding the scores of the matches it watches from the deltas."""
+
+    def __init__(self, match_ids: list[int], stalled: bool = False):
+        self.match_ids = match_ids
+        self.stalled = stalled
+        self.decoder = FrameDecoder()
+        self.scores: dict[int, list[int]] = {}
+        self.ended: set[int] = set()
+        self.frames = 0
+        self.lost = asyncio.get_running_loop().create_future()
+        # kept: a paused transport is not referenced by the event loop anymore
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(b"".join(encode(WATCH, match_id) for match_id in self.match_ids))
+        if self.stalled:
+            # a lobby screen frozen on the other side: nothing is ever read
+            transport.pause_reading()
+
+    def data_received(self, data):
+        for message in self.decoder.feed(data):
+            self.frames += 1
+            if message[0] == SPECTATE_START:
+                self.scores[message[1]] = [message[3], message[4]]
+            elif message[0] == SPECTATE_EVENT:
+                _, match_id, event, _, a, b = message
+                if event == EVENT_REVEAL:
+                    winner = round_winner(MOVES[a], MOVES[b])
+                    if winner:
+                        self.scores[match_id][winner - 1] += 1
+                elif event == EVENT_ABORT:
+                    self.ended.add(match_id)
+
+    def connection_lost(self, exc):
+        if not self.lost.done():
+            self.lost.set_result(exc)
+
+
+async def _open_viewer(port: int, match_ids: list[int], stalled: bool = False) -> Viewer:
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if stalled:
+        # a small receive window makes the server side fill up quickly
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await loop.sock_connect(sock, ("127.0.0.1", port))
+    _, viewer = await loop.create_connection(lambda: Viewer(match_ids, stalled), sock=sock)
+    return viewer
+
+
+def _percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+
+    def _percentile(p: float) -> float:
+        return values[min(len(values) - 1, int(p * len(values)))] * 1000.0 if values else 0.0
+
+    return {"p50": _percentile(0.5), "p99": _percentile(0.99), "max": _percentile(1.0)}
+
+
+async def _watch(port: int, match_ids: list[int], viewers_per_match: int, lobbies: int):
+    """Child process: subscribe the viewers, report what they saw once the parent says the matches ended."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    # the lobby screens first so they get every change of every match
+    stalled = await asyncio.gather(*(_open_viewer(port, match_ids, stalled=True) for _ in range(lobbies)))
+    viewers: list[Viewer] = []
+    for i in range(0, len(match_ids) * viewers_per_match, 1000):
+        batch = range(i, min(i + 1000, len(match_ids) * viewers_per_match))
+        viewers += await asyncio.gather(*(_open_viewer(port, [match_ids[j % len(match_ids)]]) for j in batch))
+    print(json.dumps({"subscribe_seconds": time.perf_counter() - start}), flush=True)
+
+    final_scores = {int(k): v for k, v in json.loads(await loop.run_in_executor(None, sys.stdin.readline)).items()}
+    # give the last deltas the time to arrive
+    await asyncio.sleep(0.2)
+    dropped = 0
+    for viewer in stalled:
+        # a paused transport does not notice the disconnection: read what was buffered
+        viewer.transport.resume_reading()
+        try:
+            await asyncio.wait_for(asyncio.shield(viewer.lost), 1.0)
+            dropped += 1
+        except asyncio.TimeoutError:
+            pass
+    print(json.dumps({
+        "viewers": len(viewers),
+        "frames_received": sum(viewer.frames for viewer in viewers),
+        "viewer_scores_ok": all(
+            viewer.scores.get(match_id) == final_scores.get(match_id)
+            for viewer in viewers for match_id in viewer.match_ids
+        ),
+        "stalled_dropped": dropped,
+        "stalled_frames_read": sum(viewer.frames for viewer in stalled),
+    }), flush=True)
+
+
+async def _play(port: int, matches: int, viewers_per_match: int, lobbies: int) -> dict:
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    bots = []
+    for i in range(0, 2 * matches, 1000):
+        batch = min(1000, 2 * matches - i)
+        bots += [bot for _, bot in await asyncio.gather(*(
+            loop.create_connection(lambda: Bot(latencies, commit_delay=MOVE_DELAY, idle=True, rating=DEFAULT_RATING), "127.0.0.1", port)
+            for _ in range(batch)
+        ))]
+    # wait for every match to start to know what to watch
+    deadline = time.perf_counter() + 10.0
+    while any(bot.match_id == 0 for bot in bots) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    match_ids = sorted({bot.match_id for bot in bots})
+
+    # the viewers live in their own process so they do not slow the bots down
+    watcher = None
+    result = {"viewers": 0, "frames_received": 0, "viewer_scores_ok": True, "stalled_dropped": 0}
+    if viewers_per_match or lobbies:
+        watcher = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks.spectators", "--watch", str(port),
+            "--viewers", str(viewers_per_match), "--lobbies", str(lobbies),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        watcher.stdin.write((json.dumps(match_ids) + "\n").encode())
+        await watcher.stdin.drain()
+        result.update(json.loads(await watcher.stdout.readline()))
+
+    # everyone watches: start playing (the bots were idle so no match ended before)
+    for bot in bots:
+        bot.idle = False
+        bot._schedule_commit()
+    results = await asyncio.gather(*(bot.done for bot in bots))
+    if watcher is not None:
+        final_scores = {bot.match_id: [r[1], r[2]] for bot, r in zip(bots, results) if r[0] == "over"}
+        watcher.stdin.write((json.dumps(final_scores) + "\n").encode())
+        await watcher.stdin.drain()
+        result.update(json.loads(await watcher.stdout.readline()))
+        await watcher.wait()
+    result["finished_bots"] = sum(1 for r in results if r[0] == "over")
+    result["round_latency_ms"] = _percentiles(latencies)
+    return result
+
+
+def _check_gui_spectator(port: int) -> bool:
+    """A GUI SpectatorClient follows a match between two MatchClients to its end."""
+    players = [MatchClient("127.0.0.1", port), MatchClient("127.0.0.1", port)]
+    for player in players:
+        player.connect()
+    spectator = SpectatorClient("127.0.0.1", port)
+    seen = []
+    final = None
+    deadline = time.perf_counter() + 10.0
+    while final is None and time.perf_counter() < deadline:
+        for player in players:
+            player.poll()
+            if player.state == "playing" and player._pending_move is None:
+                player.submit_move(random.choice(["rock", "paper", "scissors"]))
+            result = player.pop_result()
+            if result is not None and result.game_over and player is players[0]:
+                final = result
+        if spectator.state == "closed" and players[0].state == "playing":
+            spectator.connect(players[0].match_id)
+        spectator.poll()
+        result = spectator.pop_result()
+        if result is not None:
+            seen.append(result)
+        time.sleep(0.001)
+    deadline = time.perf_counter() + 2.0
+    while final is not None and spectator.state != "over" and time.perf_counter() < deadline:
+        spectator.poll()
+        time.sleep(0.001)
+    seen += spectator.results
+    for client in players + [spectator]:
+        client.close()
+    if final is None or not seen:
+        return False
+    # the spectator sees the match from the first seat
+    mine = (final.my_score, final.opponent_score) if players[0].seat == 0 else (final.opponent_score, final.my_score)
+    return seen[-1].game_over and (seen[-1].my_score, seen[-1].opponent_score) == mine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=200, help="number of concurrent matches")
+    parser.add_argument("--viewers", type=int, default=10, help="spectators per match")
+    parser.add_argument("--lobbies", type=int, default=5, help="stalled spectators watching every match")
+    parser.add_argument("--watch", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    _raise_open_files_limit()
+    if args.watch:
+        asyncio.run(_watch(args.watch, json.loads(sys.stdin.readline()), args.viewers, args.lobbies))
+        return
+
+    runs = {}
+    for name, viewers, lobbies in (
+        ("baseline", 0, 0), ("stalled", 0, args.lobbies), ("spectated", args.viewers, args.lobbies)
+    ):
+        # the bots wait for the viewers before their first move
+        server, port = start_server(SPECTATOR_BUFFER, move_timeout=60.0)
+        try:
+            run = asyncio.run(_play(port, args.matches, viewers, lobbies))
+            if name == "spectated":
+                run["gui_spectator_ok"] = _check_gui_spectator(port)
+        finally:
+            stats = stop_server(server)
+        run["server"] = stats
+        runs[name] = run
+
+    baseline, stalled, result = runs["baseline"], runs["stalled"], runs["spectated"]
+    # CPU the server spent on each frame sent to a viewer
+    result["server_us_per_frame"] = (
+        (result["server"]["cpu_s"] - baseline["server"]["cpu_s"]) / max(1, result["frames_received"]) * 1e6
+    )
+    for name, run in runs.items():
+        latency = run["round_latency_ms"]
+        print(
+            f"{name}: {run['viewers']} viewers + {run['server']['spectators_dropped']} dropped lobbies, "
+            f"{run['frames_received']} frames received, round latency p50 {latency['p50']:.2f} ms | "
+            f"p99 {latency['p99']:.2f} ms, server CPU {run['server']['cpu_s']:.2f} s"
+        )
+    print(f"fan-out: {result['server_us_per_frame']:.1f} us of server CPU per frame delivered")
+    print(json.dumps(runs))
+    ok = (
+        all(run["finished_bots"] == 2 * args.matches for run in runs.values())
+        and result["viewer_scores_ok"]
+        and stalled["stalled_dropped"] == result["stalled_dropped"] == args.lobbies
+        and stalled["server"]["spectators_dropped"] == args.lobbies
+        # stalled spectators must not slow the matches down
+        and stalled["round_latency_ms"]["p99"] <= 2 * baseline["round_latency_ms"]["p99"] + 20.0
+        and result["gui_spectator_ok"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
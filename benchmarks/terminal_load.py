@@ -0,0 +1,180 @@
+"""Load generator for the TCP terminal game server.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.terminal_load [--sessions N] [--concurrency C] [--pvp] [--host HOST --port PORT]
+
+Without --port an in-process server is started on a free localhost port (no countdown
+between rounds). Every client plays full games like a player would: it waits for each
+prompt before answering and measures the time between an answer and the next prompt.
+With --pvp clients are paired two by two, otherwise they play against the computer.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from src.scripts.terminal_version.terminal_server.terminal_server import TerminalServer
+
+MODE_PROMPT = b"(machine/player): "
+MOVE_PROMPT = b"rock, paper, or scissors: "
+GAME_OVER = b"Game over!"
+GAME_STOPPED = b"Game stopped."
+MOVES = [b"r", b"p", b"s", b"rock", b"paper", b"scissors"]
+
+
+class _Client:
+    """One scripted player connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.buffer = b""
+
+    async def read_until_prompt(self, prompt: bytes, end_markers=()) -> bool:
+        """
+        Read until the server waits on `prompt` (True) or one of `end_markers` shows up (False).
+
+        The prompt only counts at the end of what was received: redrawn lines of the screen
+        may contain the same text.
+        """
+        while True:
+            if any(marker in self.buffer for marker in end_markers):
+                return False
+            if self.buffer.endswith(prompt):
+                self.buffer = b""
+                return True
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError("connection closed by the server")
+            self.buffer += data
+
+    def send(self, line: bytes):
+        self.writer.write(line + b"\r\n")
+
+
+async def _play(host: str, port: int, mode: bytes, latencies: list) -> int:
+    """Play one game; returns the number of moves sent."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    client = _Client(reader, writer)
+    moves = 0
+    try:
+        await client.read_until_prompt(MODE_PROMPT)
+        latencies.append(time.perf_counter() - start)
+        client.send(mode)
+        while True:
+            sent = time.perf_counter()
+            prompted = await client.read_until_prompt(MOVE_PROMPT, (GAME_OVER, GAME_STOPPED))
+            latencies.append(time.perf_counter() - sent)
+            if not prompted:
+                return moves
+            client.send(random.choice(MOVES))
+            moves += 1
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def _run(host: str, port: int, sessions: int, concurrency: int, pvp: bool) -> dict:
+    latencies: list[float] = []
+    failures = 0
+    moves = 0
+    # a player waiting for an opponent keeps its slot, at least two are needed to pair
+    semaphore = asyncio.Semaphore(max(2, concurrency))
+    mode = b"p" if pvp else b"m"
+    if pvp:
+        sessions -= sessions % 2
+
+    async def _one():
+        nonlocal failures, moves
+        async with semaphore:
+            try:
+                played = await _play(host, port, mode, latencies)
+            except (ConnectionError, OSError):
+                failures += 1
+            else:
+                moves += played
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def _percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0 if latencies else 0.0
+
+    return {
+        "sessions": sessions,
+        "failures": failures,
+        "seconds": elapsed,
+        "sessions_per_s": sessions / elapsed if elapsed else float("inf"),
+        "moves_per_s": moves / elapsed if elapsed else float("inf"),
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000.0 if latencies else 0.0,
+            "p50": _percentile(0.50),
+            "p95": _percentile(0.95),
+            "p99": _percentile(0.99),
+            "max": latencies[-1] * 1000.0 if latencies else 0.0,
+        },
+    }
+
+
+async def _run_with_local_server(sessions: int, concurrency: int, pvp: bool) -> dict:
+    server = TerminalServer(port=0, countdown=0)
+    await server.start()
+    try:
+        return await _run(server.host, server.port, sessions, concurrency, pvp)
+    finally:
+        await server.close()
+
+
+def _raise_open_files_limit():
+    """Allow as many sockets as the hard limit permits (each local session uses two)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="number of games to play")
+    parser.add_argument("--concurrency", type=int, default=1000, help="connections open at the same time")
+    parser.add_argument("--pvp", action="store_true", help="pair the clients instead of playing the computer")
+    parser.add_argument("--host", default="127.0.0.1", help="server address (with --port)")
+    parser.add_argument("--port", type=int, default=None, help="port of a running server (default: start one)")
+    args = parser.parse_args()
+
+    _raise_open_files_limit()
+    if args.port is None:
+        result = asyncio.run(_run_with_local_server(args.sessions, args.concurrency, args.pvp))
+    else:
+        result = asyncio.run(_run(args.host, args.port, args.sessions, args.concurrency, args.pvp))
+
+    latency = result["latency_ms"]
+    print(
+        f"{result['sessions']} sessions in {result['seconds']:.2f} s: {result['sessions_per_s']:.0f} sessions/s, "
+        f"{result['moves_per_s']:.0f} moves/s, {result['failures']} failures"
+    )
+    print(
+        f"prompt latency: mean {latency['mean']:.2f} ms | p50 {latency['p50']:.2f} ms | "
+        f"p95 {latency['p95']:.2f} ms | p99 {latency['p99']:.2f} ms | max {latency['max']:.2f} ms"
+    )
+    print(json.dumps(result))
+    if result["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark and self-check of many concurrent terminal game sessions in one event loop.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.terminal_sessions [--sessions N]
+
+Every session plays a full player vs player game over in-memory streams:
+- the first player always wins, so each game ends 3-0 after three rounds
+- a few extra sessions never answer and check that the per-move timeout ends their rounds
+- all the sessions run concurrently in a single thread, the countdowns are cancellable coroutines
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from src.scripts.terminal_version.terminal_session.terminal_session import TerminalSession
+
+# mode choice, then three rounds won by the first player (shortcut and full words)
+SCRIPTED_GAME = b"p\n" + b"r\nscissors\n" * 2 + b"paper\nrock\n"
+
+
+class MemoryWriter:
+    """In-memory writer with the asyncio.StreamWriter interface used by the sessions."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes):
+        self.chunks.append(data)
+
+    async def drain(self):
+        # give the other sessions a turn, as a real stream would when its buffer is full
+        await asyncio.sleep(0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def text(self) -> str:
+        return b"".join(self.chunks).decode("utf-8")
+
+
+def _scripted_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def _run(sessions: int, countdown: float, timeout_sessions: int, move_timeout: float) -> dict:
+    writers = [MemoryWriter() for _ in range(sessions)]
+    games = [
+        TerminalSession(_scripted_reader(SCRIPTED_GAME), writer, size=(120, 40), countdown=countdown).run()
+        for writer in writers
+    ]
+    # sessions whose players never answer: every round is lost on time
+    idle_readers = [asyncio.StreamReader() for _ in range(timeout_sessions)]
+    for reader in idle_readers:
+        reader.feed_data(b"m\n")
+    idle_writers = [MemoryWriter() for _ in range(timeout_sessions)]
+    idle_games = [
+        TerminalSession(reader, writer, size=(120, 40), move_timeout=move_timeout, countdown=0).run()
+        for reader, writer in zip(idle_readers, idle_writers)
+    ]
+
+    threads_before = threading.active_count()
+    start = time.perf_counter()
+    results = await asyncio.gather(*games, *idle_games)
+    elapsed = time.perf_counter() - start
+
+    scores, idle_scores = results[:sessions], results[sessions:]
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "sessions_per_s": sessions / elapsed if elapsed else float("inf"),
+        "bytes_per_session": sum(w.nbytes for w in writers) / max(1, sessions),
+        "threads_added": threading.active_count() - threads_before,
+        "finished_3_0": sum(1 for s in scores if s == [3, 0]),
+        "game_over_shown": sum(1 for w in writers if "Game over!" in w.text()),
+        "timed_out_0_3": sum(1 for s in idle_scores if s == [0, 3]),
+        "timeout_sessions": timeout_sessions,
+    }
+
+
+def run(sessions: int = 1000, countdown: float = 0.5, timeout_sessions: int = 10, move_timeout: float = 0.05) -> dict:
+    """Run the sessions and return the timings and checks."""
+    return asyncio.run(_run(sessions, countdown, timeout_sessions, move_timeout))
+
+
+async def _check_cancelled_countdown() -> bool:
+    """A cancelled countdown stops immediately and still clears its line."""
+    writer = MemoryWriter()
+    session = TerminalSession(_scripted_reader(b""), writer, size=(80, 24))
+    task = asyncio.create_task(session.play_countdown("Restarting {}", 60))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return time.perf_counter() - start < 0.05 and writer.text().endswith(" " * len("Restarting ...") + "\r")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000, help="number of concurrent sessions")
+    parser.add_argument("--countdown", type=float, default=0.5, help="countdown between rounds in seconds")
+    args = parser.parse_args()
+
+    result = run(args.sessions, args.countdown)
+    result["cancelled_countdown_ok"] = asyncio.run(_check_cancelled_countdown())
+    print(
+        f"{result['sessions']} sessions in {result['seconds']:.2f} s ({result['sessions_per_s']:.0f} sessions/s), "
+        f"~{result['bytes_per_session'] / 1024:.1f} KiB written per session, {result['threads_added']} extra threads"
+    )
+    print(json.dumps(result))
+
+    ok = (
+        result["finished_3_0"] == result["sessions"]
+        and result["game_over_shown"] == result["sessions"]
+        and result["timed_out_0_3"] == result["timeout_sessions"]
+        and result["threads_added"] == 0
+        and result["cancelled_countdown_ok"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
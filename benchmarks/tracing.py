@@ -0,0 +1,233 @@
+"""Benchmark of the trace recording (RPS_TRACE): its cost and the trace it writes.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.tracing [--frames N]
+
+Runs in a fresh (headless if needed) process with RPS_TRACE set:
+- GUI: the shader sources are loaded by an AssetManager, the background shader is compiled,
+  and the main menu changes to a GameMenu (filling its sprite caches), then N frames are
+  drawn like the main loop of `start_gui_game` draws them; the trace is flushed here like
+  the F4 key does
+- terminal: a TerminalSession plays a round against the computer over in-memory streams
+  (prompts and countdown) and an animation plays on the animation scheduler; this part is
+  only written by the flush on exit
+- ring buffer: threads recording at once into a small tracer must keep its last `capacity`
+  events, the latest of each thread without a gap
+- cost: a span of a disabled tracer (must stay under MAX_DISABLED_NS) and of an enabled one
+
+Both trace files must be valid Chrome traces holding the expected spans.
+"""
+
+import argparse
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+MAX_DISABLED_NS = 1000.0
+RING_CAPACITY = 1000
+RING_THREADS = 4
+RING_EVENTS = 2000  # per thread
+
+
+def _child(frames: int, flush_path: str):
+    """Record a GUI and a terminal session and print the measures as JSON (the trace is written on exit)."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import asyncio
+    import threading
+    import types
+    import pygame
+    from OpenGL.GL import glFinish
+    from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
+    from src.scripts.gui_version.frame_profiler.frame_profiler import get_frame_profiler
+    from src.scripts.gui_version.game_state_manager.game_state_manager import PooledFactory, StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
+    from src.scripts.terminal_version.terminal_session.terminal_session import TerminalSession
+    from src.scripts.terminal_version.terminal_utils.terminal_utils import print_animation
+    from src.scripts.tracing.tracing import Tracer, get_tracer
+
+    tracer = get_tracer()
+    size = (640, 360)
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.OPENGL | pygame.DOUBLEBUF)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    assets = AssetManager()
+    assets.load_text("shaders/main_menu_background.vert", shaders_folder / "main_menu_background.vert")
+    assets.load_text("shaders/main_menu_background.frag", shaders_folder / "main_menu_background.frag")
+    assets.wait()
+    assets.shutdown()
+    bg = GPUBackground(*size, assets.get("shaders/main_menu_background.vert"), assets.get("shaders/main_menu_background.frag"))
+    manager = StateManager(None)
+    manager.change(PooledFactory(MainMenu.POOL_KEY, lambda mgr: MainMenu(mgr, screen, bg)))
+    manager.change(PooledFactory(GameMenu.pool_key(True), lambda mgr: GameMenu(mgr, screen, bg)))
+
+    profiler = get_frame_profiler()
+    for _ in range(frames):
+        profiler.begin_frame()
+        with profiler.phase("events"):
+            events = pygame.event.get()
+            manager.handle_event(events)
+        with profiler.phase("update"):
+            manager.update(1 / 60)
+        with profiler.phase("draw"):
+            manager.draw(screen)
+        with profiler.phase("flip"):
+            glFinish()
+            pygame.display.flip()
+        profiler.end_frame()
+    # what the F4 key does
+    flushed = tracer.flush(flush_path)
+
+    class _Writer:
+        def write(self, data: bytes):
+            pass
+
+        async def drain(self):
+            pass
+
+    async def play_terminal():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"m\nrock\nstop\n")
+        reader.feed_eof()
+        # the computer plays scissors: the round is won and the countdown plays
+        rng = types.SimpleNamespace(choice=lambda moves: "scissors")
+        await TerminalSession(reader, _Writer(), size=(80, 24), countdown=0.3, rng=rng).run()
+
+    asyncio.run(play_terminal())
+    print_animation("{}", 0.3, update_interval=0.05)
+
+    # several threads writing into a small ring at once
+    ring = Tracer("unused", capacity=RING_CAPACITY)
+
+    def write_events(thread: int):
+        for index in range(RING_EVENTS):
+            ring.instant("event", "ring", {"thread": thread, "index": index})
+
+    threads = [threading.Thread(target=write_events, args=(thread,)) for thread in range(RING_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ring_events = [event for event in ring.events() if event["ph"] == "i"]
+    kept = {}
+    for event in ring_events:
+        kept.setdefault(event["args"]["thread"], []).append(event["args"]["index"])
+    # the events kept of a thread must be its latest ones, without a gap
+    ring_lost = sum(RING_EVENTS - min(indices) - len(set(indices)) for indices in kept.values())
+
+    def span_ns(span_tracer: Tracer) -> float:
+        calls = 200_000
+        start = time.perf_counter()
+        for _ in range(calls):
+            with span_tracer.span("span", "cost"):
+                pass
+        return (time.perf_counter() - start) / calls * 1e9
+
+    disabled_ns = span_ns(Tracer())
+    enabled_ns = span_ns(Tracer("unused", capacity=RING_CAPACITY))
+
+    print(json.dumps({
+        "flushed": str(flushed),
+        "ring_events": len(ring_events),
+        "ring_lost": ring_lost,
+        "disabled_ns": disabled_ns,
+        "enabled_ns": enabled_ns,
+    }))
+    pygame.quit()
+
+
+def _check_trace(path: pathlib.Path, expected: dict) -> tuple:
+    """(problems, event count, thread names) of the trace at `path` ({name: category} of the spans it must hold)."""
+    try:
+        trace = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        return [f"{path.name}: unreadable ({e})"], 0, set()
+    events = trace.get("traceEvents", [])
+    problems = []
+    names = {(event["name"], event.get("cat")) for event in events}
+    for name, category in expected.items():
+        if (name, category) not in names:
+            problems.append(f"{path.name}: no '{name}' ({category}) event")
+    # async spans: every begin ends, in order, per id
+    open_spans = {}
+    for event in sorted((event for event in events if event["ph"] in "be"), key=lambda event: event["ts"]):
+        stack = open_spans.setdefault(event["id"], [])
+        if event["ph"] == "b":
+            stack.append(event["name"])
+        elif not stack or stack.pop() != event["name"]:
+            problems.append(f"{path.name}: async span '{event['name']}' ends without its begin")
+    problems += [f"{path.name}: async span '{name}' never ends" for stack in open_spans.values() for name in stack]
+    if any(event["ph"] == "X" and event["dur"] < 0 for event in events):
+        problems.append(f"{path.name}: negative duration")
+    threads = {event["args"]["name"] for event in events if event["name"] == "thread_name"}
+    return problems, len(events), threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="frames drawn in the GUI part")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames, args.child)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-tracing-") as cache_dir:
+        exit_path = pathlib.Path(cache_dir) / "exit.json"
+        flush_path = pathlib.Path(cache_dir) / "hotkey.json"
+        env = _headless_env(cache_dir)
+        env.pop("RPS_PROFILE_CSV", None)
+        env["RPS_TRACE"] = str(exit_path)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.tracing", "--child", str(flush_path), "--frames", str(args.frames)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        gui_spans = {
+            "StateManager.change": "state",
+            "GameMenu sprite caches": "assets",
+            "shaders/main_menu_background.frag": "assets",
+            "finish shaders/main_menu_background.frag": "assets",
+            "GPUBackground._create_shader": "shader",
+            "frame": "frame",
+            "draw": "frame",
+            "background": "frame",
+            "flip": "frame",
+        }
+        terminal_spans = {"session": "terminal", "prompt": "terminal", "countdown": "terminal",
+                          "print_animation.<locals>._draw_frame": "animation"}
+        hotkey_problems, hotkey_events, _ = _check_trace(flush_path, gui_spans)
+        exit_problems, exit_events, threads = _check_trace(exit_path, {**gui_spans, **terminal_spans})
+
+    problems = hotkey_problems + exit_problems
+    print(f"trace flushed by the hotkey: {hotkey_events} events; on exit: {exit_events} events")
+    print(f"threads of the trace: {', '.join(sorted(threads))}")
+    print(
+        f"ring of {RING_CAPACITY}: {result['ring_events']} events kept out of {RING_THREADS} x {RING_EVENTS}, "
+        f"{result['ring_lost']} missing among the latest"
+    )
+    print(f"span: {result['disabled_ns']:.0f} ns disabled, {result['enabled_ns']:.0f} ns recording")
+    for problem in problems:
+        print(problem)
+
+    ok = (
+        not problems
+        and result["flushed"] == str(flush_path)
+        and result["ring_events"] == RING_CAPACITY
+        and result["ring_lost"] == 0
+        and result["disabled_ns"] <= MAX_DISABLED_NS
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark of the UI surface shared by the menus: clearing, partial uploads and resizing.
+
+Usage (from the root folder of the project):
+    py -m benchmarks.ui_surfaces [--frames N]
+
+Runs in a fresh (headless if needed) process the main menu, the game mode choice, a GameMenu
+against the computer (the choice is locked in halfway, so the hands move through the round
+animation) and the main menu again, N frames each with the selection moving every few
+frames, then the window is resized and the main menu drawn N more frames. Every frame:
+- the UI surface handed out must be fully transparent (what the previous frame, or menu,
+  drew was cleared)
+- after the draw, the UI texture must hold the pixels of the surface (the changed rects were
+  uploaded)
+- the surface must be the same object, except once after the resize
+
+The bytes uploaded per frame are printed, and the time taken to hand out the surface (the
+clear of the regions a menu draws, scaled to a 4K window) is compared with the allocation of
+a new 4K surface, which it must beat.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.shader_startup import REPO_ROOT, _headless_env
+
+SIZE = (640, 360)
+RESIZED = (800, 450)
+SIZE_4K = (3840, 2160)
+# frames between two selection moves
+MOVE_FRAMES = 3
+
+
+def _child(frames: int):
+    """Draw the menus, check the UI surface every frame and print the measures as JSON."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import timeit
+    import pygame
+    from OpenGL.GL import GL_RGBA, GL_TEXTURE_2D, GL_UNSIGNED_BYTE, glBindTexture, glGetTexImage
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.gpu_resources.gpu_resources import get_gpu_resources
+    from src.scripts.gui_version.gui_utils import gui_utils
+    from src.scripts.gui_version.menus.chose_gamemode_menu.chose_gamemode_menu import ChoseGameModeMenu
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
+
+    pygame.init()
+    flags = pygame.OPENGL | pygame.DOUBLEBUF
+    screen = pygame.display.set_mode(SIZE, flags)
+    shaders_folder = REPO_ROOT / "src" / "assets" / "shaders"
+    bg = GPUBackground(
+        *SIZE,
+        (shaders_folder / "main_menu_background.vert").read_text(encoding="utf-8"),
+        (shaders_folder / "main_menu_background.frag").read_text(encoding="utf-8"),
+    )
+    gpu_resources = get_gpu_resources()
+    pool = gui_utils.PyGameMenu.ui_surfaces
+    manager = StateManager(None)
+    main_menu = MainMenu(manager, screen, bg)
+    sequence = [
+        (main_menu, "selected_index", None),
+        (ChoseGameModeMenu(manager, screen, bg), "selected_index", None),
+        (GameMenu(manager, screen, bg), "player1_menu_index", pygame.K_RETURN),
+        (main_menu, "selected_index", None),
+    ]
+
+    surfaces = []
+    not_cleared = 0
+    mismatches = 0
+    uploaded = []
+    menu_dirty = []
+
+    def run_frame(menu, index_name: str, frame: int):
+        nonlocal not_cleared, mismatches
+        surface = pool.get(screen.get_size())
+        if surface not in surfaces:
+            surfaces.append(surface)
+        if surface.get_buffer().raw.strip(b"\0"):
+            not_cleared += 1
+        if frame % MOVE_FRAMES == 0:
+            setattr(menu, index_name, (getattr(menu, index_name) + 1) % 3)
+        manager.update(1 / 60)
+        before = gpu_resources.uploaded_bytes
+        manager.draw(screen)
+        uploaded.append(gpu_resources.uploaded_bytes - before)
+        if menu is main_menu and not menu_dirty:
+            menu_dirty.extend(pygame.Rect(rect) for rect in surface.dirty)
+        glBindTexture(GL_TEXTURE_2D, gui_utils._get_ui_quad().texture)
+        if glGetTexImage(GL_TEXTURE_2D, 0, GL_RGBA, GL_UNSIGNED_BYTE) != pygame.image.tostring(surface, "RGBA", True):
+            mismatches += 1
+        pygame.display.flip()
+
+    for menu, index_name, lock_in in sequence:
+        manager.current_state = menu
+        menu.reset()
+        for frame in range(frames):
+            if lock_in is not None and frame == frames // 2:
+                manager.handle_event([pygame.event.Event(pygame.KEYDOWN, key=lock_in)])
+            run_frame(menu, index_name, frame)
+    surfaces_before_resize = len(surfaces)
+
+    # what _apply_window_size does
+    pygame.display.set_mode(RESIZED, flags)
+    # the offscreen driver keeps the old size on the display surface of a GL window, the
+    # menus only take the size of the surface they are given
+    screen = pygame.Surface(RESIZED)
+    gpu_resources.resize(*RESIZED)
+    manager.update_size(*RESIZED)
+    manager.current_state = main_menu
+    for frame in range(frames):
+        run_frame(main_menu, "selected_index", frame)
+
+    # handing out the surface at 4K (the regions of the main menu scaled up) against a new surface
+    scale = SIZE_4K[0] // SIZE[0]
+    large_pool = gui_utils._UISurfacePool()
+    large_pool.get(SIZE_4K)
+
+    def reuse():
+        surface = large_pool.get(SIZE_4K)
+        for rect in menu_dirty:
+            surface.mark(pygame.Rect(rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale))
+
+    reuse_ms = min(timeit.repeat(reuse, number=20, repeat=5)) / 20 * 1000.0
+    allocate_ms = min(timeit.repeat(lambda: pygame.Surface(SIZE_4K, pygame.SRCALPHA), number=20, repeat=5)) / 20 * 1000.0
+
+    print(json.dumps({
+        "frames": len(uploaded),
+        "surfaces_before_resize": surfaces_before_resize,
+        "surfaces": len(surfaces),
+        "last_size": list(surfaces[-1].get_size()),
+        "not_cleared": not_cleared,
+        "mismatches": mismatches,
+        "uploaded_kib_mean": sum(uploaded) / len(uploaded) / 1024.0,
+        "uploaded_kib_max": max(uploaded) / 1024.0,
+        "full_kib": SIZE[0] * SIZE[1] * 4 / 1024.0,
+        "reuse_4k_ms": reuse_ms,
+        "allocate_4k_ms": allocate_ms,
+    }))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60, help="frames drawn per menu")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.frames)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rps-ui-surfaces-") as cache_dir:
+        env = _headless_env(cache_dir)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.ui_surfaces", "--child", "--frames", str(args.frames)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{result['frames']} frames: {result['not_cleared']} surfaces handed out not transparent, "
+          f"{result['mismatches']} UI textures different from their surface")
+    print(f"surfaces: {result['surfaces_before_resize']} before the resize, {result['surfaces']} in total "
+          f"(last {result['last_size'][0]}x{result['last_size'][1]})")
+    print(f"uploads: {result['uploaded_kib_mean']:.1f} KiB per frame on average, {result['uploaded_kib_max']:.1f} at most "
+          f"(full window {result['full_kib']:.1f} KiB)")
+    print(f"4K UI surface: {result['reuse_4k_ms']:.3f} ms reused and cleared, "
+          f"{result['allocate_4k_ms']:.3f} ms allocated")
+
+    ok = (
+        result["not_cleared"] == 0
+        and result["mismatches"] == 0
+        and result["surfaces_before_resize"] == 1
+        and result["surfaces"] == 2
+        and tuple(result["last_size"]) == RESIZED
+        and result["uploaded_kib_max"] <= result["full_kib"] * (RESIZED[0] * RESIZED[1]) / (SIZE[0] * SIZE[1])
+        and result["reuse_4k_ms"] < result["allocate_4k_ms"]
+    )
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,10 @@ uniform float pixel_filter = 740.0;
 uniform bool is_rotating = false;
 
 #define SPIN_EASE 1.0
+// Warp iterations, lowered by the cheaper quality tiers (defined before compiling)
+#ifndef WARP_ITERATIONS
+#define WARP_ITERATIONS 5
+#endif
 
 void main() {
     vec2 screenSize = iResolution;
@@ -40,7 +44,7 @@ void main() {
     speed = iTime * move_speed;
     vec2 uv2 = vec2(uvn.x + uvn.y);
 
-    for (int i = 0; i < 5; i++) {
+    for (int i = 0; i < WARP_ITERATIONS; i++) {
         uv2 += sin(max(uvn.x, uvn.y)) + uvn;
         uvn += 0.5 * vec2(cos(5.1123314 + 0.353 * uv2.y + speed * 0.131121), sin(uv2.x - 0.113 * speed));
         uvn -= 1.0 * cos(uvn.x + uvn.y) - 1.0 * sin(uvn.x * 0.711 - uvn.y);
@@ -1,7 +1,8 @@
 """Bootstraps the Rock-Paper-Scissors game by starting the desired version (terminal or GUI)."""
 
 from src.scripts.terminal_version.terminal_game.terminal_game import start_terminal_game
-from src.scripts.gui_version.gui_game.gui_game import start_gui_game
+from src.scripts.gui_version.gui_game.gui_game import start_gui_game, queue_gui_assets
+from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
 from src.scripts.terminal_version.terminal_utils.terminal_utils import get_input, clear_cmd, print_animation
 
 
@@ -20,8 +21,11 @@ def start_game():
                 start_terminal_game()
                 break
             if user_input == "gui" or user_input == "g":
+                # Start reading and decoding the GUI assets while the animation plays
+                assets = AssetManager()
+                queue_gui_assets(assets)
                 print_animation("Starting GUI version {}", 2)
-                start_gui_game()
+                start_gui_game(assets)
                 break
             print("Invalid input. Please enter 'terminal' or 'gui'.")
         elif user_input == "quit" or user_input == "q":
@@ -0,0 +1,34 @@
+"""Module with the Rock-Paper-Scissors rules shared by the GUI, the terminal and the network versions."""
+
+MOVES = ("rock", "paper", "scissors")
+
+# A match is won by the first player reaching this score
+WINNING_SCORE = 3
+
+# move -> the move it beats
+WINNING_COMBINATIONS = {
+    "rock": "scissors",
+    "scissors": "paper",
+    "paper": "rock",
+}
+
+
+def round_winner(move1: str, move2: str) -> int:
+    """
+    Determine the winner of a round.
+
+    Returns:
+        0 if it's a tie,
+        1 if player 1 wins,
+        2 if player 2 wins.
+    """
+    if move1 == move2:
+        return 0
+    if WINNING_COMBINATIONS[move1] == move2:
+        return 1
+    return 2
+
+
+def is_match_over(scores) -> bool:
+    """Check if a player reached the winning score."""
+    return scores[0] >= WINNING_SCORE or scores[1] >= WINNING_SCORE
@@ -0,0 +1,152 @@
+"""Module to preload the GUI assets in the background."""
+
+import io
+import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Iterable, Optional
+
+import pygame
+
+from src.scripts.tracing.tracing import get_tracer
+
+
+class _AssetJob:
+    """A single asset being loaded.
+
+    The `future` (if any) runs on a worker thread, `finalize` runs on the main thread
+    once the future and every required asset are ready.
+    """
+
+    def __init__(self, name: str, future: Optional[Future], finalize: Callable, requires: Iterable[str] = ()):
+        self.name = name
+        self.future = future
+        self.finalize = finalize
+        self.requires = tuple(requires)
+
+
+class AssetManager:
+    """Class to load assets on worker threads and finish them on the main thread.
+
+    File reading and PNG decoding happen on a thread pool as soon as a load is queued.
+    Anything touching the display or the GL context (surface conversion, shader
+    compilation, texture uploads...) is deferred to `process`, which is called once per
+    frame on the main thread and only spends a small time budget each call.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rps-assets")
+        self._pending: list[_AssetJob] = []
+        self._assets: dict[str, Any] = {}
+        self._errors: dict[str, BaseException] = {}
+        self._total = 0
+
+    def _submit(self, name: str, func: Callable, *args, **kwargs) -> Future:
+        """Run `func` on a worker thread (traced as a span of that thread)."""
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return self._executor.submit(func, *args, **kwargs)
+
+        def _traced():
+            with tracer.span(name, "assets"):
+                return func(*args, **kwargs)
+        return self._executor.submit(_traced)
+
+    def _add_job(self, job: _AssetJob):
+        self._pending.append(job)
+        self._total += 1
+
+    def load_text(self, name: str, path: pathlib.Path):
+        """Read a text file (e.g. a shader source) on a worker thread."""
+        future = self._submit(name, pathlib.Path(path).read_text, encoding="utf-8")
+        self._add_job(_AssetJob(name, future, lambda text: text))
+
+    def load_image(self, name: str, path: pathlib.Path, scale_divisor: Optional[float] = None):
+        """Read and decode a PNG on a worker thread, then convert it for blitting on the main thread.
+
+        If `scale_divisor` is given the image is also downscaled on the worker thread.
+        """
+        def _decode():
+            path_ = pathlib.Path(path)
+            surf = pygame.image.load(io.BytesIO(path_.read_bytes()), path_.name)
+            if scale_divisor is not None:
+                surf = pygame.transform.scale(
+                    surf, (surf.get_width() // scale_divisor, surf.get_height() // scale_divisor)
+                )
+            return surf
+
+        future = self._submit(name, _decode)
+        # convert_alpha needs the display mode to be set, so it must happen on the main thread
+        self._add_job(_AssetJob(name, future, lambda surf: surf.convert_alpha()))
+
+    def run_in_background(self, name: str, func: Callable[[], Any]):
+        """Run an arbitrary (thread safe) function on a worker thread and store its result."""
+        future = self._submit(name, func)
+        self._add_job(_AssetJob(name, future, lambda result: result))
+
+    def add_main_thread_task(self, name: str, func: Callable[["AssetManager"], Any], requires: Iterable[str] = ()):
+        """Run `func(self)` on the main thread once every asset in `requires` is loaded.
+
+        Used for GL work (shader compilation, uploads) that cannot leave the main thread.
+        """
+        self._add_job(_AssetJob(name, None, func, requires))
+
+    def _is_ready(self, job: _AssetJob) -> bool:
+        if job.future is not None and not job.future.done():
+            return False
+        return all(req in self._assets or req in self._errors for req in job.requires)
+
+    def process(self, budget_ms: float = 4.0) -> bool:
+        """Finish ready assets on the main thread for at most `budget_ms` milliseconds.
+
+        At least one ready asset is finished per call so loading always progresses.
+
+        Returns:
+            True once every queued asset is loaded.
+        """
+        start = time.perf_counter()
+        tracer = get_tracer()
+        for job in list(self._pending):
+            if not self._is_ready(job):
+                continue
+            self._pending.remove(job)
+            try:
+                with tracer.span(f"finish {job.name}", "assets"):
+                    if job.future is None:
+                        self._assets[job.name] = job.finalize(self)
+                    else:
+                        self._assets[job.name] = job.finalize(job.future.result())
+            except Exception as e:
+                print(f"Failed to load asset '{job.name}': {e}")
+                self._errors[job.name] = e
+            if (time.perf_counter() - start) * 1000.0 >= budget_ms:
+                break
+        return self.is_done
+
+    def wait(self):
+        """Block until every queued asset is loaded (no time budget)."""
+        while not self.process(budget_ms=float("inf")):
+            time.sleep(0.001)
+
+    @property
+    def is_done(self) -> bool:
+        """Whether every queued asset has been loaded (or failed to load)."""
+        return not self._pending
+
+    @property
+    def progress(self) -> float:
+        """Loading progress between 0.0 and 1.0."""
+        if self._total == 0:
+            return 1.0
+        return (self._total - len(self._pending)) / self._total
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Get a loaded asset by name."""
+        return self._assets.get(name, default)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._assets
+
+    def shutdown(self):
+        """Stop the worker threads (pending background loads are cancelled)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
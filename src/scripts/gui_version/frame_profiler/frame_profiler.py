@@ -0,0 +1,408 @@
+"""Module timing the phases of every frame of the GUI on the CPU and the GPU (overlay and CSV export)."""
+
+import contextlib
+import csv
+import math
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from src.scripts.gui_version.gpu_resources.gpu_resources import get_gpu_resources
+from src.scripts.gui_version.input_latency.input_latency import InputLatency, get_input_latency
+from src.scripts.gui_version.memory_profiler.memory_profiler import MemoryProfiler, get_memory_profiler
+from src.scripts.tracing.tracing import Tracer, get_tracer
+
+# Phases timed in the main loop and by the drawing code. "draw" contains "background"
+# and "upload", the UI composition of the menus is what is left of it.
+TIMED_PHASES = ("events", "update", "draw", "background", "upload", "flip")
+# Passes timed on the GPU with GL_TIME_ELAPSED queries
+GPU_PASSES = ("background", "ui")
+# Columns of the ring buffer and of the CSV rows (milliseconds, after the frame number). The
+# GPU columns hold the results read back during the frame (issued a few frames before),
+# NaN (an empty CSV cell) when none arrived.
+COLUMNS = ("total", "events", "update", "background", "ui", "upload", "flip", "other") + tuple(
+    "gpu_" + name for name in GPU_PASSES
+)
+# Queries of a GPU pass in flight: a pass is issued at most this many frames before its result
+# is read, a frame finding its query still pending skips the timing rather than waiting
+GPU_QUERY_FRAMES = 4
+# Frames kept for the rolling percentiles
+HISTORY_FRAMES = 600
+PERCENTILES = (50, 95, 99)
+# The overlay text is rebuilt (and uploaded) at most this often
+OVERLAY_REFRESH_MS = 250.0
+OVERLAY_MARGIN = 8
+OVERLAY_KEY = pygame.K_F3
+
+
+class _Phase:
+    """Context manager adding its duration to a phase of the current frame (nothing when disabled)."""
+
+    __slots__ = ("profiler", "name", "index", "start")
+
+    def __init__(self, profiler, name: str, index: int):
+        self.profiler = profiler
+        self.name = name
+        self.index = index
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.profiler.active:
+            if self.profiler.memory is not None:
+                self.profiler.memory.enter_phase(self.name)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler.active:
+            elapsed = time.perf_counter() - self.start
+            self.profiler._current[self.index] += elapsed
+            if self.profiler.tracer is not None:
+                self.profiler.tracer.complete(self.name, "frame", self.start, elapsed)
+            if self.profiler.memory is not None:
+                self.profiler.memory.exit_phase(self.name)
+        return False
+
+
+class _GPUPass:
+    """
+    Context manager timing the GL commands of a pass with a ring of GL_TIME_ELAPSED queries.
+
+    Results are only read once available (`collect`, once per frame), so the CPU never waits
+    for the GPU. Software rasterizers (llvmpipe) report only part of their work.
+    """
+
+    __slots__ = ("profiler", "timer", "index", "running")
+
+    def __init__(self, profiler, timer, index: int):
+        self.profiler = profiler
+        self.timer = timer
+        self.index = index
+        self.running = False
+
+    def __enter__(self):
+        if self.profiler.active:
+            self.running = self.timer.begin(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.running:
+            self.running = False
+            self.timer.end()
+        return False
+
+
+class _GPUTimer:
+    """Rings of GL_TIME_ELAPSED queries of the GPU passes (created on the first timed pass)."""
+
+    def __init__(self, passes: tuple, frames: int = GPU_QUERY_FRAMES):
+        self.passes = passes
+        self.frames = frames
+        self.available = True  # False without timer queries (before OpenGL 3.3)
+        self.skipped = 0  # timings skipped because the query of the slot was still pending
+        self.paused = 0  # see FrameProfiler.gpu_paused
+        self._registered = False
+        self.create_gl_resources()
+
+    def create_gl_resources(self):
+        """Forget the queries, they are created on the next pass."""
+        self.queries = None
+        # per pass and slot: whether a result is awaited
+        self.pending = [[False] * self.frames for _ in self.passes]
+        self.results = [float("nan")] * len(self.passes)
+        self._active = False
+
+    def release_gl_resources(self):
+        """Delete the queries."""
+        get_gpu_resources().release_owner(self)
+        self.create_gl_resources()
+
+    def begin(self, gpu_pass: _GPUPass) -> bool:
+        """Start the query of `gpu_pass` for this frame (False when it cannot be timed)."""
+        # one GL_TIME_ELAPSED query at a time: a nested pass is not timed
+        if not self.available or self.paused or self._active:
+            return False
+        if self.queries is None:
+            try:
+                gpu_resources = get_gpu_resources()
+                if not self._registered:
+                    gpu_resources.register(self)
+                    self._registered = True
+                self.queries = [
+                    [gpu_resources.gen_query(self, f"{name} timer") for _ in range(self.frames)] for name in self.passes
+                ]
+            except Exception:
+                self.available = False
+                return False
+        index = gpu_pass.index
+        slot = gpu_pass.profiler.frame % self.frames
+        if self.pending[index][slot]:
+            self.skipped += 1
+            return False
+        glBeginQuery(GL_TIME_ELAPSED, self.queries[index][slot])
+        self.pending[index][slot] = True
+        self._active = True
+        return True
+
+    def end(self):
+        glEndQuery(GL_TIME_ELAPSED)
+        self._active = False
+
+    def collect(self) -> list:
+        """Read the results that are available (milliseconds per pass, NaN when none arrived)."""
+        self.results = [float("nan")] * len(self.passes)
+        if self.queries is None:
+            return self.results
+        for index, queries in enumerate(self.queries):
+            pending = self.pending[index]
+            for slot, query in enumerate(queries):
+                if not pending[slot] or not glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE):
+                    continue
+                pending[slot] = False
+                # 32 bit results: nanoseconds of a pass are far below the 4 s they can hold
+                elapsed = int(glGetQueryObjectuiv(query, GL_QUERY_RESULT)) / 1e6
+                total = self.results[index]
+                self.results[index] = elapsed if math.isnan(total) else total + elapsed
+        return self.results
+
+
+class _ProfilerOverlay:
+    """Text panel drawn in the top left corner of the window with a framebuffer blit."""
+
+    def __init__(self):
+        self.font = None
+        self.create_gl_resources()
+        get_gpu_resources().register(self)
+
+    def create_gl_resources(self):
+        """Forget the panel texture, it is created on the next upload."""
+        self.texture = None
+        self.fbo = None
+        self.size = None
+
+    def release_gl_resources(self):
+        """Delete the panel texture and its framebuffer."""
+        get_gpu_resources().release_owner(self)
+        self.create_gl_resources()
+
+    def upload(self, lines: list):
+        """Render the lines of text into the panel texture."""
+        if self.font is None:
+            self.font = pygame.font.SysFont("consolas,couriernew,dejavusansmono,monospace", 14)
+        rendered = [self.font.render(line, True, (230, 230, 230)) for line in lines]
+        width = max(text.get_width() for text in rendered) + 2 * OVERLAY_MARGIN
+        height = sum(text.get_height() for text in rendered) + 2 * OVERLAY_MARGIN
+        panel = pygame.Surface((width, height))
+        panel.fill((16, 16, 24))
+        y = OVERLAY_MARGIN
+        for text in rendered:
+            panel.blit(text, (OVERLAY_MARGIN, y))
+            y += text.get_height()
+        pixels = pygame.image.tostring(panel, "RGBA", True)
+
+        gpu_resources = get_gpu_resources()
+        if self.texture is None:
+            self.texture = gpu_resources.gen_texture(self, "profiler overlay")
+            self.fbo = gpu_resources.gen_framebuffer(self, "profiler overlay")
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        if self.size != (width, height):
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            self.size = (width, height)
+            gpu_resources.set_texture_size(self.texture, width, height)
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        gpu_resources.record_upload(len(pixels))
+
+    def draw(self, window_height: int):
+        """Copy the panel to the top left corner of the window (a copy, no shader)."""
+        if self.size is None:
+            return
+        width, height = self.size
+        top = int(window_height) - OVERLAY_MARGIN
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        glBlitFramebuffer(0, 0, width, height, OVERLAY_MARGIN, top - height, OVERLAY_MARGIN + width, top,
+                          GL_COLOR_BUFFER_BIT, GL_NEAREST)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+
+class FrameProfiler:
+    """
+    Class timing the phases of every frame of the main loop.
+
+    - The main loop calls `begin_frame`/`end_frame` around the work of a frame (not the
+      sleep of `clock.tick`), and the timed code is wrapped in `with profiler.phase(name):`.
+    - The last HISTORY_FRAMES frames are kept in a ring buffer for the rolling percentiles
+      shown by the overlay (toggled with F3).
+    - The GL commands of the background and UI passes are timed on the GPU too, wrapped
+      in `with profiler.gpu_pass(name):`; their results arrive a few frames later.
+    - With RPS_PROFILE_CSV=<path>, one row per frame is written to a CSV file.
+    - With an enabled `tracer`, every frame and phase is also recorded as a trace span.
+    - With an enabled `memory` profiler, the memory allocated in every phase is accounted.
+    - With an `input_latency` measure, the overlay also shows its key press latencies.
+
+    Nothing is timed while the overlay is hidden, no CSV is written and nothing is traced: a
+    phase then only costs an attribute check.
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, history: int = HISTORY_FRAMES, tracer: Optional[Tracer] = None,
+                 memory: Optional[MemoryProfiler] = None, input_latency: Optional[InputLatency] = None):
+        self._phases = {name: _Phase(self, name, index) for index, name in enumerate(TIMED_PHASES)}
+        self.tracer = tracer if tracer is not None and tracer.enabled else None
+        self.memory = memory if memory is not None and memory.enabled else None
+        self.input_latency = input_latency
+        self.gpu_timer = _GPUTimer(GPU_PASSES)
+        self._gpu_passes = {name: _GPUPass(self, self.gpu_timer, index) for index, name in enumerate(GPU_PASSES)}
+        self._current = [0.0] * len(TIMED_PHASES)
+        self._frame_start = 0.0
+        self.frame = 0
+        self.history = np.zeros((history, len(COLUMNS)), dtype=np.float64)
+        self.count = 0  # frames written to the ring buffer
+        self.overlay_visible = False
+        self._overlay = None
+        self._overlay_refreshed = 0.0
+        self._csv_file = None
+        self._csv_writer = None
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(("frame",) + COLUMNS)
+        self._update_active()
+
+    def _update_active(self):
+        self.active = (
+            self.overlay_visible or self._csv_writer is not None or self.tracer is not None or self.memory is not None
+        )
+
+    def phase(self, name: str) -> _Phase:
+        """Context manager timing `name` (one of TIMED_PHASES) in the current frame."""
+        return self._phases[name]
+
+    def gpu_pass(self, name: str) -> _GPUPass:
+        """Context manager timing the GL commands of `name` (one of GPU_PASSES) on the GPU."""
+        return self._gpu_passes[name]
+
+    @contextlib.contextmanager
+    def gpu_paused(self):
+        """No GPU pass is timed inside (for code running its own GL_TIME_ELAPSED queries)."""
+        self.gpu_timer.paused += 1
+        try:
+            yield
+        finally:
+            self.gpu_timer.paused -= 1
+
+    def toggle_overlay(self):
+        """Show or hide the overlay (the percentiles start over when it is shown)."""
+        self.overlay_visible = not self.overlay_visible
+        if self.overlay_visible:
+            self.count = 0
+            self._overlay_refreshed = 0.0
+        self._update_active()
+
+    def begin_frame(self):
+        """Start timing a frame."""
+        self.frame += 1
+        if not self.active:
+            return
+        if self.memory is not None:
+            self.memory.begin_frame()
+        self._current = [0.0] * len(TIMED_PHASES)
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Store the phases of the frame in the ring buffer (and the CSV file)."""
+        if not self.active:
+            return
+        total = time.perf_counter() - self._frame_start
+        if self.tracer is not None:
+            self.tracer.complete("frame", "frame", self._frame_start, total, {"frame": self.frame})
+        events, update, draw, background, upload, flip = self._current
+        row = (
+            total, events, update, background, max(0.0, draw - background - upload), upload, flip,
+            max(0.0, total - events - update - draw - flip),
+        )
+        row = [value * 1000.0 for value in row]
+        try:
+            row += self.gpu_timer.collect()
+        except Exception:
+            self.gpu_timer.available = False
+            row += [math.nan] * len(GPU_PASSES)
+        self.history[self.count % len(self.history)] = row
+        self.count += 1
+        if self._csv_writer is not None:
+            self._csv_writer.writerow([self.frame] + ["" if math.isnan(value) else f"{value:.4f}" for value in row])
+        if self.memory is not None:
+            self.memory.end_frame()
+
+    def percentiles(self, q: tuple = PERCENTILES) -> dict:
+        """
+        {column: [percentile of the column for each of `q`]} over the frames of the ring buffer
+        (NaN for a GPU pass without results).
+        """
+        filled = self.history[:min(self.count, len(self.history))]
+        percentiles = {}
+        for index, name in enumerate(COLUMNS):
+            values = filled[:, index]
+            values = values[~np.isnan(values)]
+            percentiles[name] = [float(value) for value in np.percentile(values, q)] if len(values) else [math.nan] * len(q)
+        return percentiles
+
+    def overlay_lines(self) -> list:
+        """Text of the overlay: the percentiles of every phase (and of the key press latencies)."""
+        frames = min(self.count, len(self.history))
+        lines = [f"{'ms (' + str(frames) + ' frames)':<18}" + "".join(f"{'p' + str(q):>8}" for q in PERCENTILES)]
+        for name, values in self.percentiles().items():
+            lines.append(f"{name:<18}" + "".join(f"{'-':>8}" if math.isnan(value) else f"{value:8.2f}" for value in values))
+        if self.input_latency is not None:
+            lines += self.input_latency.overlay_lines()
+        return lines
+
+    def draw_overlay(self, window_height: int):
+        """Draw the overlay over the frame when it is visible (before the flip)."""
+        if not self.overlay_visible:
+            return
+        try:
+            if self._overlay is None:
+                self._overlay = _ProfilerOverlay()
+            now = time.perf_counter() * 1000.0
+            if now - self._overlay_refreshed >= OVERLAY_REFRESH_MS:
+                self._overlay_refreshed = now
+                self._overlay.upload(self.overlay_lines())
+            self._overlay.draw(window_height)
+        except Exception:
+            pass  # a debugging aid must never break the game
+
+    def close(self):
+        """Flush and close the CSV file."""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv_writer = None
+        self._update_active()
+
+
+_default_profiler = None
+
+
+def get_frame_profiler() -> FrameProfiler:
+    """
+    Return the frame profiler shared by the whole GUI (CSV export with RPS_PROFILE_CSV, traced
+    with RPS_TRACE, memory accounted with RPS_MEMORY_PROFILE, key press latencies in the overlay).
+    """
+    global _default_profiler
+    if _default_profiler is None:
+        _default_profiler = FrameProfiler(
+            os.environ.get("RPS_PROFILE_CSV") or None, tracer=get_tracer(), memory=get_memory_profiler(),
+            input_latency=get_input_latency(),
+        )
+    return _default_profiler
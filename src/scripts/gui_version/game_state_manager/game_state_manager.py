@@ -1,5 +1,10 @@
 """Module to manage different game states."""
 
+import time
+
+from src.scripts.gui_version.input_latency.input_latency import get_input_latency
+from src.scripts.tracing.tracing import get_tracer
+
 class State:
     """Base class for all game states."""
     def __init__(self, manager):
@@ -14,7 +19,34 @@ class State:
     def draw(self, screen):
         """Draw state to the screen."""
 
+    def reset(self):
+        """Reset the state to how it was right after construction (used when reusing a pooled instance)."""
+
+    def prefetch_hints(self):
+        """Return the factories of the states likely to come next, to build them ahead of time."""
+        return []
+
+    def input_state(self):
+        """Return what input changes on screen (compared around the events), None if unknown."""
+        return None
+
+    def release(self):
+        """Free the resources of a state that is discarded (not pooled)."""
+
+
+class PooledFactory:
+    """State factory whose instance is kept in the StateManager pool under `key`.
+
+    Changing to a pooled factory reuses (and resets) the existing instance instead of
+    building a new one each time.
+    """
 
+    def __init__(self, key, factory):
+        self.key = key
+        self.factory = factory
+
+    def __call__(self, manager):
+        return self.factory(manager)
 
 
 class StateManager:
@@ -22,14 +54,84 @@ class StateManager:
 
     def __init__(self, current_state):
         self.current_state = current_state
+        # key -> reusable state instance
+        self._pool = {}
+        # PooledFactory waiting to be built ahead of time
+        self._prefetch_queue = []
 
     def change(self, new_state):
-        """Change the current state."""
-        self.current_state = new_state(self)
+        """Change the current state.
+
+        `new_state` is a factory taking the manager; PooledFactory instances are reused.
+        """
+        start = time.perf_counter()
+        key = getattr(new_state, "key", None)
+        reused = key is not None and key in self._pool
+        if key is None:
+            state = new_state(self)
+        elif reused:
+            state = self._pool[key]
+            state.reset()
+        else:
+            state = new_state(self)
+            self._pool[key] = state
+        previous_state = self.current_state
+        self.current_state = state
+        # states that are not pooled will never be used again
+        if previous_state is not None and previous_state is not state and previous_state not in self._pool.values():
+            if hasattr(previous_state, "release"):
+                previous_state.release()
+        for hint in state.prefetch_hints() if hasattr(state, "prefetch_hints") else []:
+            self.prefetch(hint)
+        tracer = get_tracer()
+        if tracer.enabled:
+            tracer.complete(
+                "StateManager.change", "state", start, time.perf_counter() - start,
+                {
+                    "from": type(previous_state).__name__ if previous_state is not None else None,
+                    "to": type(state).__name__,
+                    "reused": reused,
+                },
+            )
+
+    def prefetch(self, factory: PooledFactory):
+        """Queue a pooled state to be built ahead of time (see `process_prefetch`)."""
+        if factory.key in self._pool or any(f.key == factory.key for f in self._prefetch_queue):
+            return
+        self._prefetch_queue.append(factory)
+
+    def process_prefetch(self, budget_ms: float = 2.0):
+        """Build queued states during the idle time left in a frame.
+
+        Called by the main loop after presenting a frame. States are built on the main
+        thread (they create fonts and surfaces) but at most one per call past the budget.
+        """
+        start = time.perf_counter()
+        while self._prefetch_queue:
+            factory = self._prefetch_queue.pop(0)
+            if factory.key not in self._pool:
+                with get_tracer().span("StateManager.prefetch", "state", {"key": str(factory.key)}):
+                    self._pool[factory.key] = factory(self)
+            if (time.perf_counter() - start) * 1000.0 >= budget_ms:
+                break
+
+    def release_all(self):
+        """Release the current state and every pooled state (on shutdown)."""
+        states = [self.current_state] + [s for s in self._pool.values() if s is not self.current_state]
+        for state in states:
+            if state is not None and hasattr(state, "release"):
+                state.release()
+        self._pool.clear()
+        self._prefetch_queue.clear()
 
     def handle_event(self, events):
-        """Handle events for the current state."""
-        self.current_state.handle_event(events)
+        """Handle events for the current state (and tag the key presses that change what it shows)."""
+        state = self.current_state
+        latency = get_input_latency()
+        measured = latency.before_events(events, state)
+        state.handle_event(events)
+        if measured:
+            latency.after_events(state, self.current_state)
 
     def update(self, dt):
         """Update the current state."""
@@ -38,8 +140,10 @@ class StateManager:
     def draw(self, screen):
         """Draw the current state to the screen."""
         self.current_state.draw(screen)
-        
+
     def update_size(self, width, height):
-        """Update the size of the current state."""
-        if hasattr(self.current_state, 'update_size'):
-            self.current_state.update_size(width, height)
+        """Update the size of the current state (and of the pooled ones)."""
+        states = [self.current_state] + [s for s in self._pool.values() if s is not self.current_state]
+        for state in states:
+            if hasattr(state, 'update_size'):
+                state.update_size(width, height)
@@ -1,22 +1,54 @@
-"""Module for GPU-based graphics using shaders."""
+"""Module for GPU-based graphics using shaders (and their CPU fallback)."""
 
+import abc
+import hashlib
+import json
+import math
+import pathlib
 import time
+import zlib
+from typing import Optional
+
 import numpy as np
 import pygame
 from OpenGL.GL import *
 
+from src.scripts.gui_version.frame_profiler.frame_profiler import get_frame_profiler
+from src.scripts.gui_version.gpu_resources.gpu_resources import BUFFER, get_gpu_resources
+from src.scripts.gui_version.gui_utils.gui_utils import _draw_texture_fullscreen
+from src.scripts.gui_version.user_cache.user_cache import get_user_cache_dir
+from src.scripts.tracing.tracing import get_tracer
+
 
 class GPUBackground:
     """Class to handle GPU-based animated background using shaders."""
-    def __init__(self, width, height, vertex_src, fragment_src, uniforms=None):
+    def __init__(self, width, height, vertex_src, fragment_src, uniforms=None, defines=None, render_blocks=False):
+        """
+        Parameters:
+        - uniforms: optional dict of custom uniform name -> python value
+        - defines: optional dict of `#define` name -> value inserted in the fragment shader
+        - render_blocks: shade one fragment per pixel block (see `pixel_filter`) into a small
+          texture stretched over the window, instead of one fragment per window pixel
+        """
         self.width = width
         self.height = height
         self.start_time = time.time()
 
         # Optional dict of custom uniform name -> python value
         self.uniforms = uniforms or {}
+        self.defines = defines or {}
+        self.render_blocks = render_blocks
+
+        self.vertex_src = vertex_src
+        self.fragment_src = _with_defines(fragment_src, self.defines)
+        self.create_gl_resources()
+        # recreate the program and quad if a resize ever loses the GL context
+        get_gpu_resources().register(self)
 
-        self.program = self._create_shader(vertex_src, fragment_src)
+    def create_gl_resources(self):
+        """Create the shader program, the fullscreen quad and look up the uniforms."""
+        gpu_resources = get_gpu_resources()
+        self.program = self._create_shader(self.vertex_src, self.fragment_src)
         glUseProgram(self.program)
 
         # Create the fullscreen quad
@@ -25,11 +57,12 @@ class GPUBackground:
             -1, -1,  1,  1, -1,  1
         ], dtype=np.float32)
 
-        self.vao = glGenVertexArrays(1)
+        self.vao = gpu_resources.gen_vertex_array(self, "background quad")
         glBindVertexArray(self.vao)
-        vbo = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        self.vbo = gpu_resources.gen_buffer(self, "background quad")
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
         glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        gpu_resources.set_size(BUFFER, self.vbo, vertices.nbytes)
 
         pos_loc = glGetAttribLocation(self.program, "position")
         glEnableVertexAttribArray(pos_loc)
@@ -45,39 +78,63 @@ class GPUBackground:
             if loc == -1:
                 print(f"Warning: uniform '{name}' not found in shader (location -1)")
 
+        # target of the block rendering, its storage is allocated by the first render
+        self.fbo = None
+        self.block_texture = None
+        self._block_texture_size = None
+        if self.render_blocks:
+            self.fbo = gpu_resources.gen_framebuffer(self, "background blocks")
+            self.block_texture = gpu_resources.gen_texture(self, "background blocks")
+            glBindTexture(GL_TEXTURE_2D, self.block_texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+
+    def release_gl_resources(self):
+        """Delete the program and the fullscreen quad."""
+        get_gpu_resources().release_owner(self)
+
     def _create_shader(self, vertex_src, fragment_src):
-        """Compile and link vertex and fragment shaders."""
-        # compile vertex
-        vs = glCreateShader(GL_VERTEX_SHADER)
-        glShaderSource(vs, vertex_src)
-        glCompileShader(vs)
-        if not glGetShaderiv(vs, GL_COMPILE_STATUS):
-            raise RuntimeError(glGetShaderInfoLog(vs))
-
-        # compile fragment
-        fs = glCreateShader(GL_FRAGMENT_SHADER)
-        glShaderSource(fs, fragment_src)
-        glCompileShader(fs)
-        if not glGetShaderiv(fs, GL_COMPILE_STATUS):
-            raise RuntimeError(glGetShaderInfoLog(fs))
-
-        # link program
-        prog = glCreateProgram()
-        glAttachShader(prog, vs)
-        glAttachShader(prog, fs)
-        glLinkProgram(prog)
-        if not glGetProgramiv(prog, GL_LINK_STATUS):
-            raise RuntimeError(glGetProgramInfoLog(prog))
-        return prog
+        """Compile and link vertex and fragment shaders (or reload them from the binary cache)."""
+        with get_tracer().span("GPUBackground._create_shader", "shader", {"defines": dict(self.defines)}):
+            return get_gpu_resources().create_program(self, vertex_src, fragment_src, label="background")
+
+    def block_grid(self) -> tuple:
+        """(rows, columns) of the pixel blocks of the shader in the window."""
+        pixel_size = math.hypot(self.width, self.height) / float(self.uniforms.get("pixel_filter", 740.0))
+        return (max(1, round(self.height / pixel_size)), max(1, round(self.width / pixel_size)))
+
+    def _bind_block_target(self) -> Optional[tuple]:
+        """Draw into the block texture, returns its (rows, columns) or None to draw to the window."""
+        if self.fbo is None:
+            return None
+        rows, columns = self.block_grid()
+        if columns >= self.width:
+            return None  # blocks as small as the pixels: nothing to save
+        if self._block_texture_size != (columns, rows):
+            glBindTexture(GL_TEXTURE_2D, self.block_texture)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, columns, rows, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+            get_gpu_resources().set_texture_size(self.block_texture, columns, rows)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.block_texture, 0)
+            self._block_texture_size = (columns, rows)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, columns, rows)
+        return rows, columns
 
     def render(self):
         """Render the animated background."""
+        profiler = get_frame_profiler()
+        with profiler.phase("background"), profiler.gpu_pass("background"):
+            self._render()
+
+    def _render(self):
         t = time.time() - self.start_time
         # ensure the viewport matches the stored size so the shader draws to the whole window
         try:
             glViewport(0, 0, int(self.width), int(self.height))
         except Exception:
             pass
+        blocks = self._bind_block_target()
         # debug current viewport
         # try to ensure viewport is what we expect; ignore failures
         try:
@@ -120,6 +177,14 @@ class GPUBackground:
             glBindVertexArray(0)
         except Exception:
             pass
+        if blocks is not None:
+            # stretch the blocks over the window: a copy, no shading nor blending
+            rows, columns = blocks
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+            glBlitFramebuffer(0, 0, columns, rows, 0, 0, int(self.width), int(self.height), GL_COLOR_BUFFER_BIT, GL_NEAREST)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            glViewport(0, 0, int(self.width), int(self.height))
         # check for GL errors after draw
         try:
             err = glGetError()
@@ -193,3 +258,349 @@ class GPUBackground:
                 return
 
         raise TypeError(f"Unsupported uniform type for value: {type(value)}")
+
+
+def _with_defines(src, defines: dict):
+    """Insert `#define` lines right after the `#version` line of a shader source."""
+    if not defines:
+        return src
+    lines = "".join(f"#define {name} {value}\n" for name, value in defines.items())
+    if isinstance(src, bytes):
+        lines = lines.encode("utf-8")
+    newline = b"\n" if isinstance(src, bytes) else "\n"
+    head, sep, rest = src.partition(newline)
+    if head.lstrip().startswith(b"#version" if isinstance(src, bytes) else "#version"):
+        return head + sep + lines + rest
+    return lines + src
+
+
+def gl_version() -> tuple[int, int]:
+    """Return the (major, minor) version of the current GL context, (0, 0) if unknown."""
+    try:
+        version = glGetString(GL_VERSION)
+    except Exception:
+        return (0, 0)
+    if not version:
+        return (0, 0)
+    # "4.5 (Core Profile) Mesa 23.2.1", "3.1 Mesa ...", "OpenGL ES 3.2 ..."
+    for word in version.decode(errors="replace").split():
+        numbers = word.split(".")
+        if len(numbers) >= 2 and numbers[0].isdigit() and numbers[1].isdigit():
+            return (int(numbers[0]), int(numbers[1]))
+    return (0, 0)
+
+
+class BackgroundShader:
+    """
+    NumPy version of `main_menu_background.frag`, evaluated once per pixel block.
+
+    The shader pixelates its output: every pixel of a block shows the colour computed at
+    the block origin, so only one sample per block is shaded (`pixel_filter` blocks along
+    the window diagonal, whole blocks stretched by less than a pixel to cover the window).
+    The part of the swirl which does not depend on time is only computed on resize. No GL
+    call is made: frames can be shaded on any thread.
+    """
+
+    # Defaults of the uniforms of main_menu_background.frag
+    SHADER_DEFAULTS = {
+        "spin_rotation_speed": 2.0,
+        "move_speed": 7.0,
+        "offset": (0.0, 0.0),
+        "colour_1": (0.871, 0.267, 0.231, 1.0),
+        "colour_2": (0.0, 0.42, 0.706, 1.0),
+        "colour_3": (0.086, 0.137, 0.145, 1.0),
+        "contrast": 3.5,
+        "lighting": 0.4,
+        "spin_amount": 0.25,
+        "is_rotating": False,
+    }
+
+    def __init__(self, width, height, uniforms=None, pixel_filter: float = 740.0):
+        self.params = dict(self.SHADER_DEFAULTS)
+        self.params.update(uniforms or {})
+        self.pixel_filter = float(pixel_filter)
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        """Block grid of the window and the swirled coordinates of every block."""
+        width, height = float(width), float(height)
+        diagonal = math.hypot(width, height)
+        pixel_size = diagonal / self.pixel_filter
+        # whole blocks only: they are stretched by less than a pixel to cover the window
+        self.blocks = (max(1, round(height / pixel_size)), max(1, round(width / pixel_size)))
+        rows, columns = self.blocks
+        offset = self.params["offset"]
+        # block origins (bottom-left like gl_FragCoord), centered and normalized by the diagonal
+        x = (np.arange(columns, dtype=np.float32) * (width / columns) - 0.5 * width) / diagonal - offset[0]
+        y = (np.arange(rows, dtype=np.float32) * (height / rows) - 0.5 * height) / diagonal - offset[1]
+        x, y = np.meshgrid(x, y)
+        self._uv_len = np.hypot(x, y)
+        self._uv_angle = np.arctan2(y, x)
+        self._swirl = None if self.params["is_rotating"] else self._swirled(0.0)
+
+    def _swirled(self, t: float) -> tuple:
+        """The shader's swirl, before the warp iterations."""
+        spin_amount = self.params["spin_amount"]
+        speed = self.params["spin_rotation_speed"] * 0.2
+        if self.params["is_rotating"]:
+            speed *= t
+        speed += 302.2
+        angle = self._uv_angle + np.float32(speed) - 20.0 * (spin_amount * self._uv_len + (1.0 - spin_amount))
+        return (30.0 * self._uv_len * np.cos(angle)).astype(np.float32), (30.0 * self._uv_len * np.sin(angle)).astype(np.float32)
+
+    def shade_rgb(self, t: float) -> np.ndarray:
+        """Colours of every block at time `t`, as a (rows, columns, 3) float array (not clamped)."""
+        params = self.params
+        ux, uy = self._swirl if self._swirl is not None else self._swirled(t)
+        ux, uy = ux.copy(), uy.copy()
+        speed = t * params["move_speed"]
+        uv2x = ux + uy
+        uv2y = uv2x.copy()
+        for _ in range(5):
+            warp = np.sin(np.maximum(ux, uy))
+            uv2x += warp + ux
+            uv2y += warp + uy
+            ux += 0.5 * np.cos(5.1123314 + 0.353 * uv2y + speed * 0.131121)
+            uy += 0.5 * np.sin(uv2x - 0.113 * speed)
+            warp = np.cos(ux + uy) - np.sin(ux * 0.711 - uy)
+            ux -= warp
+            uy -= warp
+
+        contrast = params["contrast"]
+        lighting = params["lighting"]
+        contrast_mod = 0.25 * contrast + 0.5 * params["spin_amount"] + 1.2
+        paint_res = np.clip(np.hypot(ux, uy) * (0.035 * contrast_mod), 0.0, 2.0)
+        c1p = np.maximum(0.0, 1.0 - contrast_mod * np.abs(1.0 - paint_res))
+        c2p = np.maximum(0.0, 1.0 - contrast_mod * paint_res)
+        c3p = 1.0 - np.minimum(1.0, c1p + c2p)
+        light = (lighting - 0.2) * np.maximum(c1p * 5.0 - 4.0, 0.0) + lighting * np.maximum(c2p * 5.0 - 4.0, 0.0)
+
+        colours = np.array([params["colour_1"], params["colour_2"], params["colour_3"]], dtype=np.float32)[:, :3]
+        weights = np.stack([c1p, c2p, c3p], axis=-1) * (1.0 - 0.3 / contrast)
+        return weights @ colours + (0.3 / contrast) * colours[0] + light[..., None]
+
+    def shade(self, t: float) -> np.ndarray:
+        """Colours of every block at time `t`, as a (rows, columns, 3) uint8 array."""
+        return _to_pixels(self.shade_rgb(t))
+
+
+def _to_pixels(rgb: np.ndarray) -> np.ndarray:
+    return (np.clip(rgb, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+class _BlockBackground(abc.ABC):
+    """Base of the backgrounds computed as a small block image stretched over the window."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.start_time = time.time()
+        self.create_gl_resources()
+        get_gpu_resources().register(self)
+
+    def create_gl_resources(self):
+        """Forget the block texture, it is created on the next render."""
+        self.texture = None
+        self.texture_size = None
+        self._uploaded = None
+
+    def release_gl_resources(self):
+        """Delete the block texture."""
+        get_gpu_resources().release_owner(self)
+        self.texture = None
+        self.texture_size = None
+
+    def update_size(self, width, height):
+        """Update the viewport when the window is resized."""
+        self.width = width
+        self.height = height
+        try:
+            glViewport(0, 0, int(self.width), int(self.height))
+        except Exception:
+            pass
+
+    @abc.abstractmethod
+    def frame(self, t: float) -> np.ndarray:
+        """Block image at time `t`, as a (rows, columns, 3) uint8 array (first row at the bottom)."""
+
+    def render(self):
+        """Render the animated background."""
+        profiler = get_frame_profiler()
+        with profiler.phase("background"), profiler.gpu_pass("background"):
+            self._render()
+
+    def _render(self):
+        pixels = self.frame(time.time() - self.start_time)
+        rows, columns = pixels.shape[:2]
+        uploaded = pixels is self._uploaded
+        self._uploaded = pixels
+        try:
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        except Exception:
+            pass
+        if self.texture is None:
+            self.texture = get_gpu_resources().gen_texture(self, "block background")
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            # blocks keep hard edges, like the pixelation of the shader
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        else:
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+        if self.texture_size != (columns, rows):
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, columns, rows, 0, GL_RGB, GL_UNSIGNED_BYTE, pixels)
+            self.texture_size = (columns, rows)
+            get_gpu_resources().set_texture_size(self.texture, columns, rows, 3)
+            get_gpu_resources().record_upload(pixels.nbytes)
+        elif not uploaded:
+            # a played back frame is shown several times in a row: upload it once
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, columns, rows, GL_RGB, GL_UNSIGNED_BYTE, pixels)
+            get_gpu_resources().record_upload(pixels.nbytes)
+
+        glViewport(0, 0, int(self.width), int(self.height))
+        glClearColor(0.0, 0.0, 0.0, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        # the rows of the array start at the bottom of the window, like the texture rows
+        _draw_texture_fullscreen(self.texture)
+
+
+class CPUBackground(_BlockBackground):
+    """
+    Class to handle the animated background on the CPU, when the background shader cannot run.
+
+    Every frame is shaded by a BackgroundShader and uploaded to a small texture, stretched
+    over the window by the GPU (nearest filtering, GLSL 120 quad). The CPU path uses bigger
+    blocks than the shader to stay interactive; the number of samples does not depend on
+    the window size.
+    """
+
+    # Blocks along the window diagonal: 2x2 pixel blocks at 640x360 (the shader uses 740, 1x1)
+    PIXEL_FILTER = 370.0
+
+    def __init__(self, width, height, uniforms=None, pixel_filter=None):
+        self.shader = BackgroundShader(width, height, uniforms, pixel_filter or self.PIXEL_FILTER)
+        super().__init__(width, height)
+
+    @property
+    def blocks(self) -> tuple:
+        return self.shader.blocks
+
+    @property
+    def pixel_filter(self) -> float:
+        return self.shader.pixel_filter
+
+    def update_size(self, width, height):
+        """Rebuild the block grid for the new window size."""
+        super().update_size(width, height)
+        self.shader.resize(width, height)
+
+    def frame(self, t: float) -> np.ndarray:
+        return self.shader.shade(t)
+
+
+class BackgroundBake:
+    """
+    Looping clip of the background, shaded once and kept as zlib-compressed block images.
+
+    The shader is not periodic: over the last `fade` seconds the frames are cross-faded with
+    the ones before the start of the clip, so the last frame leads back into the first one.
+    Bakes are cached on disk in the user cache directory, keyed by the uniforms (theme
+    colours), the block grid, the length and the frame rate of the clip.
+    """
+
+    # Bumped when the shading or the file layout change, to ignore older cache files
+    VERSION = 1
+
+    def __init__(self, blocks: tuple, fps: float, frames: list):
+        self.blocks = blocks
+        self.fps = fps
+        self.frames = frames
+
+    def frame(self, index: int) -> np.ndarray:
+        """Block image of frame `index` (looping), as a (rows, columns, 3) uint8 array."""
+        rows, columns = self.blocks
+        data = zlib.decompress(self.frames[index % len(self.frames)])
+        return np.frombuffer(data, dtype=np.uint8).reshape(rows, columns, 3)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the compressed frames."""
+        return sum(len(frame) for frame in self.frames)
+
+    @classmethod
+    def bake(cls, shader: BackgroundShader, seconds: float, fps: float, fade: float) -> "BackgroundBake":
+        """Shade `seconds` of background with `shader`, `fps` frames per second."""
+        count = max(1, round(seconds * fps))
+        period = count / fps
+        fade = min(fade, period)
+        frames = []
+        for index in range(count):
+            t = index / fps
+            rgb = shader.shade_rgb(t)
+            if fade > 0.0 and t > period - fade:
+                weight = (t - (period - fade)) / fade
+                rgb = (1.0 - weight) * rgb + weight * shader.shade_rgb(t - period)
+            frames.append(zlib.compress(_to_pixels(rgb).tobytes(), 1))
+        return cls(shader.blocks, fps, frames)
+
+    @classmethod
+    def load_or_bake(
+        cls,
+        width,
+        height,
+        uniforms=None,
+        seconds: float = 8.0,
+        fps: float = 24.0,
+        fade: float = 1.0,
+        pixel_filter: float = 185.0,
+        cache_dir: Optional[pathlib.Path] = None,
+    ) -> "BackgroundBake":
+        """Return the bake of this theme and grid from the disk cache, baking (and saving) it if missing."""
+        shader = BackgroundShader(width, height, uniforms, pixel_filter)
+        key = hashlib.sha256(json.dumps(
+            [cls.VERSION, shader.params, shader.blocks, seconds, fps, fade], sort_keys=True
+        ).encode("utf-8")).hexdigest()[:32]
+        cache_dir = pathlib.Path(cache_dir) if cache_dir is not None else get_user_cache_dir("background_cache")
+        cache_path = cache_dir / f"{key}.npz"
+        try:
+            with np.load(cache_path) as cached:
+                offsets, data = cached["offsets"], cached["data"].tobytes()
+                return cls(shader.blocks, fps, [data[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        bake = cls.bake(shader, seconds, fps, fade)
+        offsets = np.cumsum([0] + [len(frame) for frame in bake.frames])
+        try:
+            tmp_path = cache_path.with_suffix(".tmp.npz")
+            np.savez(tmp_path, offsets=offsets, data=np.frombuffer(b"".join(bake.frames), dtype=np.uint8))
+            tmp_path.replace(cache_path)
+        except OSError:
+            pass  # the cache only saves the bake of the next launch
+        return bake
+
+
+class BakedBackground(_BlockBackground):
+    """
+    Class to handle the animated background played back from a BackgroundBake.
+
+    Every frame is a texture upload of an already shaded block image (only when the frame
+    changes), for machines where the per-pixel cost of the shader is the bottleneck.
+    """
+
+    def __init__(self, width, height, bake: BackgroundBake):
+        self.bake = bake
+        self._index = None
+        self._pixels = None
+        super().__init__(width, height)
+
+    @property
+    def blocks(self) -> tuple:
+        return self.bake.blocks
+
+    def frame(self, t: float) -> np.ndarray:
+        index = int(t * self.bake.fps) % len(self.bake.frames)
+        if index != self._index:
+            self._index, self._pixels = index, self.bake.frame(index)
+        return self._pixels
@@ -0,0 +1,316 @@
+"""Module owning every GL resource of the GUI (creation, memory estimates, release, leaks)."""
+
+import os
+import weakref
+from collections import deque
+from typing import Optional
+
+from OpenGL.GL import *
+
+from src.scripts.gui_version.shader_manager.shader_manager import get_shader_manager
+
+# Kinds of GL objects tracked by the manager
+TEXTURE = "texture"
+BUFFER = "buffer"
+VERTEX_ARRAY = "vertex_array"
+PROGRAM = "program"
+FRAMEBUFFER = "framebuffer"
+QUERY = "query"
+
+# Consecutive frames creating or deleting GL objects before the debug mode complains
+CHURN_WARNING_FRAMES = 60
+
+
+class _GPUResource:
+    """A tracked GL object."""
+
+    __slots__ = ("kind", "gl_id", "owner_ref", "owner_name", "label", "nbytes", "frame")
+
+    def __init__(self, kind: str, gl_id: int, owner, label: str, frame: int):
+        self.kind = kind
+        self.gl_id = gl_id
+        # module-level resources have no owner and live until shutdown
+        self.owner_ref = weakref.ref(owner) if owner is not None else None
+        self.owner_name = type(owner).__name__ if owner is not None else "<global>"
+        self.label = label
+        self.nbytes = 0
+        self.frame = frame
+
+    def owner_is_dead(self) -> bool:
+        return self.owner_ref is not None and self.owner_ref() is None
+
+    def __repr__(self):
+        return f"{self.kind} {self.gl_id} '{self.label}' of {self.owner_name} (~{self.nbytes} bytes, frame {self.frame})"
+
+
+class GPUResourceManager:
+    """Class owning every texture, buffer, VAO, framebuffer, query and program of the GUI.
+
+    - Objects are created through the manager with an owner (or None for module-level
+      resources) and an optional label, and their GPU memory is estimated.
+    - `release_owner` frees what an object created (called when a state is discarded),
+      `release_all` frees everything on shutdown.
+    - Texture and buffer data sent to the GPU is accounted per frame with `record_upload`.
+    - In debug mode (RPS_GPU_DEBUG=1) resources whose owner was garbage collected without
+      releasing them are reported as leaks, and frames that keep creating/deleting GL
+      objects are reported as churn.
+
+    Owners registered with `register` must implement `create_gl_resources()` and may
+    implement `resize_gl_resources(width, height)` and `release_gl_resources()`.
+
+    On some platforms `pygame.display.set_mode` recreates the GL context, which silently
+    invalidates every program, VAO and texture. `check_context` detects it with a sentinel
+    buffer and asks every owner to recreate its resources.
+    """
+
+    def __init__(self, debug: Optional[bool] = None):
+        self.debug = os.environ.get("RPS_GPU_DEBUG") == "1" if debug is None else debug
+        self._owners = []  # weak references, in registration order
+        self._sentinel = None
+        self._resources: dict[tuple[str, int], _GPUResource] = {}
+        # per-frame churn accounting
+        self.frame = 0
+        self._created_this_frame = 0
+        self._deleted_this_frame = 0
+        self.churn_history = deque(maxlen=600)  # (created, deleted) for the last frames
+        # bytes of texture/buffer data uploaded, in total and for the last frames
+        self.uploaded_bytes = 0
+        self._uploaded_this_frame = 0
+        self.upload_history = deque(maxlen=600)
+        self._churn_streak = 0
+        self._churn_warned = False
+        self.leaks: list[str] = []
+
+    # --- owners and context loss ---
+
+    def register(self, owner):
+        """Register an object owning GL resources (kept as a weak reference)."""
+        self._owners.append(weakref.ref(owner))
+        if self._sentinel is None:
+            self._create_sentinel()
+
+    def unregister(self, owner):
+        """Stop tracking an owner."""
+        self._owners = [ref for ref in self._owners if ref() is not None and ref() is not owner]
+
+    def _alive_owners(self):
+        self._owners = [ref for ref in self._owners if ref() is not None]
+        return [ref() for ref in self._owners]
+
+    def _create_sentinel(self):
+        # a buffer must be bound once to exist, glIsBuffer is false for it in any other context
+        self._sentinel = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self._sentinel)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def is_context_lost(self) -> bool:
+        """Whether the GL context changed since the resources were created."""
+        if self._sentinel is None:
+            return False
+        try:
+            return not glIsBuffer(self._sentinel)
+        except Exception:
+            return True
+
+    def check_context(self) -> bool:
+        """Recreate every registered resource if the GL context was lost.
+
+        Returns:
+            True if the context was lost and the resources were recreated.
+        """
+        if not self.is_context_lost():
+            return False
+        # the old ids belong to a dead context: forget them without deleting anything
+        self._resources.clear()
+        self._create_sentinel()
+        for owner in self._alive_owners():
+            owner.create_gl_resources()
+        return True
+
+    def resize(self, width: int, height: int):
+        """Reallocate only the size-dependent resources of the registered owners."""
+        for owner in self._alive_owners():
+            if hasattr(owner, "resize_gl_resources"):
+                owner.resize_gl_resources(width, height)
+
+    # --- creation and deletion ---
+
+    def _track(self, kind: str, gl_id: int, owner, label: str) -> int:
+        gl_id = int(gl_id)
+        self._resources[(kind, gl_id)] = _GPUResource(kind, gl_id, owner, label, self.frame)
+        self._created_this_frame += 1
+        return gl_id
+
+    def gen_texture(self, owner, label: str = "") -> int:
+        """Create a texture owned by `owner`."""
+        return self._track(TEXTURE, glGenTextures(1), owner, label)
+
+    def gen_buffer(self, owner, label: str = "") -> int:
+        """Create a buffer owned by `owner`."""
+        return self._track(BUFFER, glGenBuffers(1), owner, label)
+
+    def gen_vertex_array(self, owner, label: str = "") -> int:
+        """Create a vertex array object owned by `owner`."""
+        return self._track(VERTEX_ARRAY, glGenVertexArrays(1), owner, label)
+
+    def gen_framebuffer(self, owner, label: str = "") -> int:
+        """Create a framebuffer object owned by `owner`."""
+        return self._track(FRAMEBUFFER, glGenFramebuffers(1), owner, label)
+
+    def gen_query(self, owner, label: str = "") -> int:
+        """Create a query object owned by `owner`."""
+        return self._track(QUERY, glGenQueries(1)[0], owner, label)
+
+    def create_program(self, owner, vertex_src, fragment_src, attrib_locations: Optional[dict] = None, label: str = "") -> int:
+        """Create a linked shader program (through the shader manager and its binary cache)."""
+        prog = get_shader_manager().get_program(vertex_src, fragment_src, attrib_locations)
+        gl_id = self._track(PROGRAM, prog, owner, label)
+        try:
+            self.set_size(PROGRAM, gl_id, int(glGetProgramiv(prog, GL_PROGRAM_BINARY_LENGTH)))
+        except Exception:
+            pass
+        return gl_id
+
+    def set_size(self, kind: str, gl_id: int, nbytes: int):
+        """Record the estimated GPU memory used by an object after its data was uploaded."""
+        resource = self._resources.get((kind, int(gl_id)))
+        if resource is not None:
+            resource.nbytes = int(nbytes)
+
+    def set_texture_size(self, gl_id: int, width: int, height: int, bytes_per_pixel: int = 4):
+        """Record the estimated memory of a texture from its size."""
+        self.set_size(TEXTURE, gl_id, width * height * bytes_per_pixel)
+
+    def record_upload(self, nbytes: int):
+        """Account `nbytes` of pixel or vertex data sent to the GPU (glTex(Sub)Image, glBuffer(Sub)Data)."""
+        self.uploaded_bytes += int(nbytes)
+        self._uploaded_this_frame += int(nbytes)
+
+    def delete(self, kind: str, gl_id: int):
+        """Delete a tracked GL object."""
+        resource = self._resources.pop((kind, int(gl_id)), None)
+        if resource is None:
+            return
+        self._deleted_this_frame += 1
+        try:
+            if kind == TEXTURE:
+                glDeleteTextures([resource.gl_id])
+            elif kind == BUFFER:
+                glDeleteBuffers(1, [resource.gl_id])
+            elif kind == VERTEX_ARRAY:
+                glDeleteVertexArrays(1, [resource.gl_id])
+            elif kind == PROGRAM:
+                glDeleteProgram(resource.gl_id)
+            elif kind == FRAMEBUFFER:
+                glDeleteFramebuffers(1, [resource.gl_id])
+            elif kind == QUERY:
+                glDeleteQueries(1, [resource.gl_id])
+        except Exception:
+            # the context may already be gone on shutdown
+            pass
+
+    def release_owner(self, owner):
+        """Delete every object created by `owner`."""
+        for key, resource in list(self._resources.items()):
+            if resource.owner_ref is not None and resource.owner_ref() is owner:
+                self.delete(*key)
+
+    def release_all(self):
+        """Release everything (on shutdown), reporting the leaks in debug mode."""
+        self._collect_leaks()
+        if self.debug:
+            # what was still alive at shutdown, before releasing it
+            self.print_report()
+        for owner in self._alive_owners():
+            if hasattr(owner, "release_gl_resources"):
+                owner.release_gl_resources()
+            else:
+                self.release_owner(owner)
+        for key in list(self._resources):
+            self.delete(*key)
+        if self._sentinel is not None:
+            try:
+                glDeleteBuffers(1, [self._sentinel])
+            except Exception:
+                pass
+            self._sentinel = None
+        self._owners.clear()
+
+    # --- statistics and debug reports ---
+
+    def _collect_leaks(self):
+        """Free (and remember) the objects whose owner was collected without releasing them."""
+        for key, resource in list(self._resources.items()):
+            if resource.owner_is_dead():
+                self.leaks.append(repr(resource))
+                if self.debug:
+                    print(f"[gpu] leak: {resource!r}")
+                self.delete(*key)
+
+    def end_frame(self):
+        """Account the objects created/deleted this frame (called once per frame after flip)."""
+        created, deleted = self._created_this_frame, self._deleted_this_frame
+        self.churn_history.append((created, deleted))
+        self._created_this_frame = self._deleted_this_frame = 0
+        self.upload_history.append(self._uploaded_this_frame)
+        self._uploaded_this_frame = 0
+        self.frame += 1
+
+        if not self.debug:
+            return
+        self._churn_streak = self._churn_streak + 1 if created or deleted else 0
+        if self._churn_streak >= CHURN_WARNING_FRAMES and not self._churn_warned:
+            self._churn_warned = True
+            recent = [r for r in self._resources.values() if r.frame >= self.frame - CHURN_WARNING_FRAMES]
+            print(
+                f"[gpu] churn: GL objects created/deleted for {self._churn_streak} frames in a row "
+                f"(last frame +{created}/-{deleted}), recent: {recent[:5]}"
+            )
+        if self.frame % CHURN_WARNING_FRAMES == 0:
+            self._collect_leaks()
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated GPU memory of every tracked object."""
+        return sum(r.nbytes for r in self._resources.values())
+
+    def memory_by_kind(self) -> dict[str, int]:
+        """Estimated GPU memory per kind of object."""
+        totals = {TEXTURE: 0, BUFFER: 0, VERTEX_ARRAY: 0, PROGRAM: 0, FRAMEBUFFER: 0, QUERY: 0}
+        for resource in self._resources.values():
+            totals[resource.kind] += resource.nbytes
+        return totals
+
+    def count_by_kind(self) -> dict[str, int]:
+        """Number of live objects per kind."""
+        counts = {TEXTURE: 0, BUFFER: 0, VERTEX_ARRAY: 0, PROGRAM: 0, FRAMEBUFFER: 0, QUERY: 0}
+        for resource in self._resources.values():
+            counts[resource.kind] += 1
+        return counts
+
+    def print_report(self):
+        """Print the live objects, memory estimates, leaks and churn statistics."""
+        counts = self.count_by_kind()
+        memory = self.memory_by_kind()
+        print(f"[gpu] {len(self._resources)} live objects, ~{self.memory_bytes / (1024 * 1024):.2f} MiB")
+        for kind in counts:
+            print(f"[gpu]   {kind:<12} {counts[kind]:>4} objects  ~{memory[kind] / 1024:.1f} KiB")
+        churn_frames = sum(1 for created, deleted in self.churn_history if created or deleted)
+        print(f"[gpu] churn: {churn_frames}/{len(self.churn_history)} recent frames created or deleted GL objects")
+        if self.upload_history:
+            mean_upload = sum(self.upload_history) / len(self.upload_history)
+            print(f"[gpu] uploads: ~{mean_upload / 1024:.1f} KiB per recent frame, {self.uploaded_bytes / (1024 * 1024):.1f} MiB in total")
+        print(f"[gpu] leaks: {len(self.leaks)}")
+        for leak in self.leaks:
+            print(f"[gpu]   {leak}")
+
+
+_default_manager = None
+
+
+def get_gpu_resources() -> GPUResourceManager:
+    """Return the GPU resource manager shared by the whole GUI."""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = GPUResourceManager()
+    return _default_manager
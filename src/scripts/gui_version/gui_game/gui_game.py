@@ -1,13 +1,24 @@
 """Module for the Rock-Paper-Scissors GUI game logic."""
 
+import os
+import pathlib
 import pygame
 import random
 try:
     # normal import (package context)
     from ..gui_utils.gui_utils import _constrain_to_aspect
-    from ..game_state_manager.game_state_manager import StateManager
+    from ..asset_manager.asset_manager import AssetManager
+    from ..game_state_manager.game_state_manager import StateManager, PooledFactory
     from ..menus.main_menu.main_menu import MainMenu
-    from ..gpu_graphics.gpu_graphics import GPUBackground
+    from ..menus.game_menu.game_menu import GameMenu
+    from ..menus.loading_menu.loading_menu import LoadingMenu
+    from ..gpu_graphics.gpu_graphics import BackgroundBake, BakedBackground, CPUBackground, gl_version
+    from ..gpu_resources.gpu_resources import get_gpu_resources
+    from ..frame_profiler.frame_profiler import OVERLAY_KEY, get_frame_profiler
+    from ..memory_profiler.memory_profiler import get_memory_profiler
+    from ..input_latency.input_latency import get_input_latency
+    from ..shader_quality.shader_quality import choose_tier
+    from ...tracing.tracing import get_tracer
 except ImportError:
     # fallback for direct execution (not for production use)
     import sys
@@ -16,41 +27,44 @@ except ImportError:
     repo_root = pathlib.Path(__file__).resolve().parents[4]  # go up to the project root
     sys.path.insert(0, str(repo_root))
     from src.scripts.gui_version.gui_utils.gui_utils import _constrain_to_aspect
-    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+    from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
+    from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager, PooledFactory
     from src.scripts.gui_version.menus.main_menu.main_menu import MainMenu
-    from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+    from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+    from src.scripts.gui_version.menus.loading_menu.loading_menu import LoadingMenu
+    from src.scripts.gui_version.gpu_graphics.gpu_graphics import BackgroundBake, BakedBackground, CPUBackground, gl_version
+    from src.scripts.gui_version.gpu_resources.gpu_resources import get_gpu_resources
+    from src.scripts.gui_version.frame_profiler.frame_profiler import OVERLAY_KEY, get_frame_profiler
+    from src.scripts.gui_version.memory_profiler.memory_profiler import get_memory_profiler
+    from src.scripts.gui_version.input_latency.input_latency import get_input_latency
+    from src.scripts.gui_version.shader_quality.shader_quality import choose_tier
+    from src.scripts.tracing.tracing import get_tracer
 
 # Define global constants
 global SCREEN_H, SCREEN_W
 SCREEN_H, SCREEN_W = 360, 640
+# Time without resize events before the new window size is applied (a drag sends dozens per second)
+RESIZE_DEBOUNCE_MS = 150
+# Writes the trace recorded so far (with RPS_TRACE=<path>)
+TRACE_FLUSH_KEY = pygame.K_F4
 
-def start_gui_game():
+def queue_gui_assets(assets: AssetManager):
     """
-    Placeholder function to start the GUI version of the game.
+    Queue every asset of the GUI version on the asset manager.
+    Called as soon as the GUI is chosen so file reading and decoding run while the window opens.
     """
-    # Initialize Pygame and create an OpenGL-capable display
-    pygame.init()
-    # Request an OpenGL context so PyOpenGL functions are available
-    flags = pygame.OPENGL | pygame.DOUBLEBUF | pygame.RESIZABLE
-    screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), flags)
-    clock = pygame.time.Clock()
-
-    # Create the state manager and initial state
-    manager = StateManager(None)
-
-    # Create a single shared GPUBackground for all menus
-    import pathlib
     # compute repository root (same logic as fallback imports earlier)
     repo_root = pathlib.Path(__file__).resolve().parents[4]
-    vertex_src_path = repo_root / 'src' / 'assets' / 'shaders' / 'main_menu_background.vert'
-    fragment_src_path = repo_root / 'src' / 'assets' / 'shaders' / 'main_menu_background.frag'
-    with open(vertex_src_path, 'r', encoding='utf-8') as f:
-        vertex_src = f.read()
-    with open(fragment_src_path, 'r', encoding='utf-8') as f:
-        fragment_src = f.read()
-
-    w, h = screen.get_size()
-    # choose a random saturated theme for the shared background
+    shaders_folder = repo_root / 'src' / 'assets' / 'shaders'
+    assets.load_text('shaders/main_menu_background.vert', shaders_folder / 'main_menu_background.vert')
+    assets.load_text('shaders/main_menu_background.frag', shaders_folder / 'main_menu_background.frag')
+    # Warm up the system font list so the first SysFont call does not stall a frame
+    assets.run_in_background('fonts', pygame.font.get_fonts)
+    GameMenu.queue_assets(assets)
+
+
+def _choose_background_uniforms() -> dict:
+    """Pick a random saturated theme for the shared background."""
     color_themes = [
         ((1.0, 0.41, 0.38, 1.0), (0.39, 0.58, 0.93, 1.0), (1.0, 1.0, 0.0, 1.0)),
         ((0.13, 0.55, 0.13, 1.0), (0.0, 0.5, 0.5, 1.0), (0.27, 0.51, 0.71, 1.0)),
@@ -59,37 +73,164 @@ def start_gui_game():
         ((0.68, 0.85, 0.9, 1.0), (1.0, 0.87, 0.83, 1.0), (0.74, 0.99, 0.79, 1.0))
     ]
     chosen_color_theme = random.choice(color_themes)
-    uniforms = {
+    return {
         'colour_1': chosen_color_theme[0],
         'colour_2': chosen_color_theme[1],
         'colour_3': chosen_color_theme[2],
     }
-    shared_bg = None
+
+
+def _queue_background_bake(assets: AssetManager, w: int, h: int, uniforms: dict) -> tuple:
+    """
+    With RPS_BAKED_BACKGROUND=1, shade a looping clip of the background on a worker thread
+    while the loading screen shows (or read it back from the disk cache of a previous launch).
+    Returns the names of the queued assets.
+    """
+    if os.environ.get("RPS_BAKED_BACKGROUND") != "1":
+        return ()
+    assets.run_in_background('background bake', lambda: BackgroundBake.load_or_bake(w, h, uniforms))
+    return ('background bake',)
+
+
+def _create_shared_background(assets: AssetManager, w: int, h: int, uniforms: dict = None):
+    """
+    Create the shared background once its shader sources are loaded (main thread only).
+    Returns None if not even the CPU version can be created: the menus clear the window instead.
+    """
+    vertex_src = assets.get('shaders/main_menu_background.vert')
+    fragment_src = assets.get('shaders/main_menu_background.frag')
+    if uniforms is None:
+        uniforms = _choose_background_uniforms()
+    bake = assets.get('background bake')
+    if bake is not None:
+        # playback of the baked clip: a texture upload instead of the per-pixel shader
+        return BakedBackground(w, h, bake)
+    # the shader needs OpenGL 3.3, older drivers (or RPS_CPU_BACKGROUND=1) get the NumPy version
+    if os.environ.get("RPS_CPU_BACKGROUND") != "1" and gl_version() >= (3, 3):
+        try:
+            # quality tier calibrated on the first launch on this machine (RPS_SHADER_QUALITY overrides it)
+            tier = choose_tier(w, h, vertex_src, fragment_src, uniforms)
+            return tier.create_background(w, h, vertex_src, fragment_src, uniforms)
+        except Exception:
+            pass
     try:
-        shared_bg = GPUBackground(w, h, vertex_src, fragment_src, uniforms)
+        return CPUBackground(w, h, uniforms)
     except Exception:
-        shared_bg = None
+        return None
+
+
+def _apply_window_size(screen: pygame.Surface, size: tuple[int, int], flags: int, manager: StateManager) -> pygame.Surface:
+    """
+    Apply the final size of a window resize and return the (possibly new) display surface.
+    Only size-dependent GL resources are reallocated, unless the GL context was lost in which
+    case every registered resource is recreated.
+    """
+    w, h = _constrain_to_aspect(size[0], size[1], SCREEN_W / SCREEN_H, SCREEN_W, SCREEN_H)
+    # set_mode itself emits a resize event for the size we asked, do not loop on it
+    if (w, h) != screen.get_size():
+        screen = pygame.display.set_mode((w, h), flags)
+    gpu_resources = get_gpu_resources()
+    gpu_resources.check_context()
+    gpu_resources.resize(w, h)
+    manager.update_size(w, h)
+    return screen
+
+
+def start_gui_game(assets: AssetManager = None):
+    """
+    Starts the GUI version of the game.
+
+    Parameters:
+    - assets: AssetManager already loading the GUI assets (see `queue_gui_assets`),
+      a new one is created if not provided.
+    """
+    if assets is None:
+        assets = AssetManager()
+        queue_gui_assets(assets)
+
+    # Initialize Pygame and create an OpenGL-capable display
+    pygame.init()
+    # Request an OpenGL context so PyOpenGL functions are available
+    flags = pygame.OPENGL | pygame.DOUBLEBUF | pygame.RESIZABLE
+    screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), flags)
+    clock = pygame.time.Clock()
+
+    # Create the state manager and initial state
+    manager = StateManager(None)
+
+    # Create a single shared background for all menus, compiled during the loading screen
+    uniforms = _choose_background_uniforms()
+    bake = _queue_background_bake(assets, *screen.get_size(), uniforms)
+    assets.add_main_thread_task(
+        'background',
+        lambda loaded: _create_shared_background(loaded, *screen.get_size(), uniforms),
+        requires=('shaders/main_menu_background.vert', 'shaders/main_menu_background.frag') + bake,
+    )
+
+    # Show the loading screen right away, it switches to the main menu once everything is ready
+    manager.current_state = LoadingMenu(
+        manager, screen, assets,
+        PooledFactory(MainMenu.POOL_KEY, lambda mgr: MainMenu(mgr, screen, bg=assets.get('background'))),
+    )
 
-    main_menu = MainMenu(manager, screen, bg=shared_bg)
-    manager.current_state = main_menu
+    # Resize events are coalesced, only the last size is applied once the window stops changing
+    pending_size = None
+    last_resize_ticks = 0
+    # Phases of every frame, shown with F3 (and written to RPS_PROFILE_CSV)
+    profiler = get_frame_profiler()
+    # Allocations of every state and phase with RPS_MEMORY_PROFILE=1, reported on exit
+    memory_profiler = get_memory_profiler()
+    memory_profiler.attach(manager)
+    # Key press to presented frame latency per state (in the overlay, reported on exit with RPS_INPUT_LATENCY=1)
+    input_latency = get_input_latency()
 
     # Main game loop
     running : bool = True
     while running:
         dt = clock.tick(60) / 1000.0 
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.VIDEORESIZE:
-                new_w, new_h = event.w, event.h
-                w, h = _constrain_to_aspect(new_w, new_h, SCREEN_W / SCREEN_H, SCREEN_W, SCREEN_H)
-                screen = pygame.display.set_mode((w, h), flags)
-                manager.update_size(w, h)
-        manager.handle_event(events)
-        manager.update(dt)
-        manager.draw(screen)
-        pygame.display.flip()
+        profiler.begin_frame()
+        # polling, the resize applied once the window stops changing and the dispatch to the state
+        with profiler.phase("events"):
+            events = pygame.event.get()
+            input_latency.stamp(events)
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.VIDEORESIZE:
+                    pending_size = (event.w, event.h)
+                    last_resize_ticks = pygame.time.get_ticks()
+                elif event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+                    profiler.toggle_overlay()
+                elif event.type == pygame.KEYDOWN and event.key == TRACE_FLUSH_KEY:
+                    trace_path = get_tracer().flush()
+                    if trace_path is not None:
+                        print(f"Trace written to {trace_path}")
+            if pending_size is not None and pygame.time.get_ticks() - last_resize_ticks >= RESIZE_DEBOUNCE_MS:
+                screen = _apply_window_size(screen, pending_size, flags, manager)
+                pending_size = None
+            manager.handle_event(events)
+        with profiler.phase("update"):
+            manager.update(dt)
+        with profiler.phase("draw"):
+            manager.draw(screen)
+        profiler.draw_overlay(screen.get_height())
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        input_latency.presented()
+        get_gpu_resources().end_frame()
+        # Use the idle time left in the frame to build the menus likely to come next
+        manager.process_prefetch()
+        profiler.end_frame()
+    if memory_profiler.enabled:
+        memory_profiler.print_report()
+        memory_profiler.stop()
+    if input_latency.report:
+        input_latency.print_report()
+    # Free every GL object while the context still exists (reports leaks with RPS_GPU_DEBUG=1)
+    manager.release_all()
+    profiler.close()
+    get_gpu_resources().release_all()
+    assets.shutdown()
     pygame.quit()
     
 
@@ -1,12 +1,107 @@
 """Module for GUI utilities."""
 
+from functools import lru_cache
 import pygame
 from OpenGL.GL import *
 from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+from src.scripts.gui_version.frame_profiler.frame_profiler import get_frame_profiler
+from src.scripts.gui_version.gpu_resources.gpu_resources import BUFFER, get_gpu_resources
+
+# Color of the cleared parts of the UI surface
+TRANSPARENT = (0, 0, 0, 0)
+
+
+def _merge_rects(rects: list, bounds: pygame.Rect) -> list:
+    """Disjoint rects covering `rects` inside `bounds` (overlapping ones merged into their union)."""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect.w or not rect.h:
+            continue
+        # grow the rect with every merged rect it overlaps, so they stay disjoint
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class _UISurface(pygame.Surface):
+    """Transparent surface the menus draw their UI on, remembering the regions drawn.
+
+    `blit` and `fill` record the rect they changed; the rect returned by a `pygame.draw`
+    function must be passed to `mark`.
+    """
+
+    def __init__(self, size: tuple):
+        super().__init__(size, pygame.SRCALPHA)
+        # drawn since the last clear
+        self.dirty = []
+        # cleared since the last upload (they differ from the texture too)
+        self.cleared = []
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = super().blit(source, dest, area, special_flags)
+        self.dirty.append(rect)
+        return rect
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = super().fill(color, rect, special_flags)
+        self.dirty.append(rect)
+        return rect
+
+    def mark(self, rect: pygame.Rect) -> pygame.Rect:
+        """Record a region drawn by other means (pygame.draw)."""
+        self.dirty.append(rect)
+        return rect
+
+    def clear(self):
+        """Make the regions drawn since the last clear transparent again."""
+        # overlapping draws (text on its button) are cleared once
+        cleared = _merge_rects(self.dirty, self.get_rect())
+        for rect in cleared:
+            super().fill(TRANSPARENT, rect)
+        self.cleared += cleared
+        self.dirty = []
+
+    def changed_rects(self) -> list:
+        """Rects covering what changed since the last upload."""
+        return _merge_rects(self.cleared + self.dirty, self.get_rect())
+
+
+class _UISurfacePool:
+    """UI surface shared by the menus (they draw one at a time), sized like the window.
+
+    Handing it out only clears what the previous frame drew, instead of allocating and
+    zero-filling a full-window surface every frame. It is re-created when the window size
+    changes (`resize`, from `update_size`).
+    """
+
+    def __init__(self):
+        self.surface = None
+
+    def get(self, size: tuple) -> _UISurface:
+        """Return the UI surface of `size`, transparent."""
+        if self.surface is None or self.surface.get_size() != tuple(size):
+            # first use (or a screen whose size was not applied with update_size)
+            self.surface = _UISurface(size)
+        else:
+            self.surface.clear()
+        return self.surface
+
+    def resize(self, width: int, height: int):
+        """Re-create the surface for the new window size."""
+        if self.surface is not None and self.surface.get_size() != (width, height):
+            self.surface = _UISurface((width, height))
+
 
 class PyGameMenu:
     """Class to handle PyGame menu operations."""
 
+    # UI surface shared by every menu
+    ui_surfaces = _UISurfacePool()
+
     def __init__(self, manager: StateManager, screen: pygame.Surface, bg):
         """Base menu class.
 
@@ -29,10 +124,46 @@ class PyGameMenu:
 
     def draw(self, screen: pygame.Surface):
         """Draw menu to the screen."""
-        
+
+    def reset(self):
+        """Reset the menu when a pooled instance is reused."""
+        self.t = 0
+
+    def prefetch_hints(self):
+        """Return the PooledFactory of the menus likely to come next."""
+        return []
+
+    def input_state(self):
+        """Return what the keys change in the menu (compared around the events), None if unknown."""
+        return None
+
+    def release(self):
+        """Free the GL resources created by this menu when it is discarded."""
+        get_gpu_resources().release_owner(self)
+
+    def draw_background(self):
+        """Render the shared background, or clear the window when none could be created."""
+        if self.bg is not None:
+            self.bg.render()
+        else:
+            glClearColor(0.0, 0.0, 0.0, 1.0)
+            glClear(GL_COLOR_BUFFER_BIT)
+
+    def ui_surface(self, screen: pygame.Surface) -> _UISurface:
+        """Return the transparent surface to draw the UI of this frame on."""
+        return self.ui_surfaces.get(screen.get_size())
+
     def update_size(self, width: int, height: int):
-        """Update the size of the background."""
-        self.bg.update_size(width, height)
+        """Update the size of the background and of the UI surface."""
+        if self.bg is not None:
+            self.bg.update_size(width, height)
+        self.ui_surfaces.resize(width, height)
+
+
+@lru_cache(maxsize=None)
+def get_font(name: str, size: int) -> pygame.font.Font:
+    """Return a cached system font, creating fonts is too slow to do every frame."""
+    return pygame.font.SysFont(name, size)
 
 
 def _constrain_to_aspect(w: int, h: int, aspect: float, min_w: int=200, min_h: int=150, max_w: int=3840, max_h: int=2160):
@@ -68,29 +199,117 @@ def _blit_surface_to_opengl(surface : pygame.Surface):
     except Exception:
         pass
 
-    tex_id = glGenTextures(1)
+    # module-level texture: the caller must delete it with get_gpu_resources().delete(TEXTURE, tex_id)
+    tex_id = get_gpu_resources().gen_texture(None, "surface texture")
     glBindTexture(GL_TEXTURE_2D, tex_id)
     glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0,
                  GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+    get_gpu_resources().set_texture_size(tex_id, width, height)
+    get_gpu_resources().record_upload(len(texture_data))
 
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
     return tex_id
 
-def _draw_texture_fullscreen(tex_id):
-    """Draw a fullscreen quad with the given texture ID."""
-    # attempt to read GL state, but remain silent on failure
-    try:
-        vp = glGetIntegerv(GL_VIEWPORT)
-        curp = glGetIntegerv(GL_CURRENT_PROGRAM)
-    except Exception:
-        vp = None
-        curp = None
 
-    # We'll use a small textured shader and a cached VAO/VBO to draw the quad
-    global _ui_shader_prog, _ui_vao, _ui_vbo, _ui_tex_loc
+class _UIQuad:
+    """GL resources used to draw pygame surfaces fullscreen on top of the background.
 
-    def _create_ui_resources():
+    Registered on the GPU resource manager so a lost GL context recreates them, and owns
+    the (size-dependent) UI texture which is only reallocated when the window size changes.
+    While the texture holds the pixels of a UI surface, only what changed on it is uploaded.
+    """
+
+    def __init__(self):
+        self.create_gl_resources()
+        get_gpu_resources().register(self)
+
+    def create_gl_resources(self):
+        """Create the textured shader, the fullscreen quad and forget the UI texture."""
+        self.prog, self.vao, self.vbo = self._create_ui_resources(self)
+        try:
+            self.tex_loc = glGetUniformLocation(self.prog, b'tex')
+        except Exception:
+            self.tex_loc = -1
+        self.texture = None
+        self.texture_size = None
+        # surface whose pixels the texture holds
+        self.source = None
+
+    def resize_gl_resources(self, width: int, height: int):
+        """Reallocate the UI texture storage for the new window size."""
+        if self.texture is None:
+            return
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        self.texture_size = (width, height)
+        self.source = None
+        get_gpu_resources().set_texture_size(self.texture, width, height)
+
+    def release_gl_resources(self):
+        """Delete the UI shader, quad and texture."""
+        get_gpu_resources().release_owner(self)
+        self.texture = None
+        self.texture_size = None
+        self.source = None
+
+    def upload(self, surface: pygame.Surface):
+        """Upload a pygame surface into the persistent UI texture and return its id."""
+        width, height = surface.get_size()
+        if (
+            isinstance(surface, _UISurface) and surface is self.source
+            and self.texture is not None and self.texture_size == (width, height)
+        ):
+            return self._upload_changes(surface)
+        texture_data = pygame.image.tostring(surface, "RGBA", True)
+        try:
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        except Exception:
+            pass
+
+        if self.texture is None:
+            self.texture = get_gpu_resources().gen_texture(self, "UI overlay")
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        else:
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+
+        if self.texture_size != (width, height):
+            # (re)allocate the storage only when the size changes
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0,
+                         GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+            self.texture_size = (width, height)
+            get_gpu_resources().set_texture_size(self.texture, width, height)
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height,
+                            GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+        get_gpu_resources().record_upload(len(texture_data))
+        self.source = surface if isinstance(surface, _UISurface) else None
+        if self.source is not None:
+            surface.cleared = []
+        return self.texture
+
+    def _upload_changes(self, surface: _UISurface):
+        """Upload the regions of `surface` that changed since its last upload."""
+        rects = surface.changed_rects()
+        surface.cleared = []
+        if not rects:
+            return self.texture
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        height = surface.get_height()
+        for rect in rects:
+            # rows are flipped on upload: the rect starts `bottom` rows above the bottom of the texture
+            texture_data = pygame.image.tostring(surface.subsurface(rect), "RGBA", True)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, rect.x, height - rect.bottom, rect.w, rect.h,
+                            GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+            get_gpu_resources().record_upload(len(texture_data))
+        return self.texture
+
+    @staticmethod
+    def _create_ui_resources(owner):
+        """Compile the UI shader and build the fullscreen quad VAO/VBO."""
         # simple textured shader
         vert = b"""
         #version 120
@@ -111,27 +330,11 @@ def _draw_texture_fullscreen(tex_id):
         }
         """
 
-        # compile shaders
-        vs = glCreateShader(GL_VERTEX_SHADER)
-        glShaderSource(vs, vert)
-        glCompileShader(vs)
-        if not glGetShaderiv(vs, GL_COMPILE_STATUS):
-            raise RuntimeError(glGetShaderInfoLog(vs))
-
-        fs = glCreateShader(GL_FRAGMENT_SHADER)
-        glShaderSource(fs, frag)
-        glCompileShader(fs)
-        if not glGetShaderiv(fs, GL_COMPILE_STATUS):
-            raise RuntimeError(glGetShaderInfoLog(fs))
-
-        prog = glCreateProgram()
-        glAttachShader(prog, vs)
-        glAttachShader(prog, fs)
-        glBindAttribLocation(prog, 0, b'position')
-        glBindAttribLocation(prog, 1, b'texcoord')
-        glLinkProgram(prog)
-        if not glGetProgramiv(prog, GL_LINK_STATUS):
-            raise RuntimeError(glGetProgramInfoLog(prog))
+        # compile shaders (or reload them from the binary cache)
+        gpu_resources = get_gpu_resources()
+        prog = gpu_resources.create_program(
+            owner, vert, frag, attrib_locations={b'position': 0, b'texcoord': 1}, label="UI"
+        )
 
         # create VBO/VAO for a fullscreen quad (two triangles)
         # Quad vertices: position.x, position.y, tex.u, tex.v
@@ -156,11 +359,12 @@ def _draw_texture_fullscreen(tex_id):
             -1.0,  1.0, 0.0, 1.0
         )
 
-        vao = glGenVertexArrays(1)
+        vao = gpu_resources.gen_vertex_array(owner, "UI quad")
         glBindVertexArray(vao)
-        vbo = glGenBuffers(1)
+        vbo = gpu_resources.gen_buffer(owner, "UI quad")
         glBindBuffer(GL_ARRAY_BUFFER, vbo)
         glBufferData(GL_ARRAY_BUFFER, sizeof(quad), quad, GL_STATIC_DRAW)
+        gpu_resources.set_size(BUFFER, vbo, sizeof(quad))
 
         # position attribute (location 0)
         glEnableVertexAttribArray(0)
@@ -174,12 +378,30 @@ def _draw_texture_fullscreen(tex_id):
 
         return prog, vao, vbo
 
-    if '_ui_shader_prog' not in globals():
-        _ui_shader_prog, _ui_vao, _ui_vbo = _create_ui_resources()
-        try:
-            _ui_tex_loc = glGetUniformLocation(_ui_shader_prog, b'tex')
-        except Exception:
-            _ui_tex_loc = -1
+
+_ui_quad = None
+
+
+def _get_ui_quad() -> _UIQuad:
+    """Return the UI quad resources, creating them on first use."""
+    global _ui_quad
+    if _ui_quad is None:
+        _ui_quad = _UIQuad()
+    return _ui_quad
+
+
+def _draw_texture_fullscreen(tex_id):
+    """Draw a fullscreen quad with the given texture ID."""
+    # attempt to read GL state, but remain silent on failure
+    try:
+        vp = glGetIntegerv(GL_VIEWPORT)
+        curp = glGetIntegerv(GL_CURRENT_PROGRAM)
+    except Exception:
+        vp = None
+        curp = None
+
+    # We'll use a small textured shader and a cached VAO/VBO to draw the quad
+    ui_quad = _get_ui_quad()
 
     # save previous program to restore later
     try:
@@ -201,12 +423,12 @@ def _draw_texture_fullscreen(tex_id):
 
     # use the UI shader and draw the quad
     try:
-        glUseProgram(_ui_shader_prog)
+        glUseProgram(ui_quad.prog)
         glActiveTexture(GL_TEXTURE0)
         glBindTexture(GL_TEXTURE_2D, tex_id)
-        if _ui_tex_loc is not None and _ui_tex_loc != -1:
-            glUniform1i(_ui_tex_loc, 0)
-        glBindVertexArray(_ui_vao)
+        if ui_quad.tex_loc is not None and ui_quad.tex_loc != -1:
+            glUniform1i(ui_quad.tex_loc, 0)
+        glBindVertexArray(ui_quad.vao)
         glDrawArrays(GL_TRIANGLES, 0, 6)
         glBindVertexArray(0)
     except Exception:
@@ -230,6 +452,8 @@ def _draw_texture_fullscreen(tex_id):
 
 def render_surface_fullscreen(surface: pygame.Surface):
     """Render a pygame surface fullscreen using OpenGL."""
-    tex_id = _blit_surface_to_opengl(surface)
-    _draw_texture_fullscreen(tex_id)
-    glDeleteTextures([tex_id])
+    profiler = get_frame_profiler()
+    with profiler.phase("upload"), profiler.gpu_pass("ui"):
+        # reuse the persistent UI texture instead of creating and deleting one every frame
+        tex_id = _get_ui_quad().upload(surface)
+        _draw_texture_fullscreen(tex_id)
@@ -0,0 +1,172 @@
+"""Module measuring the latency from a key press to the first presented frame showing its effect."""
+
+import collections
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pygame
+
+# Latencies kept per state for the percentiles
+HISTORY_INPUTS = 1000
+PERCENTILES = (50, 95, 99)
+# Attribute of the KEYDOWN events holding their time.perf_counter() timestamp
+TIMESTAMP_ATTRIBUTE = "input_time"
+
+
+def _input_signature(state):
+    """What `state` shows that input changes (None when the state cannot tell)."""
+    input_state = getattr(state, "input_state", None)
+    return input_state() if input_state is not None else None
+
+
+class InputLatency:
+    """
+    Class measuring the event-to-present latency of the key presses, per state.
+
+    - The main loop stamps every KEYDOWN when it is polled (`stamp`); synthetic events
+      posted by `post_key` carry the time they were posted, so their wait in the queue counts.
+    - The StateManager compares the `input_state()` of the current state before and after
+      handling the events: the key presses of a batch that changed it (or the current state)
+      are presented by the flip of this frame, the others changed nothing on screen.
+    - The main loop calls `presented` once `pygame.display.flip` returns: the latency of every
+      pending key press is recorded for the state that handled it.
+
+    Only the frames with a key press do more than a list check.
+    """
+
+    def __init__(self, report: bool = False, history: int = HISTORY_INPUTS):
+        self.report = report
+        self.history = history
+        self.latencies = {}  # state name -> deque of latencies (seconds)
+        self.unchanged = {}  # state name -> key presses that changed nothing
+        self._handling = []  # timestamps of the key presses being handled
+        self._pending = []  # (timestamp, state name) presented by the next flip
+        self._signature = None
+
+    def stamp(self, events: list, now: Optional[float] = None):
+        """Timestamp the KEYDOWN events just polled (the synthetic ones keep the time they were posted)."""
+        for event in events:
+            if event.type == pygame.KEYDOWN and not hasattr(event, TIMESTAMP_ATTRIBUTE):
+                if now is None:
+                    now = time.perf_counter()
+                setattr(event, TIMESTAMP_ATTRIBUTE, now)
+
+    def before_events(self, events: list, state) -> bool:
+        """Note the key presses `state` is about to handle, returns whether there are any."""
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self._handling.append(getattr(event, TIMESTAMP_ATTRIBUTE, None) or time.perf_counter())
+        if not self._handling:
+            return False
+        self._signature = _input_signature(state)
+        return True
+
+    def after_events(self, handled_by, state):
+        """Tag the key presses handled by `handled_by` if they changed what is shown (`state` is current now)."""
+        name = type(handled_by).__name__
+        signature = _input_signature(state)
+        if state is not handled_by or signature is None or signature != self._signature:
+            self._pending.extend((timestamp, name) for timestamp in self._handling)
+        else:
+            self.unchanged[name] = self.unchanged.get(name, 0) + len(self._handling)
+        self._handling.clear()
+        self._signature = None
+
+    def presented(self, now: Optional[float] = None):
+        """Record the latency of the key presses shown by the frame just flipped."""
+        if not self._pending:
+            return
+        if now is None:
+            now = time.perf_counter()
+        for timestamp, name in self._pending:
+            latencies = self.latencies.get(name)
+            if latencies is None:
+                latencies = self.latencies[name] = collections.deque(maxlen=self.history)
+            latencies.append(now - timestamp)
+        self._pending.clear()
+
+    def percentiles(self, q: tuple = PERCENTILES) -> dict:
+        """{state name: (key presses, [latency percentile in ms for each of `q`])}."""
+        return {
+            name: (len(latencies), [float(value) * 1000.0 for value in np.percentile(list(latencies), q)])
+            for name, latencies in self.latencies.items() if latencies
+        }
+
+    def overlay_lines(self) -> list:
+        """Lines of the frame profiler overlay: the percentiles of every state."""
+        percentiles = self.percentiles()
+        if not percentiles:
+            return []
+        lines = [f"{'key to flip ms':<18}"]
+        for name, (count, values) in percentiles.items():
+            label = f"{name[:12]} ({count})"
+            lines.append(f"{label:<18}" + "".join(f"{value:8.2f}" for value in values))
+        return lines
+
+    def print_report(self):
+        """Print the latency distribution of every state."""
+        percentiles = self.percentiles()
+        print("[input] key press to presented frame, per state:")
+        for name in sorted(set(percentiles) | set(self.unchanged)):
+            count, values = percentiles.get(name, (0, []))
+            text = ", ".join(f"p{q} {value:.2f} ms" for q, value in zip(PERCENTILES, values))
+            print(f"[input]   {name}: {count} key presses{', ' + text if text else ''}, "
+                  f"{self.unchanged.get(name, 0)} without visible change")
+
+
+def post_key(key: int, mod: int = 0):
+    """Post a key press (KEYDOWN and KEYUP) stamped with the time it is posted (any thread)."""
+    pygame.event.post(pygame.event.Event(
+        pygame.KEYDOWN, key=key, mod=mod, unicode="", scancode=0, **{TIMESTAMP_ATTRIBUTE: time.perf_counter()}
+    ))
+    pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, mod=mod, unicode="", scancode=0))
+
+
+class SyntheticInput:
+    """
+    Thread posting a script of key presses to the event queue, to measure the latency
+    automatically (benchmarks). Each press comes `interval` seconds after the previous one,
+    give or take `jitter`, so the presses land at every point of a frame.
+    """
+
+    def __init__(self, keys: list, interval: float = 0.15, jitter: float = 0.05, seed: int = 1):
+        self.keys = keys
+        self.interval = interval
+        self.jitter = jitter
+        self.posted = 0
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="synthetic input", daemon=True)
+
+    def _run(self):
+        for key in self.keys:
+            if self._stop.wait(self.interval + self._rng.uniform(-self.jitter, self.jitter)):
+                return
+            post_key(key)
+            self.posted += 1
+
+    def start(self):
+        self._thread.start()
+
+    def done(self) -> bool:
+        """Whether every key press was posted (or the thread was stopped)."""
+        return not self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+_default_latency = None
+
+
+def get_input_latency() -> InputLatency:
+    """Return the input latency measure shared by the whole GUI (reported on exit with RPS_INPUT_LATENCY=1)."""
+    global _default_latency
+    if _default_latency is None:
+        _default_latency = InputLatency(os.environ.get("RPS_INPUT_LATENCY") == "1")
+    return _default_latency
@@ -0,0 +1,320 @@
+"""Module accounting the memory allocated by every state and frame phase of the GUI (tracemalloc)."""
+
+import os
+import pathlib
+import sys
+import tracemalloc
+
+import pygame
+
+# Frames a state runs before its frames count as steady state (caches filled, pool built)
+STEADY_FRAMES = 30
+# Lines shown by each part of the report
+TOP_HOTSPOTS = 10
+# Phase of the allocations made outside every timed phase of a frame
+OTHER_PHASE = "other"
+
+_SRC_ROOT = pathlib.Path(__file__).resolve().parents[3]
+
+# pygame functions returning new surfaces or pixel buffers, wrapped while profiling
+_WRAPPED_FUNCTIONS = {
+    pygame.transform: ("rotate", "rotozoom", "scale", "scale_by", "smoothscale", "smoothscale_by", "flip"),
+    pygame.image: ("load", "tostring", "tobytes", "fromstring", "frombytes", "frombuffer"),
+    pygame.font: ("SysFont",),
+}
+
+# MemoryProfiler recording the pygame allocations (None when not profiling)
+_recording = None
+# pygame.Surface is replaced while profiling, the surfaces made by pygame are of this type
+_Surface = pygame.Surface
+
+
+def _site(filename: str, lineno: int) -> str:
+    """`file:line`, relative to the source folder when inside it."""
+    path = pathlib.Path(filename)
+    try:
+        path = path.resolve().relative_to(_SRC_ROOT)
+    except ValueError:
+        pass
+    return f"{path.as_posix()}:{lineno}"
+
+
+def _nbytes(result) -> int:
+    if isinstance(result, _Surface):
+        return result.get_width() * result.get_height() * result.get_bytesize()
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    return 0
+
+
+class _CountedSurface(_Surface):
+    """pygame.Surface counting its creations while profiling."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if _recording is not None:
+            _recording.record_pygame("Surface", _nbytes(self), sys._getframe(1))
+
+
+class _CountedFont(pygame.font.Font):
+    """pygame.font.Font counting its creations while profiling."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if _recording is not None:
+            _recording.record_pygame("Font", 0, sys._getframe(1))
+
+
+def _counted(name: str, function):
+    def wrapper(*args, **kwargs):
+        result = function(*args, **kwargs)
+        if _recording is not None:
+            _recording.record_pygame(name, _nbytes(result), sys._getframe(1))
+        return result
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+class _Usage:
+    """Memory of a (state, phase) over the steady-state frames."""
+
+    __slots__ = ("allocated", "net", "blocks", "peak", "pygame_count", "pygame_bytes")
+
+    def __init__(self):
+        self.allocated = 0  # bytes, sum of the peaks above the start of each slice of the phase
+        self.net = 0  # bytes still allocated at the end of the slices
+        self.blocks = 0  # net memory blocks
+        self.peak = 0  # highest traced memory of the process while in the phase
+        self.pygame_count = 0
+        self.pygame_bytes = 0
+
+
+class MemoryProfiler:
+    """
+    Class attributing the Python allocations of every frame to the current state and phase.
+
+    - Started with RPS_MEMORY_PROFILE=1 (see `get_memory_profiler`): tracemalloc traces
+      every allocation and the pygame calls creating surfaces, fonts or pixel buffers are
+      counted (their pixels are allocated by SDL, out of the reach of tracemalloc).
+    - The frame profiler reports the boundaries of its phases: the memory allocated between
+      two boundaries (peak above the start, net change and blocks) goes to the innermost
+      phase, "other" outside of them, and to the state current when the frame began.
+    - Only the frames of a state after its first STEADY_FRAMES count, so the report shows
+      what every frame keeps allocating once caches are filled: the budget is zero.
+
+    Profiling slows every allocation down, it is a debugging mode.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.manager = None
+        self.usage: dict[tuple[str, str], _Usage] = {}
+        # (state, phase, kind, call site) -> [count, bytes] of the pygame allocations
+        self.sites: dict[tuple[str, str, str, str], list] = {}
+        self.frames: dict[str, int] = {}  # steady-state frames per state
+        self._phases = []  # stack of the phases entered
+        self._state = None
+        self._state_frames = 0
+        self._steady = False
+        self._frame_usage = {}
+        self._current = 0
+        self._blocks = 0
+        self._baseline = None
+        self._originals = []
+        if enabled:
+            self.start()
+
+    def start(self):
+        """Start tracing the allocations and counting the pygame ones."""
+        global _recording
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if not self._originals:
+            self._originals.append((pygame, "Surface", pygame.Surface))
+            pygame.Surface = _CountedSurface
+            self._originals.append((pygame.font, "Font", pygame.font.Font))
+            pygame.font.Font = _CountedFont
+            for module, names in _WRAPPED_FUNCTIONS.items():
+                for name in names:
+                    function = getattr(module, name, None)
+                    if function is not None:
+                        self._originals.append((module, name, function))
+                        setattr(module, name, _counted(name, function))
+        _recording = self
+        self.enabled = True
+        self._mark()
+
+    def stop(self):
+        """Stop tracing and restore the pygame functions."""
+        global _recording
+        for module, name, original in reversed(self._originals):
+            setattr(module, name, original)
+        self._originals.clear()
+        if _recording is self:
+            _recording = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+
+    def attach(self, manager):
+        """Attribute the frames to the current state of `manager` (a StateManager)."""
+        self.manager = manager
+
+    def _mark(self):
+        tracemalloc.reset_peak()
+        self._current = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+
+    def _phase_usage(self) -> _Usage:
+        """Usage of the innermost phase in the current frame."""
+        phase = self._phases[-1] if self._phases else OTHER_PHASE
+        usage = self._frame_usage.get(phase)
+        if usage is None:
+            usage = self._frame_usage[phase] = _Usage()
+        return usage
+
+    def _slice(self):
+        """Account the memory of the slice ending now to the innermost phase, start the next one."""
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        if self._steady:
+            usage = self._phase_usage()
+            usage.allocated += max(0, peak - self._current)
+            usage.net += current - self._current
+            usage.blocks += blocks - self._blocks
+            usage.peak = max(usage.peak, peak)
+        self._mark()
+
+    def enter_phase(self, name: str):
+        self._slice()
+        self._phases.append(name)
+
+    def exit_phase(self, name: str):
+        self._slice()
+        if self._phases:
+            self._phases.pop()
+
+    def record_pygame(self, kind: str, nbytes: int, frame):
+        """Count a surface, font or pixel buffer created by pygame (called by the wrappers)."""
+        if not self._steady:
+            return
+        phase = self._phases[-1] if self._phases else OTHER_PHASE
+        usage = self._phase_usage()
+        usage.pygame_count += 1
+        usage.pygame_bytes += nbytes
+        site = self.sites.setdefault((self._state, phase, kind, _site(frame.f_code.co_filename, frame.f_lineno)), [0, 0])
+        site[0] += 1
+        site[1] += nbytes
+
+    def begin_frame(self):
+        """Start a frame of the current state."""
+        state = getattr(self.manager, "current_state", None)
+        name = type(state).__name__ if state is not None else "None"
+        if name != self._state:
+            self._state = name
+            self._state_frames = 0
+        self._state_frames += 1
+        self._steady = self._state_frames > STEADY_FRAMES
+        if self._steady and self._baseline is None:
+            # what is retained from now on is growth of the steady state
+            self._baseline = tracemalloc.take_snapshot()
+        self._phases.clear()
+        self._frame_usage = {}
+        self._mark()
+
+    def end_frame(self):
+        """Add the memory of the frame to its state."""
+        self._slice()
+        if not self._steady:
+            return
+        self.frames[self._state] = self.frames.get(self._state, 0) + 1
+        for phase, frame_usage in self._frame_usage.items():
+            usage = self.usage.get((self._state, phase))
+            if usage is None:
+                usage = self.usage[(self._state, phase)] = _Usage()
+            usage.allocated += frame_usage.allocated
+            usage.net += frame_usage.net
+            usage.blocks += frame_usage.blocks
+            usage.peak = max(usage.peak, frame_usage.peak)
+            usage.pygame_count += frame_usage.pygame_count
+            usage.pygame_bytes += frame_usage.pygame_bytes
+
+    def per_frame(self) -> dict:
+        """{state: {phase: (allocated bytes, net blocks, pygame allocations, their bytes, peak bytes)}} per steady frame."""
+        result = {}
+        for (state, phase), usage in self.usage.items():
+            frames = self.frames[state]
+            result.setdefault(state, {})[phase] = (
+                usage.allocated / frames, usage.blocks / frames, usage.pygame_count / frames,
+                usage.pygame_bytes / frames, usage.peak,
+            )
+        return result
+
+    def over_budget(self, budget_bytes: float = 0.0) -> list:
+        """States allocating more than `budget_bytes` per steady frame (Python heap or pygame)."""
+        return [
+            state for state, phases in self.per_frame().items()
+            if sum(values[0] for values in phases.values()) > budget_bytes
+            or sum(values[3] for values in phases.values()) > budget_bytes
+            or any(values[2] for values in phases.values())
+        ]
+
+    def hotspots(self, top: int = TOP_HOTSPOTS) -> list:
+        """The `top` call sites of pygame allocations: (per frame, bytes per frame, kind, site, state, phase)."""
+        rows = [
+            (count / self.frames[state], nbytes / self.frames[state], kind, site, state, phase)
+            for (state, phase, kind, site), (count, nbytes) in self.sites.items()
+        ]
+        rows.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        return rows[:top]
+
+    def retained(self, top: int = TOP_HOTSPOTS) -> list:
+        """The `top` lines whose allocations grew since the steady state began (tracemalloc statistics)."""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        return [stat for stat in snapshot.compare_to(self._baseline, "lineno") if stat.size_diff > 0][:top]
+
+    def print_report(self, top: int = TOP_HOTSPOTS):
+        """Print the memory per state and phase, the allocation hotspots and what was retained."""
+        per_frame = self.per_frame()
+        print(f"[memory] steady state (after {STEADY_FRAMES} frames in a state), per frame:")
+        for state, phases in per_frame.items():
+            allocated = sum(values[0] for values in phases.values())
+            pygame_count = sum(values[2] for values in phases.values())
+            peak = max(values[4] for values in phases.values())
+            print(f"[memory]   {state} ({self.frames[state]} frames): {allocated / 1024:.1f} KiB allocated, "
+                  f"{pygame_count:.1f} pygame allocations, peak {peak / (1024 * 1024):.1f} MiB")
+            for phase, (allocated, blocks, count, nbytes, _) in sorted(phases.items(), key=lambda item: -item[1][0]):
+                if allocated or blocks or count:
+                    print(f"[memory]     {phase:<12} {allocated / 1024:9.1f} KiB {blocks:+8.1f} blocks "
+                          f"{count:6.1f} pygame ({nbytes / 1024:.1f} KiB)")
+        print("[memory] hotspots, pygame allocations per steady frame:")
+        for count, nbytes, kind, site, state, phase in self.hotspots(top):
+            print(f"[memory]   {count:6.2f} x {kind:<12} {nbytes / 1024:9.1f} KiB  {site}  ({state}, {phase})")
+        retained = self.retained(top)
+        if retained:
+            print("[memory] retained since the steady state began:")
+            for stat in retained:
+                frame = stat.traceback[0]
+                print(f"[memory]   {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  "
+                      f"{_site(frame.filename, frame.lineno)}")
+        over_budget = self.over_budget()
+        if over_budget:
+            print(f"[memory] over the zero allocation budget: {', '.join(over_budget)}")
+        else:
+            print("[memory] no steady-state allocation")
+
+
+_default_profiler = None
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """Return the memory profiler shared by the whole GUI (enabled with RPS_MEMORY_PROFILE=1)."""
+    global _default_profiler
+    if _default_profiler is None:
+        _default_profiler = MemoryProfiler(os.environ.get("RPS_MEMORY_PROFILE") == "1")
+    return _default_profiler
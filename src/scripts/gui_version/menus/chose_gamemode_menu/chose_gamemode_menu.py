@@ -3,16 +3,25 @@
 import pygame
 
 
-from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
-from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
-from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, render_surface_fullscreen
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager, PooledFactory
+from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground, gl_version
+from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, get_font, render_surface_fullscreen
 from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+from src.scripts.gui_version.menus.spectator_menu.spectator_menu import SpectatorMenu
+from src.scripts.gui_version.menus.spectator_grid_menu.spectator_grid_menu import SpectatorGridMenu
+from src.scripts.gui_version.user_cache.user_cache import get_user_cache_dir
+from src.scripts.network.match_client.match_client import MatchClient, MultiSpectatorClient, SpectatorClient
 from typing import Callable, Optional
 
+# Columns and rows of the match grid
+GRID_SIZE = 4
 
 class ChoseGameModeMenu(PyGameMenu):
     """Class to handle the game mode selection menu."""
 
+    # Key of the game mode menu in the StateManager pool
+    POOL_KEY = "chose_gamemode_menu"
+
     def __init__(self, manager: StateManager, screen: pygame.Surface, bg: GPUBackground, back_factory: Optional[Callable] = None):
         """Initializes the game mode selection menu."""
         super().__init__(manager, screen, bg)
@@ -20,16 +29,68 @@ class ChoseGameModeMenu(PyGameMenu):
         # Menu options. The back target is provided by the caller via back_factory.
         back_target = back_factory if back_factory is not None else None
         self.buttons = [
-            ("VS Computer", lambda mgr: GameMenu(mgr, screen, self.bg, back_factory=back_target)),
-            ("VS Player", lambda mgr: GameMenu(mgr, screen, self.bg, False, back_target)),
-            ("Back to Main Menu", back_target),
+            ("VS Computer", PooledFactory(
+                GameMenu.pool_key(True),
+                lambda mgr: GameMenu(mgr, screen, self.bg, back_factory=back_target),
+            )),
+            ("VS Player", PooledFactory(
+                GameMenu.pool_key(False),
+                lambda mgr: GameMenu(mgr, screen, self.bg, False, back_target),
+            )),
+            # not pooled: every online game opens its own connection to the match server
+            ("VS Online Player", lambda mgr: GameMenu(
+                mgr, screen, self.bg, back_factory=back_target, remote=self._connect_online(),
+            )),
+            ("Watch Online Match", lambda mgr: SpectatorMenu(
+                mgr, screen, self.bg, self._connect_spectator(), back_target,
+            )),
         ]
+        # the grid is drawn by an instanced OpenGL 3.3 program: not offered on older drivers
+        if gl_version() >= (3, 3):
+            self.buttons.append(("Watch Match Grid", lambda mgr: SpectatorGridMenu(
+                mgr, screen, self.bg, self._connect_grid(GRID_SIZE * GRID_SIZE), GRID_SIZE, GRID_SIZE, back_target,
+            )))
+        self.buttons.append(("Back to Main Menu", back_target))
         self.selected_index = 0
 
         # Background info
         self.bg = bg
         # font used for menu rendering
-        self.font = pygame.font.SysFont("arial", 36)
+        self.font = get_font("arial", 36)
+
+    def reset(self):
+        """Reset the menu selection."""
+        super().reset()
+        self.selected_index = 0
+
+    @staticmethod
+    def _connect_online() -> MatchClient:
+        """Connect to the match server and join the matchmaking queue with the saved rating."""
+        client = MatchClient(rating_file=get_user_cache_dir() / "rating.json")
+        client.connect()
+        return client
+
+    @staticmethod
+    def _connect_spectator() -> SpectatorClient:
+        """Connect to the match server and watch the latest started match."""
+        spectator = SpectatorClient()
+        spectator.connect()
+        return spectator
+
+    @staticmethod
+    def _connect_grid(slots: int) -> MultiSpectatorClient:
+        """Connect to the match server to watch the `slots` latest started matches."""
+        spectator = MultiSpectatorClient(slots)
+        spectator.connect()
+        return spectator
+
+    def prefetch_hints(self):
+        """The local game modes lead to a GameMenu, build them ahead of time."""
+        return [target for _, target in self.buttons if isinstance(target, PooledFactory)]
+
+    def input_state(self):
+        """The keys move the selection."""
+        return (self.selected_index,)
 
     def handle_event(self, event):
         """Handle events specific to the game mode selection menu."""
@@ -50,23 +111,25 @@ class ChoseGameModeMenu(PyGameMenu):
 
     def draw(self, screen: pygame.Surface):
         # Render GL background first
-        self.bg.render()
+        self.draw_background()
 
-        # Create a transparent surface for the UI
-        ui_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-        font = pygame.font.SysFont("Arial", 40)
+        # Transparent surface for the UI (reused every frame)
+        ui_surface = self.ui_surface(screen)
+        font = get_font("Arial", 40)
 
         # Render the menu title
         text = font.render("Choose Game Mode", True, (255, 255, 255))
         ui_surface.blit(text, (50, 50))
 
-        # Render menu options
+        # Render menu options, tightened so every option fits in the window
+        pitch = min(60, (screen.get_height() - 130) // len(self.buttons))
+        button_font = self.font if pitch >= 60 else get_font("arial", max(16, pitch - 14))
         for i, (label, _) in enumerate(self.buttons):
             color = (255, 255, 0) if i == self.selected_index else (200, 200, 200)
-            rect = pygame.Rect(50, 150 + i * 60, 300, 50)
-            pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect)
-            text = self.font.render(label, True, color)
-            ui_surface.blit(text, (rect.x + 10, rect.y + 10))
+            rect = pygame.Rect(50, 120 + i * pitch, 300, pitch - 6)
+            ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect))
+            text = button_font.render(label, True, color)
+            ui_surface.blit(text, (rect.x + 10, rect.y + (rect.height - text.get_height()) // 2))
         
         # Render the UI surface to the screen
         render_surface_fullscreen(ui_surface)
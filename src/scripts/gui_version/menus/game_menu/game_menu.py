@@ -3,14 +3,21 @@
 from typing import Callable, Optional
 import random
 import math
+import os
 import pathlib
 import pygame
-from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+from src.scripts.game_rules.game_rules import round_winner, is_match_over
+from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager, PooledFactory
 from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
 from src.scripts.gui_version.gui_utils.gui_utils import (
     PyGameMenu,
+    get_font,
     render_surface_fullscreen,
 )
+from src.scripts.network.match_client.match_client import MatchClient
+from src.scripts.network.match_protocol.match_protocol import ABORT_LEFT, ABORT_TIMEOUT
+from src.scripts.tracing.tracing import get_tracer
 
 
 class GameMenu(PyGameMenu):
@@ -20,6 +27,14 @@ class GameMenu(PyGameMenu):
     _player_hands_cache = None
     _player_crowns_cache = None
 
+    # Durations of the round animation: hands move to the center, shake, then show the moves
+    MOVE_TO_CENTER_MS = 1000
+    SHAKE_MS = 3000
+    REVEAL_MS = 1000
+    # Pause before the next round, after a won round and after a tie
+    NEXT_ROUND_MS = 2500
+    TIE_RESTART_MS = 5000
+
     def __init__(
         self,
         manager: StateManager,
@@ -27,31 +42,41 @@ class GameMenu(PyGameMenu):
         bg: GPUBackground,
         is_against_machine: bool = True,
         back_factory: Optional[Callable] = None,
+        remote: Optional[MatchClient] = None,
     ):
-        """Initialize the main game menu."""
+        """Initialize the main game menu.
+
+        With a `remote` match client, player 2 is an online opponent and the match state
+        (moves, scores) comes from the match server.
+        """
         super().__init__(manager, screen, bg)
 
         # Set up background
         self.bg = bg
 
         # Set the game mode
-        self.is_against_machine = is_against_machine
+        self.is_against_machine = is_against_machine and remote is None
+        self.remote = remote
+        # Online rounds start animating as soon as the local move is locked in: the opponent's
+        # move is only needed when the hands open, which hides the round trips to the server.
+        # RPS_PREDICTION=0 waits for the server before animating instead.
+        self.predict = remote is not None and os.environ.get("RPS_PREDICTION") != "0"
 
         # Menu options. The back target is provided by the caller via back_factory.
         self.back_target = back_factory if back_factory is not None else None
-        # Pause menu options
+        # Restarting reuses this (pooled) instance through reset() instead of rebuilding it
+        self.restart_factory = PooledFactory(
+            GameMenu.pool_key(self.is_against_machine),
+            lambda mgr: GameMenu(
+                mgr, screen, self.bg, self.is_against_machine, self.back_target
+            ),
+        )
+        # Pause menu options (an online match is not pooled: restarting looks for a new opponent)
         self.pause_menu_buttons = [
             ("Resume", None),
-            (
-                "Restart",
-                lambda mgr: GameMenu(
-                    mgr, screen, self.bg, self.is_against_machine, self.back_target
-                ),
-            ),
+            ("Restart", self._rejoin if remote is not None else self.restart_factory),
             ("Quit to Main Menu", self.back_target),
         ]
-        self.is_paused = False
-        self.pause_menu_selected_index = 0
 
         # Game player 1 options
         self.player1_menu_buttons = [
@@ -59,8 +84,6 @@ class GameMenu(PyGameMenu):
             ("Paper", "paper"),
             ("Scissors", "scissors"),
         ]
-        self.player1_menu_index = 0
-        self.player1_menu_choice = None
 
         # Game player 2 options
         self.player2_menu_buttons = [
@@ -68,74 +91,134 @@ class GameMenu(PyGameMenu):
             ("Paper", "paper"),
             ("Scissors", "scissors"),
         ]
-        self.player2_menu_index = 0
-        self.player2_menu_choice = None
-
-        self.player_scores = [0, 0]  # [player1_score, player2_score]
-
-        self.game_stage = 0  # 0: ongoing, 1: player1 chosed, 2: player2 chosed, 3: in animation, 4: game over
 
         # Load player hand images with caching to avoid multiple loads
-        if GameMenu._player_hands_cache is None:
-            repo_root = pathlib.Path(__file__).resolve().parents[4]
-            assets_folder = repo_root / "assets" / "images"
-            player_hands = [
-                {
-                    "rock": pygame.image.load(
-                        assets_folder / "blue_hands" / "blue_rock.png"
-                    ).convert_alpha(),
-                    "paper": pygame.image.load(
-                        assets_folder / "blue_hands" / "blue_paper.png"
-                    ).convert_alpha(),
-                    "scissors": pygame.image.load(
-                        assets_folder / "blue_hands" / "blue_scissors.png"
-                    ).convert_alpha(),
-                },
-                {
-                    "rock": pygame.image.load(
-                        assets_folder / "red_hands" / "red_rock.png"
-                    ).convert_alpha(),
-                    "paper": pygame.image.load(
-                        assets_folder / "red_hands" / "red_paper.png"
-                    ).convert_alpha(),
-                    "scissors": pygame.image.load(
-                        assets_folder / "red_hands" / "red_scissors.png"
-                    ).convert_alpha(),
-                },
-            ]
-            # Resize hands once and store in cache
-            for hand_set in player_hands:
-                for key in list(hand_set.keys()):
-                    surf = hand_set[key]
-                    scaled = pygame.transform.scale(
-                        surf, (surf.get_width() // 2.5, surf.get_height() // 2.5)
-                    )
-                    hand_set[key] = scaled
-            GameMenu._player_hands_cache = player_hands
+        # (normally already filled by the asset manager during the loading screen)
+        if GameMenu._player_hands_cache is None or GameMenu._player_crowns_cache is None:
+            GameMenu._load_sprite_caches()
         self.player_hands = GameMenu._player_hands_cache
-
-        if GameMenu._player_crowns_cache is None:
-            repo_root = pathlib.Path(__file__).resolve().parents[4]
-            assets_folder = repo_root / "assets" / "images"
-            player_crowns = [
-                pygame.image.load(assets_folder / "blue_crown.png").convert_alpha(),
-                pygame.image.load(assets_folder / "red_crown.png").convert_alpha(),
-            ]
-            # Resize crowns once and store in cache
-            for i, surf in enumerate(player_crowns):
-                scaled = pygame.transform.scale(
-                    surf, (surf.get_width() // 2.5, surf.get_height() // 2.5)
-                )
-                player_crowns[i] = scaled
-            GameMenu._player_crowns_cache = player_crowns
-        # Reuse cached hands (copy references — surfaces are immutable enough for blitting)
+        # Reuse cached crowns (copy references — surfaces are immutable enough for blitting)
         self.player_crowns = GameMenu._player_crowns_cache
 
-        self.animate_hand_idle = True
         self.hands_height = screen.get_height() // 2
+        self.play_again_text = "Press Enter or Space to play again"
+        self.reset()
+
+    @staticmethod
+    def pool_key(is_against_machine: bool):
+        """Key of the game menu in the StateManager pool for a given game mode."""
+        return ("game_menu", is_against_machine)
+
+    def reset(self):
+        """Reset the whole match (scores included)."""
+        super().reset()
+        self.is_paused = False
+        self.pause_menu_selected_index = 0
+        self.player_scores = [0, 0]  # [player1_score, player2_score]
+        self._reset_round()
+
+    def input_state(self):
+        """The keys pause, move the selections and lock the choices in."""
+        return (
+            self.is_paused, self.pause_menu_selected_index, self.game_stage,
+            self.player1_menu_index, self.player1_menu_choice, self.player2_menu_index, self.player2_menu_choice,
+        )
+
+    def _rejoin(self):
+        """Look for a new online opponent and start the match over."""
+        if self.remote.state == "playing":
+            # the server ignores a join during a match: forfeit it first
+            self.remote.leave()
+        self.remote.join()
+        self.reset()
+
+    def release(self):
+        """Free the GL resources and leave the online match (if any)."""
+        super().release()
+        if self.remote is not None:
+            self.remote.close()
+
+    def _reset_round(self):
+        """Reset the choices and animations to start a new round."""
+        self.game_stage = 0  # 0: ongoing, 1: player1 chosed, 2: player2 chosed, 3: in animation, 4: game over
+        self.player1_menu_index = 0
+        self.player1_menu_choice = None
+        self.player2_menu_index = 0
+        self.player2_menu_choice = None
+        self.animate_hand_idle = True
         # Animation timing
         self.animation_start_time = None
         self.animation_stage = 0  # 0: hands move to center, 1: move up down 3 times, 2 reveal choices, 3: over
+        # Result of the round sent by the match server (online matches only)
+        self.remote_result = None
+
+    # Sprite name -> path relative to the images folder, loaded and scaled down once
+    _SPRITE_SCALE_DIVISOR = 2.5
+    _HAND_SPRITES = [
+        {
+            "rock": pathlib.Path("blue_hands") / "blue_rock.png",
+            "paper": pathlib.Path("blue_hands") / "blue_paper.png",
+            "scissors": pathlib.Path("blue_hands") / "blue_scissors.png",
+        },
+        {
+            "rock": pathlib.Path("red_hands") / "red_rock.png",
+            "paper": pathlib.Path("red_hands") / "red_paper.png",
+            "scissors": pathlib.Path("red_hands") / "red_scissors.png",
+        },
+    ]
+    _CROWN_SPRITES = [pathlib.Path("blue_crown.png"), pathlib.Path("red_crown.png")]
+
+    @staticmethod
+    def _images_folder() -> pathlib.Path:
+        return pathlib.Path(__file__).resolve().parents[4] / "assets" / "images"
+
+    @classmethod
+    def _load_sprite_caches(cls):
+        """Synchronously load the hand and crown sprites into the class-level caches."""
+        assets_folder = cls._images_folder()
+
+        def _load(rel_path):
+            surf = pygame.image.load(assets_folder / rel_path).convert_alpha()
+            # Resize once and store in cache
+            return pygame.transform.scale(
+                surf,
+                (
+                    surf.get_width() // cls._SPRITE_SCALE_DIVISOR,
+                    surf.get_height() // cls._SPRITE_SCALE_DIVISOR,
+                ),
+            )
+
+        with get_tracer().span("GameMenu sprite caches", "assets", {"source": "disk"}):
+            cls._player_hands_cache = [
+                {key: _load(rel_path) for key, rel_path in hand_set.items()}
+                for hand_set in cls._HAND_SPRITES
+            ]
+            cls._player_crowns_cache = [_load(rel_path) for rel_path in cls._CROWN_SPRITES]
+
+    @classmethod
+    def queue_assets(cls, assets: AssetManager):
+        """Queue the sprites on the asset manager so entering a match never loads from disk."""
+        assets_folder = cls._images_folder()
+        names = []
+        for rel_path in [p for hand_set in cls._HAND_SPRITES for p in hand_set.values()] + cls._CROWN_SPRITES:
+            name = f"images/{rel_path.as_posix()}"
+            assets.load_image(name, assets_folder / rel_path, cls._SPRITE_SCALE_DIVISOR)
+            names.append(name)
+
+        def _fill_caches(loaded: AssetManager):
+            if any(name not in loaded for name in names):
+                return False  # a sprite failed, __init__ will fall back to loading synchronously
+            with get_tracer().span("GameMenu sprite caches", "assets", {"source": "asset manager"}):
+                cls._player_hands_cache = [
+                    {key: loaded.get(f"images/{rel_path.as_posix()}") for key, rel_path in hand_set.items()}
+                    for hand_set in cls._HAND_SPRITES
+                ]
+                cls._player_crowns_cache = [
+                    loaded.get(f"images/{rel_path.as_posix()}") for rel_path in cls._CROWN_SPRITES
+                ]
+            return True
+
+        assets.add_main_thread_task("game_menu_sprites", _fill_caches, requires=names)
 
     def _blit_rotate(
         self,
@@ -196,7 +279,9 @@ class GameMenu(PyGameMenu):
                         _, target = self.pause_menu_buttons[
                             self.pause_menu_selected_index
                         ]
-                        if target:
+                        if target == self._rejoin:
+                            self._rejoin()
+                        elif target:
                             # target is expected to be a factory that creates a new state
                             self.manager.change(target)
                         else:  # If no target is passed, resume the game
@@ -205,7 +290,10 @@ class GameMenu(PyGameMenu):
                     # No event handling when game is paused or in animation
                     if self.game_stage <= 1:  # If the game is not in animation or over
                         # Handle game input
-                        if self.game_stage == 0 and self.player1_menu_choice is None:
+                        if self.remote is not None and self.remote.state != "playing":
+                            # Online match not started yet (or aborted)
+                            pass
+                        elif self.game_stage == 0 and self.player1_menu_choice is None:
                             # Player 1 turn
                             if e.key == pygame.K_LEFT or e.key == pygame.K_q:
                                 self.player1_menu_index = (
@@ -225,7 +313,12 @@ class GameMenu(PyGameMenu):
                                 ]
                                 self.player1_menu_choice = choice
                                 self.game_stage = 1
-                                if self.is_against_machine:
+                                if self.remote is not None:
+                                    # Only the commitment is sent, the opponent's move comes with the result
+                                    self.remote.submit_move(choice)
+                                    if self.predict:
+                                        self.game_stage = 2
+                                elif self.is_against_machine:
                                     self.player2_menu_choice = random.choice(
                                         [btn[1] for btn in self.player2_menu_buttons]
                                     )
@@ -234,6 +327,7 @@ class GameMenu(PyGameMenu):
                             self.game_stage == 1
                             and self.player2_menu_choice is None
                             and not self.is_against_machine
+                            and self.remote is None
                         ):
                             # Player 2 turn (if not against machine)
                             if e.key == pygame.K_LEFT or e.key == pygame.K_q:
@@ -258,24 +352,33 @@ class GameMenu(PyGameMenu):
                         self.game_stage == 4
                         and self.get_winner() > 0
                         and self.is_game_over()
-                    ):
+                    ) or self._remote_aborted():
                         # Game is over, wait for any key to restart
                         if e.key == pygame.K_RETURN or e.key == pygame.K_SPACE:
-                            # Redirect to a new game menu instance
-                            self.manager.change(
-                                lambda mgr: GameMenu(
-                                    mgr,
-                                    self.screen,
-                                    self.bg,
-                                    self.is_against_machine,
-                                    self.back_target,
-                                )
-                            )
+                            if self.remote is not None:
+                                self._rejoin()
+                            else:
+                                # Start a new match (reuses this pooled instance)
+                                self.manager.change(self.restart_factory)
 
     def update(self, dt):
         """Update the game menu state."""
         super().update(dt)
 
+        if self.remote is not None:
+            self.remote.poll()
+            if self.game_stage in (1, 3) and self.player2_menu_choice is None:
+                # Wait for the server to resolve the round (while animating when predicting)
+                result = self.remote.pop_result()
+                if result is not None:
+                    self.remote_result = result
+                    self.player2_menu_choice = result.opponent_move
+                    if self.game_stage == 1:
+                        self.game_stage = 2
+                elif self.game_stage == 3 and self.remote.state != "playing":
+                    # the match ended without a result for this round: drop the predicted animation
+                    self._reset_round()
+
         # Handle the animation and then set the game to over
         if self.game_stage == 2:
             # Stop idle animation and start the animation stage
@@ -291,41 +394,27 @@ class GameMenu(PyGameMenu):
             if self.animation_start_time is None:
                 self.animation_start_time = pygame.time.get_ticks()
             elapsed = pygame.time.get_ticks() - self.animation_start_time
-            if elapsed >= 5000:
+            if elapsed >= self.TIE_RESTART_MS:
                 # Restart the game
-                self.game_stage = 0
-                self.player1_menu_choice = None
-                self.player2_menu_choice = None
-                self.player1_menu_index = 0
-                self.player2_menu_index = 0
-                self.animate_hand_idle = True
-                self.animation_start_time = None
-                self.animation_stage = 0
+                self._reset_round()
         elif self.game_stage == 4 and not self.is_game_over():
             # Game is over but no player has reached 3 wins yet, wait for 2 seconds and restart the game
             if self.animation_start_time is None:
                 self.animation_start_time = pygame.time.get_ticks()
             elapsed = pygame.time.get_ticks() - self.animation_start_time
-            if elapsed >= 2500:
+            if elapsed >= self.NEXT_ROUND_MS:
                 # Restart the game
-                self.game_stage = 0
-                self.player1_menu_choice = None
-                self.player2_menu_choice = None
-                self.player1_menu_index = 0
-                self.player2_menu_index = 0
-                self.animate_hand_idle = True
-                self.animation_start_time = None
-                self.animation_stage = 0
+                self._reset_round()
 
     def draw(self, screen: pygame.Surface):
         """Draw the game menu."""
         # Render GL background first
-        self.bg.render()
+        self.draw_background()
 
-        # Create a transparent surface for the UI
-        ui_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-        font = pygame.font.SysFont("Arial", 40)
-        player_choice_font = pygame.font.SysFont("Arial", 25)
+        # Transparent surface for the UI (reused every frame)
+        ui_surface = self.ui_surface(screen)
+        font = get_font("Arial", 40)
+        player_choice_font = get_font("Arial", 25)
 
         # Render the player hands (static for now)
         if self.animate_hand_idle:
@@ -370,7 +459,21 @@ class GameMenu(PyGameMenu):
             self._blit_rotate(ui_surface, img2, topleft2, pivot2, angle2)
 
         # Render the player choices depending on the game state
-        if self.player1_menu_choice is None:
+        status = self._status_text() if self.game_stage < 2 else None
+        if status is not None:
+            text = font.render(status, True, (255, 255, 255))
+            ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
+            hint = self._status_hint()
+            if hint is not None:
+                restart_text = player_choice_font.render(hint, True, (255, 128, 0))
+                ui_surface.blit(
+                    restart_text,
+                    (
+                        screen.get_width() // 2 - restart_text.get_width() // 2,
+                        screen.get_height() - restart_text.get_height() - 20,
+                    ),
+                )
+        elif self.player1_menu_choice is None:
             text = font.render("Player 1: Choose your move", True, (255, 255, 255))
             ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
             for i, (label, _) in enumerate(self.player1_menu_buttons):
@@ -379,10 +482,13 @@ class GameMenu(PyGameMenu):
                 )
                 # Rendered in bottom left corner
                 rect = pygame.Rect(15 + i * 100, screen.get_height() - 70, 90, 50)
-                pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect)
+                ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect))
                 text = player_choice_font.render(label, True, color)
                 ui_surface.blit(text, (20 + i * 100, screen.get_height() - 65))
-        elif self.player2_menu_choice is None and not self.is_against_machine:
+        elif self.player2_menu_choice is None and self.remote is not None and self.game_stage < 3:
+            text = font.render(self._opponent_wait_text(), True, (255, 255, 255))
+            ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
+        elif self.player2_menu_choice is None and self.remote is None and not self.is_against_machine:
             text = font.render("Player 2: Choose your move", True, (255, 255, 255))
             ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
             for i, (label, _) in enumerate(self.player2_menu_buttons):
@@ -398,7 +504,7 @@ class GameMenu(PyGameMenu):
                     90,
                     50,
                 )
-                pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect)
+                ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect))
                 text = player_choice_font.render(label, True, color)
                 ui_surface.blit(
                     text,
@@ -413,7 +519,7 @@ class GameMenu(PyGameMenu):
             if self.animation_stage == 0:
                 # Move hands closer to center
                 elapsed = pygame.time.get_ticks() - self.animation_start_time
-                duration = 1000  # ms
+                duration = self.MOVE_TO_CENTER_MS
                 if elapsed >= duration:
                     elapsed = duration
                     self.animation_stage = 1
@@ -456,11 +562,13 @@ class GameMenu(PyGameMenu):
             elif self.animation_stage == 1:
                 # Rotate hands up and down 3 times
                 elapsed = pygame.time.get_ticks() - self.animation_start_time
-                duration = 3000  # ms
+                duration = self.SHAKE_MS
                 if elapsed >= duration:
                     elapsed = duration
-                    self.animation_stage = 2
-                    self.animation_start_time = pygame.time.get_ticks()
+                    # a predicted round waits here, hands still, for the opponent's move
+                    if self.player2_menu_choice is not None:
+                        self.animation_stage = 2
+                        self.animation_start_time = pygame.time.get_ticks()
                 progress = elapsed / duration
                 # Compute hand positions
                 player1_hand_pos = (
@@ -499,10 +607,14 @@ class GameMenu(PyGameMenu):
                 pivot2 = (0, img2.get_height() // 2)
                 self._blit_rotate(ui_surface, img1, topleft1, pivot1, angle1)
                 self._blit_rotate(ui_surface, img2, topleft2, pivot2, angle2)
+                if self.player2_menu_choice is None and elapsed >= duration:
+                    # the shake is over but the server did not reveal the round yet
+                    text = font.render(self._opponent_wait_text(), True, (255, 255, 255))
+                    ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
             elif self.animation_stage == 2:
                 # Reveal choices
                 elapsed = pygame.time.get_ticks() - self.animation_start_time
-                duration = 1000  # ms
+                duration = self.REVEAL_MS
                 if elapsed >= duration:
                     elapsed = duration
                     self.animation_stage = 3
@@ -600,9 +712,10 @@ class GameMenu(PyGameMenu):
                 result_text = "Player Blue Wins!"
             else:
                 result_text = (
-                    "Player Red Wins!"
-                    if not self.is_against_machine
-                    else "Machine Wins!"
+                    "Machine Wins!"
+                    if self.is_against_machine
+                    else "Opponent Wins!" if self.remote is not None
+                    else "Player Red Wins!"
                 )
             text = font.render(result_text, True, (255, 255, 255))
             ui_surface.blit(text, (screen.get_width() // 2 - text.get_width() // 2, 30))
@@ -616,9 +729,10 @@ class GameMenu(PyGameMenu):
 
             p2_text = font.render(
                 (
-                    f"Player Red chose: {self.player2_menu_choice}"
-                    if not self.is_against_machine
-                    else f"Machine chose: {self.player2_menu_choice}"
+                    f"Machine chose: {self.player2_menu_choice}"
+                    if self.is_against_machine
+                    else f"Opponent chose: {self.player2_menu_choice}" if self.remote is not None
+                    else f"Player Red chose: {self.player2_menu_choice}"
                 ),
                 True,
                 (255, 255, 255),
@@ -629,7 +743,7 @@ class GameMenu(PyGameMenu):
 
             if winner != 0 and self.is_game_over():
                 restart_text = player_choice_font.render(
-                    "Press Enter or Space to play again", True, (255, 128, 0)
+                    self.play_again_text, True, (255, 128, 0)
                 )
                 ui_surface.blit(
                     restart_text,
@@ -640,7 +754,7 @@ class GameMenu(PyGameMenu):
                 )
             elif winner != 0 and not self.is_game_over():
                 next_text = player_choice_font.render(
-                    "Next round starting in 2.5 seconds...", True, (255, 128, 0)
+                    f"Next round starting in {self.NEXT_ROUND_MS / 1000:g} seconds...", True, (255, 128, 0)
                 )
                 ui_surface.blit(
                     next_text,
@@ -651,7 +765,7 @@ class GameMenu(PyGameMenu):
                 )
             else:
                 tie_text = player_choice_font.render(
-                    "It's a tie! Restarting in 5 seconds...", True, (255, 128, 0)
+                    f"It's a tie! Restarting in {self.TIE_RESTART_MS / 1000:g} seconds...", True, (255, 128, 0)
                 )
                 ui_surface.blit(
                     tie_text,
@@ -672,7 +786,7 @@ class GameMenu(PyGameMenu):
                     else (200, 200, 200)
                 )
                 rect = pygame.Rect(50, 150 + i * 60, 300, 50)
-                pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect)
+                ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect))
                 text = font.render(label, True, color)
                 ui_surface.blit(text, (60, 160 + i * 60))
 
@@ -693,32 +807,60 @@ class GameMenu(PyGameMenu):
         if self.player1_menu_choice is None or self.player2_menu_choice is None:
             return -1  # Game not yet decided
 
-        if self.player1_menu_choice == self.player2_menu_choice:
-            return 0  # Tie
-
-        winning_combinations = {
-            "rock": "scissors",
-            "scissors": "paper",
-            "paper": "rock",
-        }
-
-        if winning_combinations[self.player1_menu_choice] == self.player2_menu_choice:
-            return 1  # Player 1 wins
-        return 2  # Player 2 wins
+        return round_winner(self.player1_menu_choice, self.player2_menu_choice)
 
     def is_game_over(self) -> bool:
         """Check if the game is over."""
-        if self.game_stage == 4 and self.player_scores[0] >= 3:
-            return True
-        if self.game_stage == 4 and self.player_scores[1] >= 3:
-            return True
-
-        return False
+        return self.game_stage == 4 and is_match_over(self.player_scores)
 
     def update_scores(self):
         """Update the scores based on the current choices."""
+        if self.remote_result is not None:
+            # The match server is authoritative for online matches
+            self.player_scores = [self.remote_result.my_score, self.remote_result.opponent_score]
+            return
         winner = self.get_winner()
         if winner == 1:
             self.player_scores[0] += 1
         elif winner == 2:
             self.player_scores[1] += 1
+
+    def _status_text(self) -> Optional[str]:
+        """Text shown instead of the move selection while no move can be chosen (None: a move can be chosen)."""
+        if self.remote is not None and self.remote.state != "playing" and not self.remote.results:
+            return self._remote_status_text()
+        return None
+
+    def _status_hint(self) -> Optional[str]:
+        """Hint shown at the bottom of the screen along with the status text."""
+        return "Press Enter or Space to find a new opponent" if self._remote_aborted() else None
+
+    def _opponent_wait_text(self) -> str:
+        """Text shown while the online opponent's move is not known yet."""
+        if self.remote.opponent_committed:
+            return "Opponent locked in, revealing..."
+        return "Waiting for the opponent's move..."
+
+    def _remote_aborted(self) -> bool:
+        """Whether the online match ended early (opponent left, too slow, connection lost...)."""
+        return (
+            self.remote is not None
+            and self.game_stage < 2
+            and self.remote.state in ("over", "closed")
+            and not self.remote.results
+        )
+
+    def _remote_status_text(self) -> str:
+        """Text shown while the online match is not being played."""
+        if self.remote.state == "closed":
+            return f"Connection lost: {self.remote.error}" if self.remote.error else "Not connected"
+        if self.remote.state == "over" and self.remote.aborted is not None:
+            loser, reason = self.remote.aborted
+            if loser == self.remote.seat:
+                return "You ran out of time" if reason == ABORT_TIMEOUT else "You left the match"
+            if reason == ABORT_LEFT:
+                return "Your opponent left the match"
+            return "Your opponent ran out of time" if reason == ABORT_TIMEOUT else "Your opponent was disqualified"
+        if self.remote.state == "over":
+            return "Match over"
+        return "Waiting for an opponent..."
@@ -0,0 +1,62 @@
+"""Module for the loading screen shown while the GUI assets are being preloaded."""
+
+from typing import Callable
+
+import pygame
+from OpenGL.GL import glClearColor, glClear, GL_COLOR_BUFFER_BIT
+
+from src.scripts.gui_version.asset_manager.asset_manager import AssetManager
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, render_surface_fullscreen
+
+
+class LoadingMenu(PyGameMenu):
+    """Lightweight progress screen that finishes the asset loading a little every frame."""
+
+    # Time spent finishing assets on the main thread per frame
+    LOAD_BUDGET_MS = 4.0
+
+    def __init__(self, manager: StateManager, screen: pygame.Surface, assets: AssetManager, next_factory: Callable):
+        """Initializes the loading screen.
+
+        Parameters:
+        - assets: AssetManager with every asset already queued
+        - next_factory: factory of the state to switch to once loading is done
+        """
+        # No background yet: the shader is one of the assets being loaded
+        super().__init__(manager, screen, None)
+        self.assets = assets
+        self.next_factory = next_factory
+        # The default font does not need the (slow) system font lookup
+        self.font = pygame.font.Font(None, 36)
+
+    def input_state(self):
+        """No key does anything while loading."""
+        return ()
+
+    def update(self, dt):
+        """Finish some of the loaded assets and leave once everything is ready."""
+        super().update(dt)
+        if self.assets.process(self.LOAD_BUDGET_MS):
+            self.manager.change(self.next_factory)
+
+    def draw(self, screen: pygame.Surface):
+        glClearColor(0.05, 0.05, 0.08, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT)
+
+        ui_surface = self.ui_surface(screen)
+        width, height = screen.get_size()
+
+        # Render the loading label with animated dots
+        dots = "." * (int(self.t * 3) % 4)
+        text = self.font.render(f"Loading{dots}", True, (255, 255, 255))
+        ui_surface.blit(text, (width // 2 - 60, height // 2 - 40))
+
+        # Render the progress bar
+        bar = pygame.Rect(width // 4, height // 2, width // 2, 16)
+        ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), bar))
+        filled = bar.copy()
+        filled.width = int(bar.width * self.assets.progress)
+        ui_surface.mark(pygame.draw.rect(ui_surface, (255, 255, 0), filled))
+
+        render_surface_fullscreen(ui_surface)
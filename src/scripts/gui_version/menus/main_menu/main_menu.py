@@ -2,8 +2,8 @@
 
 import pygame
 
-from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
-from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, render_surface_fullscreen
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager, PooledFactory
+from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, get_font, render_surface_fullscreen
 from src.scripts.gui_version.menus.chose_gamemode_menu.chose_gamemode_menu import ChoseGameModeMenu
 from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
 
@@ -11,6 +11,9 @@ from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
 class MainMenu(PyGameMenu):
     """Class to handle the main menu."""
 
+    # Key of the main menu in the StateManager pool
+    POOL_KEY = "main_menu"
+
     def __init__(self, manager: StateManager, screen: pygame.Surface, bg : GPUBackground):
         super().__init__(manager, screen, bg)
 
@@ -20,17 +23,34 @@ class MainMenu(PyGameMenu):
         # Set up background
         self.bg = bg
 
-        # Menu buttons with factories that need self.bg
+        # Menu buttons with factories that need self.bg (pooled so the menus are reused)
+        back_factory = PooledFactory(MainMenu.POOL_KEY, lambda m: MainMenu(m, screen, self.bg))
         self.buttons = [
-            ("Start Game", lambda mgr: ChoseGameModeMenu(mgr, screen, self.bg, back_factory=lambda m: MainMenu(m, screen, self.bg))),
+            ("Start Game", PooledFactory(
+                ChoseGameModeMenu.POOL_KEY,
+                lambda mgr: ChoseGameModeMenu(mgr, screen, self.bg, back_factory=back_factory),
+            )),
             ("Quit", None)
         ]
         # font and texture cache for OpenGL-rendered text
-        self.font = pygame.font.SysFont("arial", 36)
+        self.font = get_font("arial", 36)
         # cache: (label, color) -> (texid, w, h)
         self._text_tex_cache = {}
 
 
+    def reset(self):
+        """Reset the menu selection."""
+        super().reset()
+        self.selected_index = 0
+
+    def prefetch_hints(self):
+        """The "Start Game" button leads to the game mode choice."""
+        return [self.buttons[0][1]]
+
+    def input_state(self):
+        """The keys move the selection."""
+        return (self.selected_index,)
+
     def handle_event(self, event):
         """Handle events specific to the main menu."""
 
@@ -49,11 +69,11 @@ class MainMenu(PyGameMenu):
 
     def draw(self, screen):
         # Render GL background first
-        self.bg.render()
+        self.draw_background()
 
-        # Create a transparent surface for the UI
-        ui_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-        font = pygame.font.SysFont("Arial", 40)
+        # Transparent surface for the UI (reused every frame)
+        ui_surface = self.ui_surface(screen)
+        font = get_font("Arial", 40)
 
 
         # Render the menu title
@@ -64,7 +84,7 @@ class MainMenu(PyGameMenu):
         for i, (label, _) in enumerate(self.buttons):
             color = (255, 255, 0) if i == self.selected_index else (200, 200, 200)
             rect = pygame.Rect(50, 150 + i * 60, 200, 50)
-            pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect)
+            ui_surface.mark(pygame.draw.rect(ui_surface, (0, 0, 0, 150), rect))
             text = self.font.render(label, True, color)
             ui_surface.blit(text, (rect.x + 10, rect.y + 10))
 
@@ -0,0 +1,240 @@
+"""Module for the menu showing a grid of live online matches."""
+
+import math
+from typing import Callable, Optional
+
+import numpy as np
+import pygame
+
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+from src.scripts.gui_version.gui_utils.gui_utils import PyGameMenu, get_font
+from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+from src.scripts.gui_version.sprite_batch.sprite_batch import (
+    INSTANCE_FLOATS,
+    SOLID,
+    GlyphAtlas,
+    SpriteAtlas,
+    SpriteBatch,
+)
+from src.scripts.network.match_client.match_client import MultiSpectatorClient, WatchedMatch
+from src.scripts.network.match_protocol.match_protocol import ABORT_LEFT, ABORT_TIMEOUT, BOTH_SEATS
+
+# Seconds the hands shake after a reveal before showing the moves (like the GameMenu animation)
+SHAKE_SECONDS = 1.0
+# Height of the glyphs in the text atlas, text is drawn scaled from it
+GLYPH_SIZE = 48
+
+PANEL_TINT = (0.0, 0.0, 0.0, 0.45)
+EMPTY_PANEL_TINT = (0.0, 0.0, 0.0, 0.2)
+TEXT_TINT = (1.0, 1.0, 1.0, 1.0)
+RATING_TINT = (0.8, 0.8, 0.8, 1.0)
+STATUS_TINT = (1.0, 0.5, 0.0, 1.0)
+
+
+class SpectatorGridMenu(PyGameMenu):
+    """
+    Class to handle a grid of live online matches, for event screens.
+
+    Every tile follows one match of a MultiSpectatorClient with its hands, scores, ratings
+    and crown. Nothing goes through a pygame overlay: the tiles are rows of a SpriteBatch
+    sampling a sprite atlas (hands, crowns) and a glyph atlas, drawn on top of the shared
+    background in a single instanced draw call whatever the number of tiles. The text of a
+    tile is only laid out again when its match changes.
+    """
+
+    def __init__(
+        self,
+        manager: StateManager,
+        screen: pygame.Surface,
+        bg: GPUBackground,
+        spectator: MultiSpectatorClient,
+        columns: int = 4,
+        rows: int = 4,
+        back_factory: Optional[Callable] = None,
+    ):
+        """Initialize the grid following the `columns` x `rows` slots of `spectator`."""
+        super().__init__(manager, screen, bg)
+        self.spectator = spectator
+        self.columns = columns
+        self.rows = rows
+        self.back_target = back_factory
+
+        if GameMenu._player_hands_cache is None or GameMenu._player_crowns_cache is None:
+            GameMenu._load_sprite_caches()
+        sprites = {}
+        for seat, hands in enumerate(GameMenu._player_hands_cache):
+            for move, surface in hands.items():
+                sprites[("hand", seat, move)] = surface
+        for seat, surface in enumerate(GameMenu._player_crowns_cache):
+            sprites[("crown", seat)] = surface
+        self.sprites = SpriteAtlas(sprites)
+        self.glyphs = GlyphAtlas(get_font("arial", GLYPH_SIZE))
+        self.batch = SpriteBatch([self.sprites, self.glyphs])
+        self.reset()
+
+    def reset(self):
+        """Forget the laid out text."""
+        super().reset()
+        # per tile: (layout key, rows of its text)
+        self._text_cache: list = [(None, None)] * (self.columns * self.rows)
+        self._text_rows = np.zeros((0, INSTANCE_FLOATS), dtype=np.float32)
+
+    def input_state(self):
+        """The keys only reconnect (or leave)."""
+        return (self.spectator.state,)
+
+    def release(self):
+        """Free the atlases and stop watching."""
+        super().release()
+        self.batch.release_gl_resources()
+        self.spectator.close()
+
+    def handle_event(self, event):
+        """Escape goes back, Enter or Space reconnects after a lost connection."""
+        for e in event:
+            if e.type != pygame.KEYDOWN:
+                continue
+            if e.key == pygame.K_ESCAPE:
+                if self.back_target:
+                    self.manager.change(self.back_target)
+                else:
+                    pygame.event.post(pygame.event.Event(pygame.QUIT))
+            elif (e.key == pygame.K_RETURN or e.key == pygame.K_SPACE) and self.spectator.state == "closed":
+                self.spectator.connect()
+
+    def update(self, dt):
+        """Read the changes of the watched matches."""
+        super().update(dt)
+        self.spectator.poll()
+
+    # --- layout ---
+
+    def _tile_rect(self, index: int, width: int, height: int) -> tuple:
+        tile_w, tile_h = width / self.columns, height / self.rows
+        margin = 0.03 * min(tile_w, tile_h)
+        x, y = (index % self.columns) * tile_w, (index // self.columns) * tile_h
+        return (x + margin, y + margin, tile_w - 2 * margin, tile_h - 2 * margin)
+
+    def _hand_rows(self, rect: tuple, match: WatchedMatch, now: float) -> list:
+        """The two hands of a tile: bobbing, shaking after a reveal, then showing the moves."""
+        x, y, w, h = rect
+        src_w, src_h = self.sprites.sizes[("hand", 0, "rock")]
+        hand_w = 0.45 * w
+        hand_h = min(hand_w * src_h / src_w, 0.45 * h)
+        hand_w = hand_h * src_w / src_h
+        hand_y = y + 0.58 * h - hand_h / 2
+        moves = ("rock", "rock")
+        if _shaking(match, now):
+            # up and down 2.5 times, like the GameMenu reveal
+            progress = (now - match.revealed_at) / SHAKE_SECONDS
+            angles = (30 * math.sin(progress * 5 * math.pi), 30 * math.sin(progress * 5 * math.pi + math.pi + 0.1))
+        elif match.moves is not None:
+            moves, angles = match.moves, (0.0, 0.0)
+        else:
+            # idle bobbing, each tile slightly out of phase with the others
+            phase = now / 0.4 + match.match_id
+            angles = (5.0 * math.sin(phase), 5.0 * math.sin(phase + 1.62))
+        return [
+            # pivots at the wrists: right middle for blue, left middle for red
+            self.batch.sprite(self.sprites, ("hand", 0, moves[0]), (x, hand_y, hand_w, hand_h),
+                              pivot=(hand_w, hand_h / 2), angle=angles[0]),
+            self.batch.sprite(self.sprites, ("hand", 1, moves[1]), (x + w - hand_w, hand_y, hand_w, hand_h),
+                              pivot=(0.0, hand_h / 2), angle=angles[1]),
+        ]
+
+    def _crown_row(self, rect: tuple, match: WatchedMatch) -> tuple:
+        x, y, w, h = rect
+        src_w, src_h = self.sprites.sizes[("crown", 0)]
+        crown_h = 0.3 * h
+        crown_w = crown_h * src_w / src_h
+        winner = match.winner()
+        return self.batch.sprite(self.sprites, ("crown", winner - 1), (x + (w - crown_w) / 2, y + 0.42 * h, crown_w, crown_h))
+
+    def _text_of(self, rect: tuple, match: Optional[WatchedMatch], shaking: bool) -> np.ndarray:
+        """Rows of the text of a tile: scores, ratings and status."""
+        x, y, w, h = rect
+        center = x + w / 2
+        rows = []
+        if match is None:
+            rows += self.batch.text(self.glyphs, "Waiting for a match...", (center, y + 0.44 * h), 0.1 * h, RATING_TINT, 0.5)
+        else:
+            rows += self.batch.text(self.glyphs, f"{match.scores[0]} - {match.scores[1]}", (center, y + 0.04 * h), 0.2 * h, TEXT_TINT, 0.5)
+            rows += self.batch.text(self.glyphs, str(match.ratings[0]), (x + 0.04 * w, y + 0.08 * h), 0.11 * h, RATING_TINT)
+            rows += self.batch.text(self.glyphs, str(match.ratings[1]), (x + 0.96 * w, y + 0.08 * h), 0.11 * h, RATING_TINT, 1.0)
+            rows += self.batch.text(self.glyphs, "Revealing..." if shaking else _status(match), (center, y + 0.86 * h), 0.1 * h, STATUS_TINT, 0.5)
+        return np.array(rows, dtype=np.float32).reshape(-1, INSTANCE_FLOATS)
+
+    def _text_rows_for(self, rects: list, now: float) -> np.ndarray:
+        """Text of every tile, laid out again only for the tiles whose match changed."""
+        changed = False
+        for index, rect in enumerate(rects):
+            match = self.spectator.slots[index] if index < len(self.spectator.slots) else None
+            shaking = _shaking(match, now)
+            key = (rect, None) if match is None else (rect, match.match_id, match.version, shaking)
+            if self._text_cache[index][0] != key:
+                self._text_cache[index] = (key, self._text_of(rect, match, shaking))
+                changed = True
+        if changed:
+            self._text_rows = np.concatenate([rows for _, rows in self._text_cache])
+        return self._text_rows
+
+    def build_rows(self, width: int, height: int, now: float) -> np.ndarray:
+        """Instance rows of the whole grid: text bands, then hands and crowns, then text."""
+        rects = [self._tile_rect(index, width, height) for index in range(self.columns * self.rows)]
+        panels, sprites = [], []
+        slots = self.spectator.slots
+        for index, rect in enumerate(rects):
+            match = slots[index] if index < len(slots) else None
+            x, y, w, h = rect
+            if match is None:
+                panels.append(self.batch.sprite(self.sprites, SOLID, (x, y + 0.4 * h, w, 0.2 * h), EMPTY_PANEL_TINT))
+                continue
+            # bands behind the text only: the whole tile would cost a full-window blend
+            panels.append(self.batch.sprite(self.sprites, SOLID, (x, y, w, 0.28 * h), PANEL_TINT))
+            panels.append(self.batch.sprite(self.sprites, SOLID, (x, y + 0.84 * h, w, 0.16 * h), PANEL_TINT))
+            sprites += self._hand_rows(rect, match, now)
+            if match.winner() and not _shaking(match, now):
+                sprites.append(self._crown_row(rect, match))
+        return np.concatenate([np.array(panels + sprites, dtype=np.float32), self._text_rows_for(rects, now)])
+
+    def draw(self, screen: pygame.Surface):
+        """Draw the background, then every tile in one instanced draw call."""
+        self.draw_background()
+        width, height = screen.get_size()
+        rows = self.build_rows(width, height, self.spectator.clock())
+        if self.spectator.state == "closed":
+            # one line over the grid: nothing will change until the user reconnects
+            message = f"Connection lost: {self.spectator.error}" if self.spectator.error else "Not connected"
+            rows = np.concatenate([rows, np.array(
+                self.batch.text(self.glyphs, message, (width / 2, height * 0.4), 28, TEXT_TINT, 0.5)
+                + self.batch.text(self.glyphs, "Press Enter or Space to reconnect", (width / 2, height * 0.4 + 36), 20, STATUS_TINT, 0.5),
+                dtype=np.float32,
+            )])
+        self.batch.draw(rows, width, height)
+
+
+def _shaking(match: Optional[WatchedMatch], now: float) -> bool:
+    """Whether the hands of `match` still shake before showing the last revealed moves."""
+    return match is not None and match.revealed_at is not None and now - match.revealed_at < SHAKE_SECONDS
+
+
+def _status(match: WatchedMatch) -> str:
+    """One line describing where a watched match is."""
+    if match.aborted is not None:
+        loser, reason = match.aborted
+        if loser == BOTH_SEATS:
+            return "Both ran out of time"
+        player = "Blue" if loser == 0 else "Red"
+        if reason == ABORT_LEFT:
+            return f"{player} left"
+        return f"{player} ran out of time" if reason == ABORT_TIMEOUT else f"{player} disqualified"
+    winner = match.winner()
+    if winner:
+        return "Blue wins!" if winner == 1 else "Red wins!"
+    blue, red = match.committed
+    if blue and red:
+        return "Revealing..."
+    if blue or red:
+        return f"{'Blue' if blue else 'Red'} locked in"
+    return f"Round {match.round + 1}"
@@ -0,0 +1,110 @@
+"""Module for the read-only menu showing a live online match."""
+
+from typing import Callable, Optional
+import pygame
+from src.scripts.gui_version.game_state_manager.game_state_manager import StateManager
+from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+from src.scripts.gui_version.menus.game_menu.game_menu import GameMenu
+from src.scripts.network.match_client.match_client import SpectatorClient
+from src.scripts.network.match_protocol.match_protocol import ABORT_LEFT, ABORT_TIMEOUT, BOTH_SEATS
+
+
+class SpectatorMenu(GameMenu):
+    """
+    Class to handle the spectator view of an online match.
+
+    The changes of the match sent by the server drive the same stages and animations
+    as a local game: a revealed round starts the hands animation with both moves, and
+    the GameMenu drawing is reused as is. Nothing is sent back but the match to watch.
+    """
+
+    def __init__(
+        self,
+        manager: StateManager,
+        screen: pygame.Surface,
+        bg: GPUBackground,
+        spectator: SpectatorClient,
+        back_factory: Optional[Callable] = None,
+    ):
+        """Initialize the spectator menu following the match watched by `spectator`."""
+        super().__init__(manager, screen, bg, False, back_factory)
+        self.spectator = spectator
+        # Nothing to restart: only resume or leave
+        self.pause_menu_buttons = [
+            ("Resume", None),
+            ("Quit to Main Menu", self.back_target),
+        ]
+        self.play_again_text = "Press Enter or Space to watch another match"
+
+    def input_state(self):
+        """The keys also reconnect or watch the next match."""
+        return super().input_state() + (self.spectator.state,)
+
+    def release(self):
+        """Free the GL resources and stop watching."""
+        super().release()
+        self.spectator.close()
+
+    def handle_event(self, event):
+        """Only the pause menu and watching the next match are available."""
+        for e in event:
+            if e.type != pygame.KEYDOWN:
+                continue
+            if self.is_paused or e.key == pygame.K_ESCAPE:
+                super().handle_event([e])
+            elif (e.key == pygame.K_RETURN or e.key == pygame.K_SPACE) and self._watch_over():
+                if self.spectator.state == "closed":
+                    self.spectator.connect()
+                else:
+                    self.spectator.watch()
+                self.reset()
+
+    def update(self, dt):
+        """Turn the rounds revealed by the server into the GameMenu stages."""
+        self.spectator.poll()
+        if self.game_stage == 0:
+            result = self.spectator.pop_result()
+            if result is not None:
+                # Both moves are known at once: go straight to the animation
+                self.remote_result = result
+                self.player1_menu_choice = result.my_move
+                self.player2_menu_choice = result.opponent_move
+                self.game_stage = 2
+        super().update(dt)
+
+    def _watch_over(self) -> bool:
+        """Whether the watched match ended and everything about it was shown."""
+        if self.game_stage < 2:
+            return self.spectator.state in ("over", "closed") and not self.spectator.results
+        return self.game_stage == 4 and self.get_winner() > 0 and self.is_game_over()
+
+    def _status_text(self) -> Optional[str]:
+        spectator = self.spectator
+        if spectator.results:
+            # rounds already revealed wait for the animation of the previous one
+            return "Both players locked in, revealing..."
+        if spectator.state == "closed":
+            return f"Connection lost: {spectator.error}" if spectator.error else "Not connected"
+        if spectator.no_match:
+            return "No match is being played right now"
+        if spectator.aborted is not None:
+            loser, reason = spectator.aborted
+            if loser == BOTH_SEATS:
+                return "Both players ran out of time"
+            player = "Player Blue" if loser == 0 else "Player Red"
+            if reason == ABORT_LEFT:
+                return f"{player} left the match"
+            return f"{player} ran out of time" if reason == ABORT_TIMEOUT else f"{player} was disqualified"
+        if spectator.state in ("connecting", "waiting"):
+            return "Looking for a match to watch..."
+        if spectator.state == "over":
+            return "Match over"
+        blue, red = spectator.committed
+        if blue and red:
+            return "Both players locked in, revealing..."
+        if blue or red:
+            return f"{'Player Blue' if blue else 'Player Red'} locked in"
+        return "Waiting for the players' moves..."
+
+    def _status_hint(self) -> Optional[str]:
+        return self.play_again_text if self._watch_over() else None
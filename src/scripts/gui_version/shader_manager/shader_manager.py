@@ -0,0 +1,208 @@
+"""Module to build shader programs, caching the linked binaries between launches."""
+
+import hashlib
+import pathlib
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+from OpenGL.GL import *
+
+from src.scripts.gui_version.user_cache.user_cache import get_user_cache_dir
+from src.scripts.tracing.tracing import get_tracer
+
+# Cache file layout: magic, binary format (uint32), binary length (uint32), then the binary
+_CACHE_MAGIC = b"RPSB"
+_CACHE_HEADER = struct.Struct("<4sII")
+
+
+def _to_str(src) -> str:
+    return src.decode("utf-8") if isinstance(src, bytes) else src
+
+
+def compile_shader(shader_type, src):
+    """Compile a single shader stage and return its id."""
+    shader = glCreateShader(shader_type)
+    glShaderSource(shader, src)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        log = glGetShaderInfoLog(shader)
+        glDeleteShader(shader)
+        raise RuntimeError(log)
+    return shader
+
+
+class ShaderManager:
+    """Class to create shader programs from GLSL sources.
+
+    Linked programs are stored with `glGetProgramBinary` in the user cache directory,
+    keyed by a hash of the sources, attribute bindings and the driver/renderer strings.
+    Later launches reload the binary instead of compiling, and fall back to compiling
+    when the driver rejects it (e.g. after a driver update).
+    """
+
+    def __init__(self, cache_dir: Optional[pathlib.Path] = None, use_binary_cache: bool = True):
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir is not None else get_user_cache_dir("shader_cache")
+        self.use_binary_cache = use_binary_cache
+        self._driver_id = None
+        self._binary_supported = None
+        # Stats about the programs built by this manager, for the startup benchmarks
+        self.stats = {"binary_hits": 0, "compiled": 0, "rejected": 0, "seconds": 0.0}
+
+    def driver_id(self) -> str:
+        """Identity of the GL driver (vendor, renderer and version strings)."""
+        return self._get_driver_id()
+
+    def _get_driver_id(self) -> str:
+        if self._driver_id is None:
+            parts = []
+            for name in (GL_VENDOR, GL_RENDERER, GL_VERSION):
+                try:
+                    parts.append(_to_str(glGetString(name) or b""))
+                except Exception:
+                    parts.append("")
+            self._driver_id = "|".join(parts)
+        return self._driver_id
+
+    def _is_binary_supported(self) -> bool:
+        if self._binary_supported is None:
+            try:
+                self._binary_supported = int(glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS)) > 0
+            except Exception:
+                self._binary_supported = False
+        return self._binary_supported
+
+    def program_key(self, vertex_src, fragment_src, attrib_locations: Optional[dict] = None) -> str:
+        """Return the cache key of a program: hash of its sources plus the driver identity."""
+        h = hashlib.sha256()
+        h.update(_to_str(vertex_src).encode("utf-8"))
+        h.update(b"\0")
+        h.update(_to_str(fragment_src).encode("utf-8"))
+        h.update(b"\0")
+        for name, loc in sorted((attrib_locations or {}).items()):
+            h.update(f"{_to_str(name)}={loc};".encode("utf-8"))
+        h.update(self._get_driver_id().encode("utf-8"))
+        return h.hexdigest()
+
+    def get_program(self, vertex_src, fragment_src, attrib_locations: Optional[dict] = None):
+        """Return a linked program for the given sources, from the binary cache when possible.
+
+        Parameters:
+        - attrib_locations: optional dict attribute name -> location bound before linking
+        """
+        start = time.perf_counter()
+        use_cache = self.use_binary_cache and self._is_binary_supported()
+        cache_path = None
+        if use_cache:
+            cache_path = self.cache_dir / f"{self.program_key(vertex_src, fragment_src, attrib_locations)}.bin"
+            with get_tracer().span("load program binary", "shader"):
+                prog = self._load_binary(cache_path)
+            if prog is not None:
+                self.stats["binary_hits"] += 1
+                self.stats["seconds"] += time.perf_counter() - start
+                return prog
+
+        prog = self._compile_program(vertex_src, fragment_src, attrib_locations, retrievable=use_cache)
+        self.stats["compiled"] += 1
+        if use_cache:
+            self._store_binary(prog, cache_path)
+        self.stats["seconds"] += time.perf_counter() - start
+        return prog
+
+    def _compile_program(self, vertex_src, fragment_src, attrib_locations, retrievable):
+        """Compile and link vertex and fragment shaders."""
+        tracer = get_tracer()
+        with tracer.span("compile shaders", "shader"):
+            vs = compile_shader(GL_VERTEX_SHADER, vertex_src)
+            try:
+                fs = compile_shader(GL_FRAGMENT_SHADER, fragment_src)
+            except RuntimeError:
+                glDeleteShader(vs)
+                raise
+
+        prog = glCreateProgram()
+        glAttachShader(prog, vs)
+        glAttachShader(prog, fs)
+        for name, loc in (attrib_locations or {}).items():
+            glBindAttribLocation(prog, loc, name)
+        if retrievable:
+            try:
+                glProgramParameteri(prog, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+            except Exception:
+                pass
+        with tracer.span("link program", "shader"):
+            glLinkProgram(prog)
+            # the link status waits for the driver (which may link lazily)
+            linked = glGetProgramiv(prog, GL_LINK_STATUS)
+
+        # the shader objects are not needed once the program is linked
+        glDetachShader(prog, vs)
+        glDetachShader(prog, fs)
+        glDeleteShader(vs)
+        glDeleteShader(fs)
+
+        if not linked:
+            log = glGetProgramInfoLog(prog)
+            glDeleteProgram(prog)
+            raise RuntimeError(log)
+        return prog
+
+    def _load_binary(self, cache_path: pathlib.Path):
+        """Create a program from a cached binary, or return None if missing or rejected."""
+        try:
+            data = cache_path.read_bytes()
+        except OSError:
+            return None
+        if len(data) < _CACHE_HEADER.size:
+            return None
+        magic, binary_format, length = _CACHE_HEADER.unpack_from(data)
+        binary = data[_CACHE_HEADER.size:]
+        if magic != _CACHE_MAGIC or length != len(binary):
+            return None
+
+        prog = glCreateProgram()
+        try:
+            glProgramBinary(prog, binary_format, binary, length)
+            linked = glGetProgramiv(prog, GL_LINK_STATUS)
+        except Exception:
+            linked = False
+        if not linked:
+            # The driver rejected the binary: drop it, the caller will recompile
+            glDeleteProgram(prog)
+            self.stats["rejected"] += 1
+            try:
+                cache_path.unlink()
+            except OSError:
+                pass
+            return None
+        return prog
+
+    def _store_binary(self, prog, cache_path: pathlib.Path):
+        """Store the binary of a linked program, silently ignoring failures."""
+        try:
+            length = int(glGetProgramiv(prog, GL_PROGRAM_BINARY_LENGTH))
+            if length <= 0:
+                return
+            binary = np.zeros(length, dtype=np.uint8)
+            written = np.zeros(1, dtype=np.int32)
+            binary_format = np.zeros(1, dtype=np.uint32)
+            glGetProgramBinary(prog, length, written, binary_format, binary)
+            payload = binary[: int(written[0])].tobytes()
+            # write to a temporary file first so a crash never leaves a truncated binary
+            tmp_path = cache_path.with_suffix(".tmp")
+            tmp_path.write_bytes(_CACHE_HEADER.pack(_CACHE_MAGIC, int(binary_format[0]), len(payload)) + payload)
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            print(f"Warning: could not store shader binary: {e}")
+
+
+_default_manager = None
+
+
+def get_shader_manager() -> ShaderManager:
+    """Return the shader manager shared by the whole GUI."""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = ShaderManager()
+    return _default_manager
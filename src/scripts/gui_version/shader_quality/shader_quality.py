@@ -0,0 +1,169 @@
+"""Module to pick the quality tier of the background shader for this machine."""
+
+import json
+import os
+import pathlib
+import statistics
+import time
+from typing import Optional
+
+from OpenGL.GL import *
+
+from src.scripts.gui_version.frame_profiler.frame_profiler import get_frame_profiler
+from src.scripts.gui_version.gpu_graphics.gpu_graphics import GPUBackground
+from src.scripts.gui_version.shader_manager.shader_manager import get_shader_manager
+from src.scripts.gui_version.user_cache.user_cache import get_user_cache_dir
+
+# GPU time the background may take: half of a 60 FPS frame, the rest is left to the UI
+BACKGROUND_BUDGET_MS = 8.0
+# Frames drawn before timing a tier (the first draws pay for uploads and driver compilation)
+WARMUP_FRAMES = 2
+TIMED_FRAMES = 5
+# File of the user cache directory remembering the tier chosen for each GL driver
+QUALITY_FILE = "background_quality.json"
+
+
+class QualityTier:
+    """
+    A variant of the background shader.
+
+    - warp_iterations: iterations of the warp loop, compiled in with a `#define`
+    - pixel_filter: pixel blocks along the window diagonal; the shader shows one colour per
+      block, so only one fragment per block is shaded (into a small texture stretched over
+      the window) and bigger blocks cost proportionally less
+    """
+
+    __slots__ = ("name", "warp_iterations", "pixel_filter")
+
+    def __init__(self, name: str, warp_iterations: int, pixel_filter: float):
+        self.name = name
+        self.warp_iterations = warp_iterations
+        self.pixel_filter = pixel_filter
+
+    def create_background(self, width, height, vertex_src, fragment_src, uniforms=None) -> GPUBackground:
+        """Build the background shader of this tier."""
+        return GPUBackground(
+            width, height, vertex_src, fragment_src,
+            dict(uniforms or {}, pixel_filter=self.pixel_filter),
+            defines={"WARP_ITERATIONS": self.warp_iterations},
+            render_blocks=True,
+        )
+
+    def __repr__(self):
+        return f"QualityTier({self.name!r}, {self.warp_iterations}, {self.pixel_filter})"
+
+
+# From the best looking to the cheapest
+TIERS = (
+    QualityTier("high", 5, 740.0),  # the original look: 1x1 pixel blocks at 640x360
+    QualityTier("medium", 5, 370.0),  # 2x2 pixel blocks at 640x360, a quarter of the fragments
+    QualityTier("low", 4, 185.0),
+    QualityTier("minimal", 3, 92.5),
+)
+
+
+def get_tier(name: str) -> Optional[QualityTier]:
+    """Return the tier called `name` (None if there is none)."""
+    for tier in TIERS:
+        if tier.name == name:
+            return tier
+    return None
+
+
+def time_background(bg: GPUBackground, frames: int = TIMED_FRAMES, warmup: int = WARMUP_FRAMES) -> float:
+    """
+    Median time of a frame of `bg` in milliseconds.
+
+    Measured with GL_TIME_ELAPSED queries, and with the wall time up to glFinish: software
+    rasterizers (llvmpipe) only report part of their work to the queries, so the longest
+    of the two counts. Without timer queries only the wall time is used.
+    """
+    # the frame profiler must not time these frames (nor start its own query inside ours)
+    with get_frame_profiler().gpu_paused():
+        for _ in range(warmup):
+            bg.render()
+        glFinish()
+        try:
+            queries = [int(query) for query in glGenQueries(frames)]
+        except Exception:
+            queries = None
+
+        wall_times = []
+        for index in range(frames):
+            start = time.perf_counter()
+            if queries is not None:
+                glBeginQuery(GL_TIME_ELAPSED, queries[index])
+            bg.render()
+            if queries is not None:
+                glEndQuery(GL_TIME_ELAPSED)
+            glFinish()
+            wall_times.append((time.perf_counter() - start) * 1000.0)
+    if queries is None:
+        return statistics.median(wall_times)
+    # 32 bit results: the nanoseconds of a frame are far below the 4 s they can hold
+    gpu_times = [int(glGetQueryObjectuiv(query, GL_QUERY_RESULT)) / 1e6 for query in queries]
+    glDeleteQueries(len(queries), queries)
+    return statistics.median(max(gpu, wall) for gpu, wall in zip(gpu_times, wall_times))
+
+
+def calibrate(width, height, vertex_src, fragment_src, uniforms=None, budget_ms: float = BACKGROUND_BUDGET_MS) -> tuple:
+    """
+    Time the tiers from the best looking one down and stop at the first within `budget_ms`.
+
+    Returns:
+        (chosen tier, {tier name: median GPU ms}), the cheapest tier if none fits the budget.
+    """
+    timings = {}
+    for tier in TIERS:
+        bg = tier.create_background(width, height, vertex_src, fragment_src, uniforms)
+        try:
+            timings[tier.name] = time_background(bg)
+        finally:
+            bg.release_gl_resources()
+        if timings[tier.name] <= budget_ms:
+            return tier, timings
+    return TIERS[-1], timings
+
+
+def _load_saved(path: pathlib.Path) -> dict:
+    try:
+        saved = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return saved if isinstance(saved, dict) else {}
+
+
+def choose_tier(width, height, vertex_src, fragment_src, uniforms=None, cache_dir: Optional[pathlib.Path] = None) -> QualityTier:
+    """
+    Return the tier of the background shader for this machine (main thread, GL context current).
+
+    - RPS_SHADER_QUALITY=high|medium|low|minimal forces a tier
+    - otherwise the tier saved for this GL driver by a previous launch is reused
+    - otherwise (or with RPS_SHADER_QUALITY=auto) the tiers are calibrated and the result
+      is saved in the user cache directory for the next launches
+    """
+    override = os.environ.get("RPS_SHADER_QUALITY", "").strip().lower()
+    if override and override != "auto":
+        tier = get_tier(override)
+        if tier is not None:
+            return tier
+        print(f"Warning: unknown RPS_SHADER_QUALITY '{override}', expected one of {[tier.name for tier in TIERS]}")
+
+    path = (pathlib.Path(cache_dir) if cache_dir is not None else get_user_cache_dir()) / QUALITY_FILE
+    saved = _load_saved(path)
+    driver = get_shader_manager().driver_id()
+    entry = saved.get(driver)
+    if override != "auto" and isinstance(entry, dict):
+        tier = get_tier(entry.get("tier"))
+        if tier is not None:
+            return tier
+
+    tier, timings = calibrate(width, height, vertex_src, fragment_src, uniforms)
+    saved[driver] = {"tier": tier.name, "timings_ms": timings, "window": [width, height]}
+    try:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(saved, indent=2))
+        tmp_path.replace(path)
+    except OSError:
+        pass  # calibrated again on the next launch
+    return tier
@@ -0,0 +1,313 @@
+"""Module for drawing many sprites and glyphs from texture atlases in one instanced draw call."""
+
+import string
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from src.scripts.gui_version.gpu_resources.gpu_resources import BUFFER, TEXTURE, get_gpu_resources
+
+# Floats per instance: rect (x, y, w, h), uv rect (u0, v0, u1, v1), tint (r, g, b, a),
+# pivot (x, y) relative to the rect, angle (degrees, counter-clockwise), atlas index
+INSTANCE_FLOATS = 16
+WHITE = (1.0, 1.0, 1.0, 1.0)
+# Name of the plain white sprite every SpriteAtlas has, tinted to draw flat panels
+SOLID = "__solid__"
+
+
+class TextureAtlas:
+    """
+    Pygame surfaces packed on shelves into one surface, looked up by name.
+
+    Transparent margins are trimmed before packing: a software rasterizer pays for every
+    covered pixel, transparent or not, so a sprite is drawn over its visible part only
+    (see `trims`). The atlas is only a surface: the SpriteBatch drawing from it owns the
+    GL texture.
+    """
+
+    def __init__(self, surfaces: dict, max_width: int = 2048, padding: int = 2):
+        """Pack `surfaces` (name -> pygame.Surface), tallest first so the shelves waste little space."""
+        self.sizes: dict = {}
+        # visible part of every surface as fractions of its size (left, top, right, bottom)
+        self.trims: dict = {}
+        visible = {}
+        for name, surface in surfaces.items():
+            w, h = surface.get_size()
+            bounds = surface.get_bounding_rect()
+            self.sizes[name] = (w, h)
+            self.trims[name] = (bounds.left / w, bounds.top / h, bounds.right / w, bounds.bottom / h) if w and h else (0, 0, 0, 0)
+            visible[name] = surface.subsurface(bounds)
+
+        names = sorted(visible, key=lambda name: visible[name].get_height(), reverse=True)
+        positions = {}
+        x = y = shelf_height = width = 0
+        for name in names:
+            w, h = visible[name].get_size()
+            if x and x + w + padding > max_width:
+                # start a new shelf
+                x, y, shelf_height = 0, y + shelf_height + padding, 0
+            positions[name] = (x, y)
+            x += w + padding
+            width = max(width, x)
+            shelf_height = max(shelf_height, h)
+        width, height = max(1, width), max(1, y + shelf_height)
+
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        self.uvs: dict = {}
+        for name, (x, y) in positions.items():
+            self.surface.blit(visible[name], (x, y))
+            w, h = visible[name].get_size()
+            # rows are uploaded top to bottom: v grows downwards like the screen coordinates
+            self.uvs[name] = (x / width, y / height, (x + w) / width, (y + h) / height)
+
+    def __contains__(self, name) -> bool:
+        return name in self.uvs
+
+
+class SpriteAtlas(TextureAtlas):
+    """Atlas of named sprites, plus a plain white one (SOLID) to draw tinted rectangles."""
+
+    def __init__(self, sprites: dict, max_width: int = 2048):
+        solid = pygame.Surface((4, 4), pygame.SRCALPHA)
+        solid.fill((255, 255, 255, 255))
+        super().__init__({**sprites, SOLID: solid}, max_width)
+        # sample the center of the white sprite only, its edges blend with the padding when filtered
+        u0, v0, u1, v1 = self.uvs[SOLID]
+        du, dv = (u1 - u0) / 4, (v1 - v0) / 4
+        self.uvs[SOLID] = (u0 + du, v0 + dv, u1 - du, v1 - dv)
+
+
+class GlyphAtlas(TextureAtlas):
+    """Atlas of the glyphs of a font rendered once in white, tinted when drawn."""
+
+    def __init__(self, font: pygame.font.Font, chars: str = string.printable.strip() + " "):
+        super().__init__({char: font.render(char, True, (255, 255, 255)) for char in chars})
+        self.line_height = font.get_linesize()
+
+    def text_width(self, text: str, height: float) -> float:
+        """Width of `text` drawn `height` pixels high."""
+        scale = height / self.line_height
+        return sum(self.sizes[char][0] for char in text if char in self.sizes) * scale
+
+
+class SpriteBatch:
+    """
+    Draws rows of instances (see INSTANCE_FLOATS) sampling up to two atlases in a single
+    instanced draw call, in row order (later rows on top).
+
+    Rows are built with `sprite` and `text` and drawn with `draw`; the instance buffer only
+    grows, so a steady number of sprites creates no GL object per frame.
+    """
+
+    MAX_ATLASES = 2
+
+    def __init__(self, atlases: list):
+        if len(atlases) > self.MAX_ATLASES:
+            raise ValueError(f"a SpriteBatch samples at most {self.MAX_ATLASES} atlases")
+        self.atlases = list(atlases)
+        self._atlas_index = {id(atlas): float(i) for i, atlas in enumerate(self.atlases)}
+        self.create_gl_resources()
+        # recreate the program, buffers and textures if a resize ever loses the GL context
+        get_gpu_resources().register(self)
+
+    # --- GL resources ---
+
+    def create_gl_resources(self):
+        """Compile the instanced shader, create the quad, the instance buffer and the atlas textures."""
+        gpu_resources = get_gpu_resources()
+        vert = b"""
+        #version 330
+        in vec2 corner;
+        in vec4 rect;
+        in vec4 uv_rect;
+        in vec4 tint;
+        in vec4 pivot_angle_atlas;
+        uniform vec2 viewport;
+        out vec2 v_uv;
+        out vec4 v_tint;
+        flat out float v_atlas;
+        void main() {
+            // rotate the corner around the pivot, in pixels with y pointing down
+            vec2 pivot = pivot_angle_atlas.xy;
+            float angle = radians(pivot_angle_atlas.z);
+            vec2 p = corner * rect.zw - pivot;
+            p = vec2(cos(angle) * p.x + sin(angle) * p.y, -sin(angle) * p.x + cos(angle) * p.y);
+            vec2 pos = rect.xy + pivot + p;
+            gl_Position = vec4(pos.x / viewport.x * 2.0 - 1.0, 1.0 - pos.y / viewport.y * 2.0, 0.0, 1.0);
+            v_uv = mix(uv_rect.xy, uv_rect.zw, corner);
+            v_tint = tint;
+            v_atlas = pivot_angle_atlas.w;
+        }
+        """
+        frag = b"""
+        #version 330
+        in vec2 v_uv;
+        in vec4 v_tint;
+        flat in float v_atlas;
+        uniform sampler2D atlas0;
+        uniform sampler2D atlas1;
+        out vec4 frag_color;
+        void main() {
+            // the atlas is the same for the whole quad, so the branch keeps the mipmap derivatives valid
+            vec4 texel = v_atlas < 0.5 ? texture(atlas0, v_uv) : texture(atlas1, v_uv);
+            frag_color = texel * v_tint;
+        }
+        """
+        self.program = gpu_resources.create_program(
+            self, vert, frag,
+            attrib_locations={b'corner': 0, b'rect': 1, b'uv_rect': 2, b'tint': 3, b'pivot_angle_atlas': 4},
+            label="sprite batch",
+        )
+        self.viewport_loc = glGetUniformLocation(self.program, b'viewport')
+        self.atlas_locs = [glGetUniformLocation(self.program, f"atlas{i}".encode()) for i in range(self.MAX_ATLASES)]
+
+        self.vao = gpu_resources.gen_vertex_array(self, "sprite batch")
+        glBindVertexArray(self.vao)
+        # unit quad drawn as a triangle strip, shared by every instance
+        corners = np.array([0, 0, 1, 0, 0, 1, 1, 1], dtype=np.float32)
+        self.quad_vbo = gpu_resources.gen_buffer(self, "sprite batch quad")
+        glBindBuffer(GL_ARRAY_BUFFER, self.quad_vbo)
+        glBufferData(GL_ARRAY_BUFFER, corners.nbytes, corners, GL_STATIC_DRAW)
+        gpu_resources.set_size(BUFFER, self.quad_vbo, corners.nbytes)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
+
+        self.instance_vbo = gpu_resources.gen_buffer(self, "sprite batch instances")
+        self.capacity = 0
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        stride = INSTANCE_FLOATS * 4
+        for location in range(1, 5):
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p((location - 1) * 16))
+            # one value per sprite instead of one per vertex
+            glVertexAttribDivisor(location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+        self.textures = [self._upload_atlas(atlas) for atlas in self.atlases]
+
+    def _upload_atlas(self, atlas: TextureAtlas) -> int:
+        width, height = atlas.surface.get_size()
+        tex_id = get_gpu_resources().gen_texture(self, "sprite batch atlas")
+        glBindTexture(GL_TEXTURE_2D, tex_id)
+        try:
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        except Exception:
+            pass
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     pygame.image.tostring(atlas.surface, "RGBA", False))
+        get_gpu_resources().record_upload(width * height * 4)
+        # sprites are drawn far smaller than their source size in a grid: mipmaps avoid shimmering,
+        # sampled from the nearest level only which costs a third less on software rasterizers
+        glGenerateMipmap(GL_TEXTURE_2D)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        # the mip chain adds about a third
+        get_gpu_resources().set_size(TEXTURE, tex_id, width * height * 4 * 4 // 3)
+        return tex_id
+
+    def release_gl_resources(self):
+        """Delete the program, buffers and atlas textures and stop tracking the batch."""
+        get_gpu_resources().release_owner(self)
+        get_gpu_resources().unregister(self)
+
+    # --- building rows ---
+
+    def sprite(
+        self,
+        atlas: TextureAtlas,
+        name,
+        rect: tuple,
+        tint: tuple = WHITE,
+        pivot: tuple = (0.0, 0.0),
+        angle: float = 0.0,
+    ) -> tuple:
+        """Row drawing sprite `name` of `atlas` stretched over `rect` (x, y, w, h),
+        rotated by `angle` degrees around `pivot` (relative to the rect topleft)."""
+        x, y, w, h = rect
+        left, top, right, bottom = atlas.trims[name]
+        # only the visible part of the sprite is drawn, the pivot stays where it was
+        return (
+            x + left * w, y + top * h, (right - left) * w, (bottom - top) * h,
+            *atlas.uvs[name], *tint, pivot[0] - left * w, pivot[1] - top * h, angle, self._atlas_index[id(atlas)],
+        )
+
+    def text(
+        self,
+        atlas: GlyphAtlas,
+        text: str,
+        pos: tuple,
+        height: float,
+        tint: tuple = WHITE,
+        align: float = 0.0,
+    ) -> list:
+        """Rows drawing `text` `height` pixels high from `pos`, shifted left by `align` times
+        its width (0: left aligned, 0.5: centered, 1: right aligned)."""
+        scale = height / atlas.line_height
+        x = pos[0] - atlas.text_width(text, height) * align
+        y = pos[1]
+        index = self._atlas_index[id(atlas)]
+        rows = []
+        for char in text:
+            size = atlas.sizes.get(char)
+            if size is None:
+                continue
+            w, h = size[0] * scale, size[1] * scale
+            left, top, right, bottom = atlas.trims[char]
+            if right > left:
+                rows.append((
+                    x + left * w, y + top * h, (right - left) * w, (bottom - top) * h,
+                    *atlas.uvs[char], *tint, 0.0, 0.0, 0.0, index,
+                ))
+            x += w
+        return rows
+
+    # --- drawing ---
+
+    def draw(self, rows, width: int, height: int):
+        """Draw `rows` (list of rows or a float32 array of INSTANCE_FLOATS columns) on a
+        `width` x `height` viewport in one instanced draw call."""
+        instances = rows if isinstance(rows, np.ndarray) else np.array(rows, dtype=np.float32)
+        count = len(instances)
+        if not count:
+            return
+        instances = np.ascontiguousarray(instances, dtype=np.float32)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        if count > self.capacity:
+            # grow by doubling so a growing grid reallocates only a few times
+            self.capacity = max(count, 2 * self.capacity, 64)
+            glBufferData(GL_ARRAY_BUFFER, self.capacity * INSTANCE_FLOATS * 4, None, GL_STREAM_DRAW)
+            get_gpu_resources().set_size(BUFFER, self.instance_vbo, self.capacity * INSTANCE_FLOATS * 4)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, instances.nbytes, instances)
+        get_gpu_resources().record_upload(instances.nbytes)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        try:
+            prev_prog = glGetIntegerv(GL_CURRENT_PROGRAM)
+        except Exception:
+            prev_prog = 0
+        glDisable(GL_DEPTH_TEST)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glViewport(0, 0, int(width), int(height))
+
+        glUseProgram(self.program)
+        glUniform2f(self.viewport_loc, float(width), float(height))
+        for unit in range(self.MAX_ATLASES):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            # a single atlas is bound to both units, the second one is then never weighted in
+            glBindTexture(GL_TEXTURE_2D, self.textures[min(unit, len(self.textures) - 1)])
+            glUniform1i(self.atlas_locs[unit], unit)
+        glActiveTexture(GL_TEXTURE0)
+        glBindVertexArray(self.vao)
+        glDrawArraysInstanced(GL_TRIANGLE_STRIP, 0, 4, count)
+        glBindVertexArray(0)
+
+        glDisable(GL_BLEND)
+        if prev_prog:
+            glUseProgram(int(prev_prog))
@@ -0,0 +1,30 @@
+"""Module to locate the per-user cache directory of the game."""
+
+import os
+import pathlib
+
+APP_NAME = "RockPaperScissors"
+
+
+def get_user_cache_dir(*subdirs: str) -> pathlib.Path:
+    """
+    Return (and create) the per-user cache directory, optionally a sub folder of it.
+
+    - Windows: %LOCALAPPDATA%/RockPaperScissors
+    - Others: $XDG_CACHE_HOME/RockPaperScissors (defaults to ~/.cache)
+
+    The RPS_CACHE_DIR environment variable overrides the location.
+    """
+    override = os.environ.get("RPS_CACHE_DIR")
+    if override:
+        base = pathlib.Path(override)
+    elif os.name == "nt":
+        base = pathlib.Path(os.environ.get("LOCALAPPDATA", pathlib.Path.home() / "AppData" / "Local")) / APP_NAME
+    else:
+        base = pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache")) / APP_NAME
+    path = base.joinpath(*subdirs)
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        pass
+    return path
@@ -0,0 +1,506 @@
+"""Module for the non-blocking match server clients (players and spectators) polled by the GUI every frame."""
+
+import abc
+import errno
+import json
+import os
+import pathlib
+import socket
+import time
+from typing import Callable, Optional
+
+from src.scripts.game_rules.game_rules import MOVES, round_winner, is_match_over
+from src.scripts.network.match_protocol.match_protocol import (
+    PROTOCOL_VERSION,
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    JOIN,
+    MATCH_START,
+    COMMIT,
+    OPPONENT_COMMIT,
+    REVEAL_REQUEST,
+    REVEAL,
+    ROUND_RESULT,
+    MATCH_ABORTED,
+    LEAVE,
+    ERROR,
+    WATCH,
+    SPECTATE_START,
+    SPECTATE_EVENT,
+    EVENT_COMMIT,
+    EVENT_REVEAL,
+    EVENT_ABORT,
+    ERROR_NO_MATCH,
+    BOTH_SEATS,
+    MOVE_CODES,
+    MOVE_NAMES,
+    FrameDecoder,
+    ProtocolError,
+    commit_digest,
+    encode,
+    new_nonce,
+)
+from src.scripts.network.matchmaking.matchmaking import DEFAULT_RATING, updated_rating
+
+
+def server_address() -> tuple[str, int]:
+    """Address of the match server: RPS_SERVER=host:port, localhost by default."""
+    value = os.environ.get("RPS_SERVER")
+    if not value:
+        return DEFAULT_HOST, DEFAULT_PORT
+    host, _, port = value.rpartition(":")
+    return (host or DEFAULT_HOST), int(port or DEFAULT_PORT)
+
+
+class RoundResult:
+    """Result of a round seen from the local player."""
+
+    __slots__ = ("round", "my_move", "opponent_move", "winner", "my_score", "opponent_score", "game_over")
+
+    def __init__(self, message: tuple, seat: int):
+        _, self.round, move1, move2, winner, score1, score2, game_over = message
+        moves, scores = (move1, move2), (score1, score2)
+        self.my_move = MOVE_NAMES[moves[seat]]
+        self.opponent_move = MOVE_NAMES[moves[1 - seat]]
+        # same convention as GameMenu.get_winner: 1 is the local player, 2 the opponent
+        self.winner = 0 if winner == 0 else (1 if winner - 1 == seat else 2)
+        self.my_score = scores[seat]
+        self.opponent_score = scores[1 - seat]
+        self.game_over = bool(game_over)
+
+
+class ServerConnection(abc.ABC):
+    """
+    Non-blocking connection to the match server.
+
+    `poll` is called once per frame and never waits: it sends what is pending, reads what
+    arrived and hands every message to `_handle`.
+    """
+
+    # States in which closing the connection tells the server we leave
+    ACTIVE_STATES = ("waiting", "playing")
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        default_host, default_port = server_address()
+        self.host = host if host is not None else default_host
+        self.port = port if port is not None else default_port
+        self.state = "closed"
+        self.error: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._decoder = FrameDecoder()
+        self._outgoing = bytearray()
+        self._connected = False
+
+    # --- connection ---
+
+    def connect(self):
+        """Start connecting (completes during the next polls)."""
+        self.close()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.setblocking(False)
+        code = self._sock.connect_ex((self.host, self.port))
+        if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", -1)):
+            self._fail(os.strerror(code))
+            return
+        self._connected = False
+        self._decoder = FrameDecoder()
+        self.error = None
+        self.state = "connecting"
+
+    def close(self):
+        """Close the connection (leaving the match)."""
+        if self._sock is not None:
+            if self._connected and self.state in self.ACTIVE_STATES:
+                try:
+                    self._sock.send(encode(LEAVE))
+                except OSError:
+                    pass
+            self._sock.close()
+            self._sock = None
+        self._outgoing.clear()
+        self._connected = False
+        self.state = "closed"
+
+    def _fail(self, message: str):
+        self.close()
+        self.error = message
+
+    # --- polling ---
+
+    def poll(self):
+        """Send pending frames and process what the server sent (never blocks)."""
+        if self._sock is None:
+            return
+        if not self._connected:
+            code = self._sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if code not in (0, errno.EINPROGRESS, errno.EALREADY):
+                self._fail(os.strerror(code))
+                return
+            try:
+                self._sock.getpeername()
+            except OSError:
+                return  # still connecting
+            self._connected = True
+            if self.state == "connecting":
+                self.state = "waiting"
+        self._flush()
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                self._fail(str(e))
+                return
+            if not data:
+                self._fail("connection closed by the server")
+                return
+            try:
+                messages = self._decoder.feed(data)
+            except ProtocolError as e:
+                self._fail(str(e))
+                return
+            for message in messages:
+                self._handle(message)
+        self._flush()
+
+    def _flush(self):
+        if not self._outgoing or self._sock is None or not self._connected:
+            return
+        try:
+            sent = self._sock.send(self._outgoing)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._fail(str(e))
+            return
+        del self._outgoing[:sent]
+
+    @abc.abstractmethod
+    def _handle(self, message: tuple):
+        """Handle one message decoded from the server."""
+
+
+class MatchClient(ServerConnection):
+    """
+    Client of the match server for one local player.
+
+    Reveals are answered automatically once both players committed.
+
+    States: "connecting", "waiting" (for an opponent), "playing", "over" (match ended
+    or aborted) and "closed".
+
+    The server pairs players of close ratings: the Elo rating of the player is sent when
+    joining, updated after every match and saved to `rating_file` when one is given.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, rating_file=None):
+        super().__init__(host, port)
+        self.rating_file = pathlib.Path(rating_file) if rating_file is not None else None
+        self.rating = self._load_rating()
+        # a match was left: the server may still send its messages (up to its MATCH_ABORTED)
+        self._leaving = False
+        self._reset_match()
+
+    def _reset_match(self):
+        self.match_id: Optional[int] = None
+        self.seat = 0
+        self.opponent_rating = DEFAULT_RATING
+        self.round = 0
+        self.opponent_committed = False
+        self.results: list[RoundResult] = []
+        self.aborted: Optional[tuple[int, int]] = None  # (loser seat, reason)
+        self._pending_move: Optional[int] = None
+        self._nonce = b""
+
+    # --- connection ---
+
+    def connect(self):
+        """Start connecting and join the queue (completes during the next polls)."""
+        super().connect()
+        if self._sock is not None:
+            self.join()
+
+    def join(self):
+        """Join the queue for a new match (also used to play again after a match)."""
+        self._reset_match()
+        if self.state != "connecting":
+            self.state = "waiting"
+        self._outgoing += encode(JOIN, PROTOCOL_VERSION, max(0, min(0xFFFF, self.rating)))
+
+    def leave(self):
+        """Leave the queue or forfeit the current match."""
+        self._outgoing += encode(LEAVE)
+        if self.state == "playing":
+            # the forfeit counts as a loss against this opponent (before the match is reset)
+            self._update_rating(False)
+            self._leaving = True
+        self._reset_match()
+        self.state = "over"
+
+    # --- rating ---
+
+    def _load_rating(self) -> int:
+        if self.rating_file is None:
+            return DEFAULT_RATING
+        try:
+            return int(json.loads(self.rating_file.read_text())["rating"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return DEFAULT_RATING
+
+    def _update_rating(self, won: bool):
+        self.rating = updated_rating(self.rating, self.opponent_rating, won)
+        if self.rating_file is not None:
+            try:
+                self.rating_file.write_text(json.dumps({"rating": self.rating}))
+            except OSError:
+                pass  # the rating is only a hint for the matchmaking
+
+    # --- moves ---
+
+    def submit_move(self, move: str):
+        """Commit to a move for the current round (the move itself is only sent when revealing)."""
+        if self.state != "playing" or self._pending_move is not None:
+            return
+        self._pending_move = MOVE_CODES[move]
+        self._nonce = new_nonce()
+        digest = commit_digest(self.match_id, self.round, self._pending_move, self._nonce)
+        self._outgoing += encode(COMMIT, self.round, digest)
+
+    def pop_result(self) -> Optional[RoundResult]:
+        """Return the oldest round result not yet consumed."""
+        return self.results.pop(0) if self.results else None
+
+    def _handle(self, message: tuple):
+        msg_type = message[0]
+        if self._leaving and msg_type in (OPPONENT_COMMIT, REVEAL_REQUEST, ROUND_RESULT, MATCH_ABORTED):
+            # the rest of the match left by leave(): it ends with its MATCH_ABORTED, or with
+            # its last round when that was played before the server got the LEAVE
+            if msg_type == MATCH_ABORTED or (msg_type == ROUND_RESULT and message[7]):
+                self._leaving = False
+            return
+        if msg_type == MATCH_START:
+            self._leaving = False
+            self._reset_match()
+            self.match_id, self.seat, self.opponent_rating = message[1], message[2], message[3]
+            self.state = "playing"
+        elif msg_type == OPPONENT_COMMIT:
+            self.opponent_committed = True
+        elif msg_type == REVEAL_REQUEST:
+            if self._pending_move is not None and message[1] == self.round:
+                self._outgoing += encode(REVEAL, self.round, self._pending_move, self._nonce)
+        elif msg_type == ROUND_RESULT:
+            result = RoundResult(message, self.seat)
+            self.results.append(result)
+            self.round = (message[1] + 1) & 0xFF
+            self.opponent_committed = False
+            self._pending_move = None
+            if result.game_over:
+                self.state = "over"
+                self._update_rating(result.my_score > result.opponent_score)
+        elif msg_type == MATCH_ABORTED:
+            self.aborted = (message[1], message[2])
+            self.state = "over"
+            if message[1] != BOTH_SEATS:
+                self._update_rating(message[1] != self.seat)
+        elif msg_type == ERROR:
+            self.error = f"server error {message[1]}"
+
+
+class SpectatorClient(ServerConnection):
+    """
+    Read-only client following a live match.
+
+    The server sends a snapshot of the match, then only its changes: the scores and the
+    results are rebuilt here from the revealed moves. Results are seen from the first
+    seat (player 1 is the "my" side of a RoundResult).
+
+    States: "connecting", "waiting" (for the snapshot), "watching", "over" (match ended,
+    aborted or no match to watch) and "closed".
+    """
+
+    ACTIVE_STATES = ("waiting", "watching")
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        super().__init__(host, port)
+        self._reset_match()
+
+    def _reset_match(self):
+        self.match_id: Optional[int] = None
+        self.round = 0
+        self.scores = [0, 0]
+        self.committed = [False, False]
+        self.ratings = (DEFAULT_RATING, DEFAULT_RATING)
+        self.results: list[RoundResult] = []
+        self.aborted: Optional[tuple[int, int]] = None  # (loser seat, reason)
+        self.no_match = False
+
+    def connect(self, match_id: int = 0):
+        """Start connecting and watch `match_id` (0: the latest started match)."""
+        super().connect()
+        if self._sock is not None:
+            self.watch(match_id)
+
+    def watch(self, match_id: int = 0):
+        """Watch another match (also used once the watched match is over)."""
+        if self.state == "watching":
+            self._outgoing += encode(LEAVE)
+        self._reset_match()
+        if self.state != "connecting":
+            self.state = "waiting"
+        self._outgoing += encode(WATCH, match_id)
+
+    def pop_result(self) -> Optional[RoundResult]:
+        """Return the oldest round result not yet consumed."""
+        return self.results.pop(0) if self.results else None
+
+    def _handle(self, message: tuple):
+        msg_type = message[0]
+        if msg_type == SPECTATE_START:
+            _, self.match_id, self.round, score1, score2, commits, rating1, rating2 = message
+            self.scores = [score1, score2]
+            self.committed = [bool(commits & 1), bool(commits & 2)]
+            self.ratings = (rating1, rating2)
+            self.state = "watching"
+        elif msg_type == SPECTATE_EVENT:
+            _, match_id, event, round_index, a, b = message
+            if match_id != self.match_id:
+                return  # late event of a match we stopped watching
+            if event == EVENT_COMMIT:
+                self.committed[a] = True
+            elif event == EVENT_REVEAL:
+                winner = round_winner(MOVES[a], MOVES[b])
+                if winner:
+                    self.scores[winner - 1] += 1
+                game_over = is_match_over(self.scores)
+                self.results.append(RoundResult(
+                    (ROUND_RESULT, round_index, a, b, winner, self.scores[0], self.scores[1], game_over), 0
+                ))
+                self.round = (round_index + 1) & 0xFF
+                self.committed = [False, False]
+                if game_over:
+                    self.state = "over"
+            elif event == EVENT_ABORT:
+                self.aborted = (a, b)
+                self.state = "over"
+        elif msg_type == ERROR:
+            if message[1] == ERROR_NO_MATCH:
+                self.no_match = True
+                self.state = "over"
+            else:
+                self.error = f"server error {message[1]}"
+
+
+class WatchedMatch:
+    """State of one match followed by a MultiSpectatorClient, rebuilt from the deltas."""
+
+    __slots__ = ("match_id", "round", "scores", "committed", "ratings", "moves", "revealed_at", "aborted", "ended_at", "version")
+
+    def __init__(self, message: tuple):
+        _, self.match_id, self.round, score1, score2, commits, rating1, rating2 = message
+        self.scores = [score1, score2]
+        self.committed = [bool(commits & 1), bool(commits & 2)]
+        self.ratings = (rating1, rating2)
+        self.moves: Optional[tuple[str, str]] = None  # moves of the last revealed round
+        self.revealed_at: Optional[float] = None
+        self.aborted: Optional[tuple[int, int]] = None  # (loser seat, reason)
+        self.ended_at: Optional[float] = None
+        # bumped on every change so the views only re-layout what changed
+        self.version = 0
+
+    def winner(self) -> int:
+        """Seat + 1 of the winner of the match, 0 while it is not decided."""
+        if self.aborted is not None:
+            loser = self.aborted[0]
+            return 0 if loser == BOTH_SEATS else 2 - loser
+        if is_match_over(self.scores):
+            return 1 if self.scores[0] > self.scores[1] else 2
+        return 0
+
+    def apply(self, event: int, round_index: int, a: int, b: int, now: float):
+        """Apply a SPECTATE_EVENT of this match."""
+        if event == EVENT_COMMIT:
+            self.committed[a] = True
+        elif event == EVENT_REVEAL:
+            self.moves = (MOVES[a], MOVES[b])
+            winner = round_winner(*self.moves)
+            if winner:
+                self.scores[winner - 1] += 1
+            self.revealed_at = now
+            self.round = (round_index + 1) & 0xFF
+            self.committed = [False, False]
+            if is_match_over(self.scores):
+                self.ended_at = now
+        elif event == EVENT_ABORT:
+            self.aborted = (a, b)
+            self.ended_at = now
+        self.version += 1
+
+
+class MultiSpectatorClient(ServerConnection):
+    """
+    Read-only client following up to `slots` live matches on one connection.
+
+    Every empty slot asks the server for the latest match not watched yet (WATCH 0); a
+    match that ended stays in its slot for HOLD_SECONDS so its result can be seen, then
+    the slot watches another one. When no match is left, empty slots ask again every
+    RETRY_SECONDS.
+
+    States: "connecting", "watching" and "closed".
+    """
+
+    ACTIVE_STATES = ("watching",)
+    HOLD_SECONDS = 4.0
+    RETRY_SECONDS = 1.0
+
+    def __init__(self, slots: int, host: Optional[str] = None, port: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        super().__init__(host, port)
+        self.clock = clock
+        self.slots: list[Optional[WatchedMatch]] = [None] * slots
+        self._reset_slots()
+
+    def _reset_slots(self):
+        self.slots = [None] * len(self.slots)
+        self._by_id: dict[int, WatchedMatch] = {}
+        # slots waiting for the answer to their WATCH, answers come in the same order
+        self._requested: list[int] = []
+        self._retry_at = [0.0] * len(self.slots)
+
+    def connect(self):
+        """Start connecting (the slots are filled during the next polls)."""
+        super().connect()
+        self._reset_slots()
+
+    def poll(self):
+        """Process what the server sent, then give a match to the slots that need one."""
+        super().poll()
+        if not self._connected:
+            return
+        self.state = "watching"
+        now = self.clock()
+        for index, match in enumerate(self.slots):
+            if match is not None and match.ended_at is not None and now - match.ended_at >= self.HOLD_SECONDS:
+                self._by_id.pop(match.match_id, None)
+                self.slots[index] = match = None
+            if match is None and index not in self._requested and now >= self._retry_at[index]:
+                self._requested.append(index)
+                self._outgoing += encode(WATCH, 0)
+        self._flush()
+
+    def _handle(self, message: tuple):
+        msg_type = message[0]
+        if msg_type == SPECTATE_START:
+            if self._requested:
+                match = WatchedMatch(message)
+                self.slots[self._requested.pop(0)] = match
+                self._by_id[match.match_id] = match
+        elif msg_type == SPECTATE_EVENT:
+            match = self._by_id.get(message[1])
+            if match is not None:
+                match.apply(message[2], message[3], message[4], message[5], self.clock())
+        elif msg_type == ERROR:
+            if message[1] == ERROR_NO_MATCH and self._requested:
+                self._retry_at[self._requested.pop(0)] = self.clock() + self.RETRY_SECONDS
+            else:
+                self.error = f"server error {message[1]}"
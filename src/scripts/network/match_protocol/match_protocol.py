@@ -0,0 +1,138 @@
+"""Module describing the binary protocol spoken between the match server and its clients.
+
+Every message is one type byte followed by a fixed-size payload (network byte order),
+so frames need no length prefix and most of them fit in a few bytes:
+
+    JOIN            c -> s  version, rating              join the matchmaking queue
+    MATCH_START     s -> c  match id, seat (0 or 1), opponent rating
+    COMMIT          c -> s  round, sha256 commitment      move chosen, still hidden
+    OPPONENT_COMMIT s -> c  round                         the opponent locked in a move
+    REVEAL_REQUEST  s -> c  round                         both committed, reveal the moves
+    REVEAL          c -> s  round, move, nonce            move and nonce of the commitment
+    ROUND_RESULT    s -> c  round, moves, winner, scores, game over
+    MATCH_ABORTED   s -> c  seat of the loser, reason     left, ran out of time or cheated
+    LEAVE           c -> s                                leave the queue, the match or stop watching
+    ERROR           s -> c  code
+    WATCH           c -> s  match id (0: latest not watched) spectate a live match
+    SPECTATE_START  s -> c  match id, round, scores, commits, ratings   snapshot of the match
+    SPECTATE_EVENT  s -> c  match id, event, round, a, b  delta of a watched match
+
+Rounds are numbered modulo 256 on the wire.
+Spectators receive one snapshot, then only the changes (a commit, the two revealed
+moves, an abort): scores and winners are recomputed on their side.
+Moves are committed before anything is revealed: a client only learns the opponent's
+move once both moves are locked in, and a reveal that does not match its commitment
+loses the match.
+"""
+
+import hashlib
+import os
+import struct
+
+PROTOCOL_VERSION = 2
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5050
+
+# Message types
+JOIN = 1
+MATCH_START = 2
+COMMIT = 3
+OPPONENT_COMMIT = 4
+REVEAL_REQUEST = 5
+REVEAL = 6
+ROUND_RESULT = 7
+MATCH_ABORTED = 8
+LEAVE = 9
+ERROR = 10
+WATCH = 11
+SPECTATE_START = 12
+SPECTATE_EVENT = 13
+
+# Events of SPECTATE_EVENT: (a, b) = (seat, 0), (move 1, move 2) or (loser seat, reason)
+EVENT_COMMIT = 0
+EVENT_REVEAL = 1
+EVENT_ABORT = 2
+
+# Reasons of MATCH_ABORTED
+ABORT_LEFT = 0
+ABORT_TIMEOUT = 1
+ABORT_BAD_REVEAL = 2
+# Loser seat of MATCH_ABORTED when both players ran out of time
+BOTH_SEATS = 2
+
+# Codes of ERROR
+ERROR_VERSION = 1
+ERROR_UNEXPECTED = 2
+ERROR_NO_MATCH = 3
+
+NONCE_SIZE = 16
+DIGEST_SIZE = 32
+
+# Moves on the wire, same order as game_rules.MOVES
+MOVE_CODES = {"rock": 0, "paper": 1, "scissors": 2}
+MOVE_NAMES = {code: move for move, code in MOVE_CODES.items()}
+
+# type -> struct of the whole frame (type byte included)
+_FRAMES = {
+    JOIN: struct.Struct("!BBH"),
+    MATCH_START: struct.Struct("!BIBH"),
+    COMMIT: struct.Struct(f"!BB{DIGEST_SIZE}s"),
+    OPPONENT_COMMIT: struct.Struct("!BB"),
+    REVEAL_REQUEST: struct.Struct("!BB"),
+    REVEAL: struct.Struct(f"!BBB{NONCE_SIZE}s"),
+    ROUND_RESULT: struct.Struct("!BBBBBBBB"),
+    MATCH_ABORTED: struct.Struct("!BBB"),
+    LEAVE: struct.Struct("!B"),
+    ERROR: struct.Struct("!BB"),
+    WATCH: struct.Struct("!BI"),
+    SPECTATE_START: struct.Struct("!BIBBBBHH"),
+    SPECTATE_EVENT: struct.Struct("!BIBBBB"),
+}
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends bytes that are not a valid frame."""
+
+
+def encode(msg_type: int, *fields) -> bytes:
+    """Encode a message of type `msg_type` with its payload fields."""
+    return _FRAMES[msg_type].pack(msg_type, *fields)
+
+
+class FrameDecoder:
+    """Incremental decoder turning received bytes into (type, fields) messages."""
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple]:
+        """Add received bytes and return the complete messages (type first, then the fields)."""
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            frame = _FRAMES.get(buffer[pos])
+            if frame is None:
+                raise ProtocolError(f"unknown message type {buffer[pos]}")
+            if end - pos < frame.size:
+                break
+            messages.append(frame.unpack_from(buffer, pos))
+            pos += frame.size
+        if pos:
+            del buffer[:pos]
+        return messages
+
+
+def new_nonce() -> bytes:
+    """Random nonce hiding a committed move."""
+    return os.urandom(NONCE_SIZE)
+
+
+def commit_digest(match_id: int, round_index: int, move_code: int, nonce: bytes) -> bytes:
+    """Commitment to a move: bound to the match and the round so it cannot be replayed."""
+    return hashlib.sha256(struct.pack("!IBB", match_id, round_index, move_code) + nonce).digest()
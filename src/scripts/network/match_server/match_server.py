@@ -0,0 +1,407 @@
+"""Module for the asyncio match server owning the authoritative state of every online match.
+
+Usage (from the root folder of the project):
+    py -m src.scripts.network.match_server.match_server [--host HOST] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import hmac
+import itertools
+import socket
+from typing import Optional
+
+from src.scripts.game_rules.game_rules import MOVES, round_winner, is_match_over
+from src.scripts.network.matchmaking.matchmaking import Matchmaker, DEFAULT_RATING
+from src.scripts.network.match_protocol.match_protocol import (
+    PROTOCOL_VERSION,
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    JOIN,
+    MATCH_START,
+    COMMIT,
+    OPPONENT_COMMIT,
+    REVEAL_REQUEST,
+    REVEAL,
+    ROUND_RESULT,
+    MATCH_ABORTED,
+    LEAVE,
+    ERROR,
+    WATCH,
+    SPECTATE_START,
+    SPECTATE_EVENT,
+    EVENT_COMMIT,
+    EVENT_REVEAL,
+    EVENT_ABORT,
+    ABORT_LEFT,
+    ABORT_TIMEOUT,
+    ABORT_BAD_REVEAL,
+    ERROR_VERSION,
+    ERROR_UNEXPECTED,
+    ERROR_NO_MATCH,
+    BOTH_SEATS,
+    FrameDecoder,
+    ProtocolError,
+    commit_digest,
+    encode,
+)
+
+# Seconds between two matchmaking passes widening the search windows
+MATCHMAKING_TICK = 0.1
+# Bytes a spectator may leave unread before being dropped
+SPECTATOR_BUFFER_LIMIT = 64 * 1024
+
+
+class Match:
+    """Authoritative state of a match between two connections."""
+
+    __slots__ = ("server", "match_id", "players", "round", "commits", "reveals", "scores", "timer", "spectators")
+
+    def __init__(self, server: "MatchServer", match_id: int, first: "MatchConnection", second: "MatchConnection"):
+        self.server = server
+        self.match_id = match_id
+        self.players = (first, second)
+        self.round = 0
+        self.commits: list[Optional[bytes]] = [None, None]
+        self.reveals: list[Optional[int]] = [None, None]
+        self.scores = [0, 0]
+        self.timer = None
+        self.spectators: set["MatchConnection"] = set()
+
+    def start(self):
+        for seat, player in enumerate(self.players):
+            player.match = self
+            player.seat = seat
+            player.send(encode(MATCH_START, self.match_id, seat, self.players[1 - seat].rating))
+        self._arm_timer()
+
+    def _arm_timer(self):
+        # one timer per match: a player who never answers loses instead of stalling the match
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.server.move_timeout is not None:
+            self.timer = self.server.loop.call_later(self.server.move_timeout, self._on_timeout)
+
+    def _on_timeout(self):
+        self.timer = None
+        waiting = self.commits if None in self.commits else self.reveals
+        late = [seat for seat in (0, 1) if waiting[seat] is None]
+        self.abort(late[0] if len(late) == 1 else BOTH_SEATS, ABORT_TIMEOUT)
+
+    def _broadcast(self, frame: bytes):
+        for player in self.players:
+            player.send(frame)
+
+    def add_spectator(self, spectator: "MatchConnection"):
+        """Send the current state of the match to `spectator`, then every change of it."""
+        commits = (self.commits[0] is not None) | (self.commits[1] is not None) << 1
+        spectator.send(encode(
+            SPECTATE_START, self.match_id, self.round, self.scores[0], self.scores[1], commits,
+            self.players[0].rating, self.players[1].rating,
+        ))
+        self.spectators.add(spectator)
+        spectator.watching.add(self)
+        self.server.spectators += 1
+
+    def remove_spectator(self, spectator: "MatchConnection"):
+        if spectator in self.spectators:
+            self.spectators.remove(spectator)
+            spectator.watching.discard(self)
+            self.server.spectators -= 1
+
+    def _publish(self, event: int, a: int = 0, b: int = 0):
+        """Fan a change of the match out to its spectators, dropping those who fall behind."""
+        if not self.spectators:
+            return
+        # encoded once whatever the number of spectators
+        frame = encode(SPECTATE_EVENT, self.match_id, event, self.round, a, b)
+        slow = [spectator for spectator in self.spectators if not spectator.push(frame)]
+        for spectator in slow:
+            spectator.drop()
+
+    def on_commit(self, seat: int, round_index: int, digest: bytes):
+        if round_index != self.round or self.commits[seat] is not None:
+            self.players[seat].send(encode(ERROR, ERROR_UNEXPECTED))
+            return
+        self.commits[seat] = digest
+        self.players[1 - seat].send(encode(OPPONENT_COMMIT, round_index))
+        self._publish(EVENT_COMMIT, seat)
+        if self.commits[1 - seat] is not None:
+            self._broadcast(encode(REVEAL_REQUEST, round_index))
+
+    def on_reveal(self, seat: int, round_index: int, move_code: int, nonce: bytes):
+        if round_index != self.round or None in self.commits or self.reveals[seat] is not None:
+            self.players[seat].send(encode(ERROR, ERROR_UNEXPECTED))
+            return
+        expected = commit_digest(self.match_id, round_index, move_code, nonce)
+        if move_code >= len(MOVES) or not hmac.compare_digest(expected, self.commits[seat]):
+            # the move does not match the commitment: the player cheated (or is broken)
+            self.abort(seat, ABORT_BAD_REVEAL)
+            return
+        self.reveals[seat] = move_code
+        if self.reveals[1 - seat] is not None:
+            self._resolve_round()
+
+    def _resolve_round(self):
+        move1, move2 = self.reveals
+        winner = round_winner(MOVES[move1], MOVES[move2])
+        if winner:
+            self.scores[winner - 1] += 1
+        game_over = is_match_over(self.scores)
+        self._broadcast(encode(
+            ROUND_RESULT, self.round, move1, move2, winner, self.scores[0], self.scores[1], game_over
+        ))
+        self._publish(EVENT_REVEAL, move1, move2)
+        self.server.rounds_played += 1
+        if game_over:
+            self._finish()
+            return
+        self.round = (self.round + 1) & 0xFF
+        self.commits = [None, None]
+        self.reveals = [None, None]
+        self._arm_timer()
+
+    def abort(self, loser_seat: int, reason: int):
+        """End the match early, `loser_seat` being the player who left, was too slow or cheated."""
+        self._broadcast(encode(MATCH_ABORTED, loser_seat, reason))
+        self._publish(EVENT_ABORT, loser_seat, reason)
+        self.server.matches_aborted += 1
+        self._finish()
+
+    def _finish(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        for player in self.players:
+            player.match = None
+        for spectator in tuple(self.spectators):
+            self.remove_spectator(spectator)
+        self.server.matches.pop(self.match_id, None)
+        self.server.matches_finished += 1
+
+
+class MatchConnection(asyncio.Protocol):
+    """One client connection of the match server."""
+
+    __slots__ = ("server", "transport", "decoder", "match", "seat", "queued", "rating", "watching")
+
+    def __init__(self, server: "MatchServer"):
+        self.server = server
+        self.transport = None
+        self.decoder = FrameDecoder()
+        self.match: Optional[Match] = None
+        self.seat = 0
+        self.queued = False
+        self.rating = DEFAULT_RATING
+        # matches this connection spectates
+        self.watching: set[Match] = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+
+    def send(self, frame: bytes):
+        if self.transport is not None:
+            self.transport.write(frame)
+
+    def push(self, frame: bytes) -> bool:
+        """Send a spectator frame unless too much is already waiting (returns False then)."""
+        if self.transport is None:
+            return True
+        if self.transport.get_write_buffer_size() > self.server.spectator_buffer:
+            return False
+        self.transport.write(frame)
+        return True
+
+    def _limit_send_buffer(self):
+        # the kernel buffer of a spectator is bounded too, so a stalled viewer shows up
+        # in the transport buffer (and gets dropped) instead of growing the socket buffer
+        sock = self.transport.get_extra_info("socket") if self.transport is not None else None
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.server.spectator_buffer)
+
+    def drop(self):
+        """Disconnect a spectator who does not keep up, without flushing what is pending."""
+        self.server.spectators_dropped += 1
+        # out of every match right away: connection_lost only comes at the next loop iteration
+        for match in tuple(self.watching):
+            match.remove_spectator(self)
+        if self.transport is not None:
+            self.transport.abort()
+
+    def data_received(self, data: bytes):
+        try:
+            messages = self.decoder.feed(data)
+        except ProtocolError:
+            self.transport.close()
+            return
+        for message in messages:
+            self._dispatch(message)
+
+    def _dispatch(self, message: tuple):
+        msg_type = message[0]
+        if msg_type == COMMIT and self.match is not None:
+            self.match.on_commit(self.seat, message[1], message[2])
+        elif msg_type == REVEAL and self.match is not None:
+            self.match.on_reveal(self.seat, message[1], message[2], message[3])
+        elif msg_type == JOIN:
+            if message[1] != PROTOCOL_VERSION:
+                self.send(encode(ERROR, ERROR_VERSION))
+                self.transport.close()
+            elif self.match is None and not self.queued:
+                self.rating = message[2]
+                self.server.enqueue(self)
+        elif msg_type == WATCH:
+            match = self.server.find_match(message[1], self.watching)
+            if match is None:
+                self.send(encode(ERROR, ERROR_NO_MATCH))
+            elif self not in match.spectators:
+                if not self.watching:
+                    self._limit_send_buffer()
+                match.add_spectator(self)
+        elif msg_type == LEAVE:
+            self._leave()
+        else:
+            self.send(encode(ERROR, ERROR_UNEXPECTED))
+
+    def _leave(self):
+        for match in tuple(self.watching):
+            match.remove_spectator(self)
+        if self.match is not None:
+            self.match.abort(self.seat, ABORT_LEFT)
+        elif self.queued:
+            self.server.dequeue(self)
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._leave()
+        self.server.connections -= 1
+
+
+class MatchServer:
+    """
+    Server pairing clients into matches and owning the state of every match.
+
+    Connections are plain asyncio protocols (no stream objects and no task per client)
+    and every message is a fixed-size frame, so a single core holds tens of thousands of
+    matches. Clients waiting for an opponent go through the Matchmaker, which pairs
+    players of close ratings and widens the accepted rating gap the longer they wait.
+
+    Spectators get a snapshot of the match they watch, then small delta frames encoded
+    once per change and written to every spectator. A spectator whose unsent data grows
+    beyond `spectator_buffer` is disconnected: slow viewers never slow a match down.
+
+    Args:
+        host: address to listen on
+        port: TCP port to listen on (0 picks a free port)
+        move_timeout: seconds a player has to commit or reveal a move (None: no limit)
+        spectator_buffer: bytes a spectator may leave unread before being dropped
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        move_timeout: Optional[float] = 60.0,
+        spectator_buffer: int = SPECTATOR_BUFFER_LIMIT,
+    ):
+        self.host = host
+        self.port = port
+        self.move_timeout = move_timeout
+        self.spectator_buffer = spectator_buffer
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.matchmaker = Matchmaker()
+        self._matchmaking_timer = None
+        self._match_ids = itertools.count(1)
+        self.matches: dict[int, Match] = {}
+        # statistics
+        self.connections = 0
+        self.matches_started = 0
+        self.matches_finished = 0
+        self.matches_aborted = 0
+        self.rounds_played = 0
+        self.spectators = 0
+        self.spectators_dropped = 0
+
+    async def start(self):
+        """Start listening (the actual port is available in `self.port` afterwards)."""
+        self.loop = asyncio.get_running_loop()
+        self._server = await self.loop.create_server(
+            lambda: MatchConnection(self), self.host, self.port, backlog=4096
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def enqueue(self, connection: MatchConnection):
+        """Add a client to the matchmaking queue and start a match if an opponent is found."""
+        connection.queued = True
+        pair = self.matchmaker.join(connection, connection.rating)
+        if pair is not None:
+            self.start_match(*pair)
+        elif self._matchmaking_timer is None:
+            self._matchmaking_timer = self.loop.call_later(MATCHMAKING_TICK, self._matchmaking_tick)
+
+    def dequeue(self, connection: MatchConnection):
+        """Remove a client from the matchmaking queue."""
+        connection.queued = False
+        self.matchmaker.leave(connection)
+
+    def _matchmaking_tick(self):
+        self._matchmaking_timer = None
+        for pair in self.matchmaker.tick():
+            self.start_match(*pair)
+        # only keep ticking while someone is waiting
+        if len(self.matchmaker):
+            self._matchmaking_timer = self.loop.call_later(MATCHMAKING_TICK, self._matchmaking_tick)
+
+    def find_match(self, match_id: int, exclude=()) -> Optional[Match]:
+        """Live match `match_id`, or for 0 the latest started one not in `exclude`."""
+        if match_id == 0:
+            # grid viewers send WATCH 0 once per tile to fill it with distinct matches
+            return next((match for match in reversed(self.matches.values()) if match not in exclude), None)
+        return self.matches.get(match_id)
+
+    def start_match(self, first: MatchConnection, second: MatchConnection) -> Match:
+        """Start a match between two connections."""
+        first.queued = second.queued = False
+        match = Match(self, next(self._match_ids) & 0xFFFFFFFF, first, second)
+        self.matches[match.match_id] = match
+        self.matches_started += 1
+        match.start()
+        return match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument("--move-timeout", type=float, default=60.0, help="seconds to choose a move (0: no limit)")
+    args = parser.parse_args()
+
+    server = MatchServer(args.host, args.port, args.move_timeout or None)
+
+    async def _serve():
+        await server.start()
+        print(f"Rock-Paper-Scissors match server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
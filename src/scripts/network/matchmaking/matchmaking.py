@@ -0,0 +1,168 @@
+"""Module pairing the players waiting for an online match by rating."""
+
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+DEFAULT_RATING = 1000
+# Width of the rating buckets
+BUCKET_SIZE = 50
+# Search window: +/- rating difference accepted right after joining, widened over time
+BASE_WINDOW = 50
+MAX_WINDOW = 600
+# Rating points added to the window per second of waiting
+WIDEN_RATE = 50.0
+
+# Elo factor used to update the ratings after a match
+ELO_K = 32
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """Probability of winning against `opponent_rating` according to the Elo model."""
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+def updated_rating(rating: float, opponent_rating: float, won: bool) -> int:
+    """New Elo rating after a match."""
+    return round(rating + ELO_K * ((1.0 if won else 0.0) - expected_score(rating, opponent_rating)))
+
+
+class Ticket:
+    """A player waiting in the queue."""
+
+    __slots__ = ("player", "rating", "bucket", "joined_at", "window", "active")
+
+    def __init__(self, player: Hashable, rating: int, joined_at: float):
+        self.player = player
+        self.rating = rating
+        self.bucket = rating // BUCKET_SIZE
+        self.joined_at = joined_at
+        self.window = BASE_WINDOW
+        self.active = True
+
+
+class Matchmaker:
+    """
+    Rating-bucketed queue of the players waiting for an opponent.
+
+    - Waiting players live in buckets of BUCKET_SIZE rating points, each an OrderedDict
+      kept in arrival order, so joining and leaving are O(1) dict operations.
+    - A search only looks at the buckets covered by the player's window, nearest first,
+      and takes the oldest player of a bucket whose rating gap both windows accept, so
+      whether two players are paired does not depend on which of them searches. A bucket
+      is in arrival order, so the windows only narrow along it: the scan stops at the
+      first window too narrow to reach the searching player.
+    - Windows widen over time: every waiting player has an entry in a heap ordered by
+      the time of its next widening (O(log n) push/pop). Leaving does not search the
+      heap, the stale entry is skipped when it comes out (lazy deletion).
+
+    The matchmaker does no I/O: `join` and `tick` return the pairs to start.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets: dict[int, OrderedDict] = {}
+        self._tickets: dict[Hashable, Ticket] = {}
+        self._widen_heap: list = []
+        self._counter = itertools.count()
+        # seconds between two widenings of one bucket width
+        self.widen_interval = BUCKET_SIZE / WIDEN_RATE
+        # statistics
+        self.pairs_made = 0
+        self.total_wait = 0.0
+        self.total_rating_gap = 0
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def __contains__(self, player):
+        return player in self._tickets
+
+    def join(self, player: Hashable, rating: int = DEFAULT_RATING) -> Optional[tuple]:
+        """
+        Add a player to the queue.
+
+        Returns:
+            (player, opponent) if an opponent was found right away, None otherwise.
+        """
+        if player in self._tickets:
+            return None
+        now = self.clock()
+        ticket = Ticket(player, max(0, int(rating)), now)
+        opponent = self._find_opponent(ticket)
+        if opponent is not None:
+            self._remove(opponent)
+            return self._paired(ticket, opponent, now)
+        self._tickets[player] = ticket
+        self._buckets.setdefault(ticket.bucket, OrderedDict())[player] = ticket
+        heapq.heappush(self._widen_heap, (now + self.widen_interval, next(self._counter), ticket))
+        return None
+
+    def leave(self, player: Hashable) -> bool:
+        """Remove a player from the queue (returns whether they were waiting)."""
+        ticket = self._tickets.get(player)
+        if ticket is None:
+            return False
+        self._remove(ticket)
+        return True
+
+    def tick(self, now: Optional[float] = None) -> list[tuple]:
+        """Widen the windows that are due and return the pairs found."""
+        now = self.clock() if now is None else now
+        pairs = []
+        heap = self._widen_heap
+        while heap and heap[0][0] <= now:
+            due, _, ticket = heapq.heappop(heap)
+            if not ticket.active:
+                continue  # left or paired since: lazy deletion
+            ticket.window = min(MAX_WINDOW, ticket.window + BUCKET_SIZE)
+            opponent = self._find_opponent(ticket)
+            if opponent is not None:
+                self._remove(ticket)
+                self._remove(opponent)
+                pairs.append(self._paired(opponent, ticket, now))
+                continue
+            if ticket.window < MAX_WINDOW:
+                heapq.heappush(heap, (due + self.widen_interval, next(self._counter), ticket))
+        return pairs
+
+    def _find_opponent(self, ticket: Ticket) -> Optional[Ticket]:
+        """Oldest waiting player in the nearest bucket whose rating gap with `ticket` both windows accept."""
+        span = ticket.window // BUCKET_SIZE + 1
+        for distance in range(span + 1):
+            # smallest rating gap between `ticket` and a player of a bucket at this distance
+            nearest = max(0, (distance - 1) * BUCKET_SIZE + 1)
+            if nearest > ticket.window:
+                break
+            for bucket_index in ((ticket.bucket,) if distance == 0 else (ticket.bucket - distance, ticket.bucket + distance)):
+                bucket = self._buckets.get(bucket_index)
+                if not bucket:
+                    continue
+                for candidate in bucket.values():
+                    if candidate.window < nearest:
+                        break  # the players after it joined later, their windows are not wider
+                    if candidate is not ticket and abs(candidate.rating - ticket.rating) <= min(ticket.window, candidate.window):
+                        return candidate
+        return None
+
+    def _remove(self, ticket: Ticket):
+        ticket.active = False
+        del self._tickets[ticket.player]
+        del self._buckets[ticket.bucket][ticket.player]
+        self._drop_empty_bucket(ticket.bucket)
+
+    def _drop_empty_bucket(self, bucket_index: int):
+        if not self._buckets.get(bucket_index, True):
+            del self._buckets[bucket_index]
+
+    def _paired(self, first: Ticket, second: Ticket, now: float) -> tuple:
+        self.pairs_made += 1
+        self.total_wait += (now - first.joined_at) + (now - second.joined_at)
+        self.total_rating_gap += abs(first.rating - second.rating)
+        return first.player, second.player
+
+    def next_widening(self) -> Optional[float]:
+        """Time of the next widening (None when nobody is waiting)."""
+        return self._widen_heap[0][0] if self._widen_heap else None
@@ -0,0 +1,185 @@
+"""Module for a single timer thread driving every terminal animation and countdown."""
+
+import atexit
+import heapq
+import itertools
+import threading
+from time import monotonic
+from typing import Callable, Optional
+
+from src.scripts.tracing.tracing import get_tracer
+
+
+class ScheduledTask:
+    """
+    Handle of a repeating task run by the AnimationScheduler.
+
+    Args:
+        callback (Callable): Function called at every tick.
+        interval (float): Time between ticks in seconds.
+        duration (float): Time after which the task ends by itself (None: until cancelled).
+        on_done (Callable): Function called once when the task ends (or is cancelled).
+    """
+
+    def __init__(self, scheduler, callback: Callable, interval: float, duration: Optional[float], on_done: Optional[Callable]):
+        self._scheduler = scheduler
+        self.callback = callback
+        self.interval = interval
+        self.end_time = monotonic() + duration if duration is not None else None
+        self.on_done = on_done
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        """Whether the task is over."""
+        return self._done.is_set()
+
+    def cancel(self):
+        """Stop the task; its `on_done` still runs (on the scheduler thread)."""
+        self._scheduler._cancel(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the task is over (without polling).
+
+        From a callback running on the scheduler thread this cannot block (the task can only
+        end on that thread) and just returns whether the task is over.
+        """
+        if self._scheduler.in_scheduler_thread():
+            return self.done
+        return self._done.wait(timeout)
+
+    def _finish(self):
+        if self._done.is_set():
+            return
+        try:
+            if self.on_done is not None:
+                self.on_done()
+        finally:
+            self._done.set()
+
+
+class AnimationScheduler:
+    """
+    Scheduler running every active animation on one timer thread.
+
+    Tasks are kept in a heap ordered by their next tick, so any number of animations
+    costs a single thread which sleeps until the next tick is due. Shutdown is
+    deterministic: the thread is joined and every remaining task is finished.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def schedule(self, callback: Callable, interval: float, duration: Optional[float] = None,
+                 on_done: Optional[Callable] = None) -> ScheduledTask:
+        """
+        Call `callback` every `interval` seconds, for `duration` seconds (or until cancelled).
+
+        Returns:
+            ScheduledTask: Handle to cancel or wait for the task.
+        """
+        task = ScheduledTask(self, callback, interval, duration, on_done)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("The animation scheduler is shut down")
+            self._push(monotonic(), task)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rps-animations", daemon=True)
+                self._thread.start()
+        return task
+
+    def in_scheduler_thread(self) -> bool:
+        """Whether the caller runs on the timer thread (inside a task callback)."""
+        return self._thread is not None and self._thread is threading.current_thread()
+
+    def _push(self, due: float, task: ScheduledTask):
+        heapq.heappush(self._heap, (due, next(self._counter), task))
+        self._cond.notify()
+
+    def _cancel(self, task: ScheduledTask):
+        with self._cond:
+            if task.done or task.cancelled:
+                return
+            task.cancelled = True
+            # reschedule right away so the task finishes now, the old heap entry is skipped
+            self._push(0.0, task)
+
+    def _next_due_task(self):
+        """Wait for the next due task (None when shutting down)."""
+        with self._cond:
+            while not self._stopping:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, task = self._heap[0]
+                if task.done:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due - monotonic()
+                if delay > 0 and not task.cancelled:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return due, task
+            return None
+
+    def _run(self):
+        tracer = get_tracer()
+        while True:
+            item = self._next_due_task()
+            if item is None:
+                return
+            due, task = item
+            # callbacks run without holding the lock so they can schedule or cancel tasks
+            if task.cancelled or (task.end_time is not None and monotonic() >= task.end_time):
+                task._finish()
+                continue
+            try:
+                if tracer.enabled:
+                    # how late the tick runs shows the hitches of the animations
+                    with tracer.span(getattr(task.callback, "__qualname__", "animation tick"), "animation",
+                                     {"late_ms": (monotonic() - due) * 1000.0}):
+                        task.callback()
+                else:
+                    task.callback()
+            except Exception as e:
+                print(f"Animation callback failed: {e}")
+                task._finish()
+                continue
+            with self._cond:
+                if not task.cancelled:
+                    # next tick relative to the planned one so the animation does not drift,
+                    # but never in the past: after a stall it ticks once, without a burst to catch up
+                    self._push(max(due + task.interval, monotonic()), task)
+
+    def shutdown(self):
+        """Stop the timer thread and finish every remaining task."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+            remaining = [task for _, _, task in self._heap]
+            self._heap.clear()
+        if thread is not None and not self.in_scheduler_thread():
+            thread.join()
+        for task in remaining:
+            task._finish()
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> AnimationScheduler:
+    """Return the animation scheduler shared by the terminal version."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = AnimationScheduler()
+            atexit.register(_default_scheduler.shutdown)
+        return _default_scheduler
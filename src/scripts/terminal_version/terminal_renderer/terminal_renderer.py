@@ -0,0 +1,156 @@
+"""Module for a buffered terminal renderer only redrawing the lines that changed."""
+
+import re
+import shutil
+import sys
+
+CSI = "\033["
+# Home the cursor, clear the screen and the scrollback (no subprocess needed)
+CLEAR_SCREEN = f"{CSI}H{CSI}2J{CSI}3J"
+
+_ANSI_RE = re.compile(r"\033\[[0-9;?]*[A-Za-z]")
+
+
+def strip_ansi(text: str) -> str:
+    """The text of a string without its ANSI escape sequences."""
+    return _ANSI_RE.sub("", text)
+
+
+def visible_length(text: str) -> int:
+    """Length of a string once displayed (ANSI escape sequences excluded)."""
+    return len(_ANSI_RE.sub("", text))
+
+
+class TerminalScreen:
+    """
+    In-memory model of the terminal screen.
+
+    The game writes lines into the model and `render` (or `compose` for custom streams)
+    turns the difference with what is already displayed into a single buffer of ANSI
+    escape sequences, redrawing only the lines that changed. This keeps the traffic small
+    over slow SSH links: one write per frame and no full screen redraws.
+
+    Args:
+        stream: stream with write() and flush() used by `render` (defaults to sys.stdout)
+        size: fixed (columns, rows) of the terminal, queried from the terminal if None
+    """
+
+    def __init__(self, stream=None, size: tuple[int, int] = None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.size = size
+        self.lines: list[str] = []
+        # lines as currently displayed (row layout included), None if unknown
+        self._drawn = None
+        self._drawn_size = None
+
+    def _get_size(self) -> tuple[int, int]:
+        if self.size is not None:
+            return self.size
+        size = shutil.get_terminal_size((80, 24))
+        return max(1, size.columns), max(2, size.lines)
+
+    def clear(self):
+        """Clear the screen (the next frame starts with a pure escape sequence clear)."""
+        self.lines = []
+        self._drawn = None
+
+    def print(self, text: str = ""):
+        """Add one or more lines (split on newlines) at the bottom of the screen."""
+        self.lines.extend(str(text).split("\n"))
+
+    def set_line(self, index: int, text: str):
+        """Replace an existing line."""
+        self.lines[index] = text
+
+    def pop_lines(self, count: int = 1):
+        """Remove the last `count` lines."""
+        del self.lines[len(self.lines) - count:]
+
+    def _rows_of(self, line: str, columns: int) -> int:
+        # wrapped lines take several rows on the terminal
+        return max(1, -(-visible_length(line) // columns))
+
+    def _visible_lines(self, columns: int, rows: int) -> list[str]:
+        """The last lines fitting on the screen, keeping one row for the prompt/cursor."""
+        visible, used = [], 0
+        for line in reversed(self.lines):
+            used += self._rows_of(line, columns)
+            if used > rows - 1:
+                break
+            visible.append(line)
+        visible.reverse()
+        return visible
+
+    def compose(self, prompt: str = "") -> str:
+        """
+        Return the escape sequences updating the terminal to the current model, followed by
+        `prompt` on the row after the content (where the cursor is left).
+        """
+        columns, rows = self._get_size()
+        visible = self._visible_lines(columns, rows)
+        out = []
+        drawn = self._drawn
+        if drawn is None or self._drawn_size != (columns, rows):
+            out.append(CLEAR_SCREEN)
+            drawn = []
+
+        row = 0
+        relayout = False
+        for i, line in enumerate(visible):
+            line_rows = self._rows_of(line, columns)
+            if relayout:
+                # everything below was already cleared
+                out.append(f"{CSI}{row + 1};1H{line}")
+            elif i < len(drawn) and drawn[i] == line:
+                pass
+            elif i >= len(drawn) or self._rows_of(drawn[i], columns) != line_rows:
+                # the row layout changes from here: clear the rest of the screen and redraw it all
+                relayout = True
+                out.append(f"{CSI}{row + 1};1H{CSI}J{line}")
+            else:
+                # same rows as before: clear them and rewrite the line in place
+                for r in range(line_rows):
+                    out.append(f"{CSI}{row + r + 1};1H{CSI}2K")
+                out.append(f"{CSI}{row + 1};1H{line}")
+            row += line_rows
+
+        if not relayout and len(drawn) > len(visible):
+            out.append(f"{CSI}{row + 1};1H{CSI}J")
+        # leave the cursor on a clean row after the content
+        out.append(f"{CSI}{row + 1};1H{CSI}2K{prompt}")
+
+        self._drawn = list(visible)
+        self._drawn_size = (columns, rows)
+        return "".join(out)
+
+    def render(self, prompt: str = ""):
+        """Write the current frame to the stream with a single write call."""
+        self.stream.write(self.compose(prompt))
+        self.stream.flush()
+
+    def commit_input(self, text: str):
+        """
+        Record a line the terminal already displays by itself (prompt and echoed answer),
+        so it is not redrawn on the next frame.
+        """
+        self.lines.append(text)
+        if self._drawn is None:
+            return
+        columns, rows = self._drawn_size
+        drawn_rows = sum(self._rows_of(line, columns) for line in self._drawn)
+        if drawn_rows + self._rows_of(text, columns) > rows - 1:
+            # the echo scrolled the terminal, the layout on screen is no longer known
+            self._drawn = None
+        else:
+            self._drawn.append(text)
+
+    def input(self, prompt: str) -> str:
+        """Render the frame with the prompt in the same write, then read a line of input.
+
+        Returns:
+            The answer, stripped and lowercased.
+        """
+        self.render(prompt)
+        answer = input()
+        self.commit_input(prompt + answer)
+        return answer.strip().lower()
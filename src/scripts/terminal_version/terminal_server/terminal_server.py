@@ -0,0 +1,317 @@
+"""Module hosting terminal game sessions for many users over TCP (telnet/netcat style clients).
+
+Usage (from the root folder of the project):
+    py -m src.scripts.terminal_version.terminal_server.terminal_server [--host HOST] [--port PORT]
+
+Then connect with `telnet HOST PORT` or `nc HOST PORT`.
+"""
+
+import argparse
+import asyncio
+import contextlib
+from typing import Optional
+
+from src.scripts.terminal_version.terminal_session.terminal_session import (
+    TerminalSession,
+    SessionClosed,
+    choices,
+)
+from src.scripts.terminal_version.terminal_utils.terminal_utils import set_text_color
+
+DEFAULT_PORT = 2323
+# Remote terminals do not report their size, assume a classic terminal
+DEFAULT_SIZE = (80, 24)
+
+MOVE_PROMPT = f"{set_text_color(34, 'You')}: choose rock, paper, or scissors: "
+
+# Telnet commands: IAC (255) followed by a command, and an option for WILL/WONT/DO/DONT
+_IAC = 255
+_OPTION_COMMANDS = range(251, 255)
+
+
+def strip_telnet_commands(line: bytes) -> bytes:
+    """Remove the telnet negotiation bytes a telnet client sends along with its input."""
+    if _IAC not in line:
+        return line
+    out = bytearray()
+    i = 0
+    while i < len(line):
+        byte = line[i]
+        if byte != _IAC:
+            out.append(byte)
+            i += 1
+        elif i + 1 < len(line) and line[i + 1] == _IAC:
+            out.append(_IAC)  # escaped 255
+            i += 2
+        elif i + 1 < len(line) and line[i + 1] in _OPTION_COMMANDS:
+            i += 3
+        else:
+            i += 2
+    return bytes(out)
+
+
+class TelnetReader:
+    """Line reader dropping the telnet negotiation bytes (same readline as asyncio.StreamReader)."""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self.reader = reader
+
+    async def readline(self) -> bytes:
+        return strip_telnet_commands(await self.reader.readline())
+
+
+class PairedMatch:
+    """
+    Player vs player game between two connected users, each on their own terminal.
+
+    Both players choose at the same time (the opponent's move is only shown once both
+    answered), with the same rules, prompts and colours as the local game.
+    """
+
+    def __init__(self, first: TerminalSession, second: TerminalSession):
+        self.players = (first, second)
+        self.scores: list[int] = [0, 0]
+
+    def _print_all(self, text: str = ""):
+        for player in self.players:
+            player.screen.print(text)
+
+    async def _render_all(self):
+        await asyncio.gather(*(player.render() for player in self.players))
+
+    async def _ask(self, index: int) -> Optional[str]:
+        player = self.players[index]
+        try:
+            move = await player.read_move(MOVE_PROMPT)
+        except (SessionClosed, ConnectionError):
+            return "stop"
+        if move not in (None, "stop"):
+            player.screen.print("Waiting for your opponent...")
+            with contextlib.suppress(ConnectionError):
+                await player.render()
+        return move
+
+    async def _ask_both(self) -> Optional[list]:
+        """Read both moves at once; None if a player stopped or left."""
+        tasks = [asyncio.create_task(self._ask(i)) for i in range(2)]
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(task.result() == "stop" for task in done):
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                return None
+        return [task.result() for task in tasks]
+
+    def _print_scores(self):
+        for i, player in enumerate(self.players):
+            player.screen.print(
+                f"{set_text_color(93, 'Scores')}: {set_text_color(94, 'You')} {self.scores[i]} - {set_text_color(91, 'Opponent')} {self.scores[1 - i]}"
+            )
+
+    async def _end_round(self, winner: int):
+        self.scores[winner] += 1
+        self._print_scores()
+        await self._render_all()
+        countdown = self.players[0].countdown
+        await asyncio.gather(*(
+            player.play_countdown(
+                f"{set_text_color(94, 'You win!') if i == winner else set_text_color(91, 'Opponent wins!')}"
+                f" (Restarting in {countdown:g} seconds {{}})",
+                countdown,
+            )
+            for i, player in enumerate(self.players)
+        ))
+        for player in self.players:
+            player.screen.clear()
+        self._print_all("Type 'stop' to end the game at any time.\n")
+
+    async def run(self) -> list[int]:
+        """Play until a player reaches 3 points, stops or disconnects."""
+        for player in self.players:
+            player.screen.clear()
+        self._print_all(set_text_color(92, "An opponent joined the game!"))
+        self._print_all("Type 'stop' to end the game at any time.\n")
+        try:
+            while self.scores[0] < 3 and self.scores[1] < 3:
+                moves = await self._ask_both()
+                if moves is None:
+                    self._print_all("Game stopped.\n")
+                    break
+                for i, player in enumerate(self.players):
+                    player.screen.pop_lines()  # "Waiting for your opponent..."
+                    if moves[1 - i] is None:
+                        player.screen.print(f"{set_text_color(31, 'Opponent')} ran out of time.")
+                    else:
+                        player.screen.print(f"{set_text_color(31, 'Opponent')} chose {moves[1 - i]}.")
+                first, second = moves
+                if first == second:
+                    # also when both ran out of time
+                    self._print_all(set_text_color(33, "It's a tie!"))
+                    continue
+                if second is None or (first is not None and (choices.index(first) - choices.index(second)) % 3 == 1):
+                    await self._end_round(0)
+                else:
+                    await self._end_round(1)
+            else:
+                self._print_all(set_text_color(92, "Game over! Final scores:"))
+                for i, player in enumerate(self.players):
+                    player.screen.print(
+                        f"{set_text_color(94, 'You')}: {self.scores[i]} - {set_text_color(91, 'Opponent')}: {self.scores[1 - i]}"
+                    )
+                self._print_all()
+            for player in self.players:
+                with contextlib.suppress(ConnectionError):
+                    await player.render()
+        except ConnectionError:
+            # a player vanished while the screens were updated: tell the other one
+            for player in self.players:
+                player.screen.print("Your opponent left the game.\n")
+                with contextlib.suppress(ConnectionError):
+                    await player.render()
+        return self.scores
+
+
+class TerminalServer:
+    """
+    Server running every TCP connection as an independent terminal game session.
+
+    Players choosing "player" are paired with the next user doing the same; a match
+    between two connections is played by a PairedMatch. Everything runs in one asyncio
+    event loop.
+
+    Args:
+        host: address to listen on
+        port: TCP port to listen on
+        size: (columns, rows) assumed for the remote terminals
+        move_timeout: seconds a player has to choose a move (None: no limit)
+        countdown: duration of the countdown between two rounds in seconds
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, size: tuple[int, int] = DEFAULT_SIZE,
+                 move_timeout: Optional[float] = 60.0, countdown: float = 5.0):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.move_timeout = move_timeout
+        self.countdown = countdown
+        self._server: Optional[asyncio.AbstractServer] = None
+        # player waiting for an opponent, future receiving the opponent, future resolved once the match is over
+        # (False if the waiting player left without playing it)
+        self._waiting: Optional[tuple[TerminalSession, asyncio.Future, asyncio.Future]] = None
+        self.active_sessions = 0
+        self.total_sessions = 0
+
+    async def start(self):
+        """Start listening (the actual port is available in `self.port` afterwards)."""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.active_sessions += 1
+        self.total_sessions += 1
+        session = TerminalSession(
+            TelnetReader(reader), writer, size=self.size, move_timeout=self.move_timeout, countdown=self.countdown
+        )
+        try:
+            session.show_welcome()
+            await session.choose_mode()
+            session.screen.clear()
+            if session.playing_against_machine:
+                await session.play()
+            else:
+                await self._play_against_player(session)
+        except SessionClosed:
+            pass
+        except ConnectionError:
+            pass
+        finally:
+            self.active_sessions -= 1
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _play_against_player(self, session: TerminalSession):
+        if self._waiting is None:
+            await self._wait_for_opponent(session)
+            return
+        _, paired, match_over = self._waiting
+        self._waiting = None
+        # the match runs in the handler of the waiting player, once it stopped reading
+        paired.set_result(session)
+        if not await match_over:
+            # the waiting player left just as we were paired: wait for another one
+            await self._play_against_player(session)
+
+    async def _wait_for_opponent(self, session: TerminalSession):
+        loop = asyncio.get_running_loop()
+        paired, match_over = loop.create_future(), loop.create_future()
+        self._waiting = (session, paired, match_over)
+        session.screen.print("Waiting for another player... (type 'stop' to leave)")
+        try:
+            await session.render()
+            while True:
+                line = asyncio.ensure_future(session.reader.readline())
+                await asyncio.wait([line, paired], return_when=asyncio.FIRST_COMPLETED)
+                if not line.done():
+                    # nothing was typed: cancelling the read while it waits keeps the input buffered
+                    line.cancel()
+                    await asyncio.gather(line, return_exceptions=True)
+                else:
+                    # the line may complete in the same iteration as the pairing, handle it first
+                    data = line.result()
+                    if data:
+                        # the client echoed what was typed
+                        session.screen.commit_input(data.decode("utf-8", errors="replace").rstrip("\r\n"))
+                    if not data or data.strip().lower() == b"stop":
+                        session.screen.print("Game stopped.\n")
+                        with contextlib.suppress(ConnectionError):
+                            await session.render()
+                        return
+                if paired.done():
+                    await PairedMatch(session, paired.result()).run()
+                    match_over.set_result(True)
+                    return
+        finally:
+            if self._waiting is not None and self._waiting[0] is session:
+                self._waiting = None
+            if not match_over.done():
+                # no match was played: a player paired in the meantime goes back to waiting
+                match_over.set_result(False)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument("--move-timeout", type=float, default=60.0, help="seconds to choose a move (0: no limit)")
+    parser.add_argument("--countdown", type=float, default=5.0, help="countdown between rounds in seconds")
+    args = parser.parse_args()
+
+    server = TerminalServer(args.host, args.port, move_timeout=args.move_timeout or None, countdown=args.countdown)
+
+    async def _serve():
+        await server.start()
+        print(f"Rock-Paper-Scissors server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
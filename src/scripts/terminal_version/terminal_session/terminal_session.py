@@ -0,0 +1,297 @@
+"""Module for the asyncio Rock-Paper-Scissors terminal game session, over any pair of streams."""
+
+import asyncio
+import itertools
+import os
+import random
+import sys
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from src.scripts.terminal_version.terminal_renderer.terminal_renderer import TerminalScreen, strip_ansi
+from src.scripts.terminal_version.terminal_utils.terminal_utils import LOADING_STYLE1, set_text_color
+from src.scripts.tracing.tracing import get_tracer
+
+choices = ["rock", "paper", "scissors"]
+shortcut_choices = {"r": "rock", "p": "paper", "s": "scissors"}
+
+# Time between two frames of the countdown animations
+COUNTDOWN_INTERVAL = 0.2
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+welcome_file_path = os.path.join(script_dir, "..", "..", "..", "assets", "text", "welcome.txt")
+
+
+@lru_cache(maxsize=1)
+def _welcome_text() -> str:
+    """Welcome message (read once for every session of the process)."""
+    try:
+        with open(welcome_file_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return "Welcome to Rock-Paper-Scissors!"  # Fallback message
+
+
+class SessionClosed(Exception):
+    """Raised when the input stream of a session reaches its end."""
+
+
+class _StdoutWriter:
+    """Writer side of the local terminal (same interface as asyncio.StreamWriter)."""
+
+    def write(self, data: bytes):
+        # written through the text layer so the console encoding is respected
+        sys.stdout.write(data.decode("utf-8"))
+
+    async def drain(self):
+        sys.stdout.flush()
+
+
+def _feed_stdin(loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader):
+    """Read stdin line by line on a thread and hand the lines to the event loop."""
+    try:
+        while True:
+            line = sys.stdin.buffer.readline()
+            if not line:
+                break
+            loop.call_soon_threadsafe(reader.feed_data, line)
+    except (OSError, ValueError, RuntimeError):
+        # stdin closed or event loop already gone
+        pass
+    try:
+        loop.call_soon_threadsafe(reader.feed_eof)
+    except RuntimeError:
+        pass
+
+
+def open_stdio_streams() -> tuple[asyncio.StreamReader, _StdoutWriter]:
+    """
+    Return a (reader, writer) pair for the local terminal.
+
+    Lines typed on stdin are buffered in the reader as soon as they are entered, so a
+    read cancelled by a timeout never loses what the player typed.
+    Must be called from a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    threading.Thread(target=_feed_stdin, args=(loop, reader), name="rps-stdin", daemon=True).start()
+    return reader, _StdoutWriter()
+
+
+class TerminalSession:
+    """
+    One Rock-Paper-Scissors game played over a pair of streams.
+
+    The session only awaits its streams, so any number of them can run in one event loop
+    (local terminal, sockets, in-memory streams...).
+
+    Args:
+        reader: object with an `async readline()` returning bytes (e.g. asyncio.StreamReader)
+        writer: object with `write(bytes)` and `async drain()` (e.g. asyncio.StreamWriter)
+        size: fixed (columns, rows) of the remote terminal, queried from the local one if None
+        move_timeout: seconds a player has to choose a move (None: no limit)
+        countdown: duration of the countdown between two rounds in seconds
+        rng: random generator used for the computer moves
+    """
+
+    def __init__(self, reader, writer, size: Optional[tuple[int, int]] = None,
+                 move_timeout: Optional[float] = None, countdown: float = 5.0, rng: Optional[random.Random] = None):
+        self.reader = reader
+        self.writer = writer
+        self.move_timeout = move_timeout
+        self.countdown = countdown
+        self.rng = rng if rng is not None else random
+        self.screen = TerminalScreen(size=size)
+        self.scores: list[int] = [0, 0]
+        self.playing_against_machine = False
+        # sessions share the thread of their event loop: their spans are told apart by id
+        self.tracer = get_tracer()
+
+    # --- streams ---
+
+    async def _write(self, text: str):
+        self.writer.write(text.encode("utf-8"))
+        await self.writer.drain()
+
+    async def render(self, prompt: str = ""):
+        """Write the changed lines of the screen (and the prompt) to the writer."""
+        await self._write(self.screen.compose(prompt))
+
+    async def input(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Render the frame with the prompt and wait for a line of input.
+
+        Returns:
+            The answer, stripped and lowercased.
+
+        Raises:
+            SessionClosed: the input stream reached its end.
+            asyncio.TimeoutError: no answer within `timeout` seconds.
+        """
+        with self.tracer.async_span("prompt", "terminal", id(self), {"prompt": strip_ansi(prompt).strip()}):
+            await self.render(prompt)
+            try:
+                line = await asyncio.wait_for(self.reader.readline(), timeout)
+            except asyncio.TimeoutError:
+                # the prompt stays on screen, unanswered
+                self.screen.commit_input(prompt)
+                raise
+        if not line:
+            raise SessionClosed()
+        answer = line.decode("utf-8", errors="replace").rstrip("\r\n")
+        self.screen.commit_input(prompt + answer)
+        return answer.strip().lower()
+
+    async def play_countdown(self, template: str, duration: float):
+        """
+        Play an animation with the frame placeholder `{}` in `template` on the cursor row.
+
+        The countdown is a plain coroutine: cancelling the task running it stops it right
+        away and still clears its line.
+        """
+        frames = itertools.cycle(LOADING_STYLE1)
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + duration
+        with self.tracer.async_span("countdown", "terminal", id(self), {"seconds": duration}):
+            try:
+                while loop.time() < end_time:
+                    await self._write(f"\r{template.format(next(frames))}")
+                    await asyncio.sleep(min(COUNTDOWN_INTERVAL, max(0.0, end_time - loop.time())))
+            finally:
+                # Clear the line when done (or cancelled)
+                self.writer.write(("\r" + " " * len(template.format("...")) + "\r").encode("utf-8"))
+
+    # --- game ---
+
+    async def choose_mode(self):
+        """Ask whether to play against the computer or another player."""
+        while True:
+            player_input = await self.input(
+                "Do you want to play against the computer or another player? (machine/player): "
+            )
+            if player_input == "machine" or player_input == "m":
+                self.playing_against_machine = True
+                return
+            if player_input == "player" or player_input == "p":
+                self.playing_against_machine = False
+                return
+            self.screen.print("Invalid input. Please enter 'machine' or 'player'.")
+
+    async def read_move(self, prompt: str) -> Optional[str]:
+        """Ask a player for a move; None if they ran out of time, "stop" to end the game."""
+        try:
+            choice = await self.input(prompt, self.move_timeout)
+            if choice == "stop":
+                return choice
+            if choice in shortcut_choices:
+                choice = shortcut_choices[choice]
+            while choice not in choices:
+                # the retry prompt replaces the invalid answer
+                self.screen.pop_lines()
+                choice = await self.input("Invalid choice. Please try again: ", self.move_timeout)
+        except asyncio.TimeoutError:
+            return None
+        return choice
+
+    def _names(self) -> tuple[str, str]:
+        if self.playing_against_machine:
+            return "Player", "Computer"
+        return "First player", "Second player"
+
+    def _print_scores(self):
+        first, second = self._names()
+        self.screen.print(
+            f"{set_text_color(93, 'Scores')}: {set_text_color(94, first)} {self.scores[0]} - {set_text_color(91, second)} {self.scores[1]}"
+        )
+
+    async def _end_round(self, winner: int, message: str):
+        """Score the round, show the scores and play the countdown to the next round."""
+        self.scores[winner] += 1
+        self._print_scores()
+        await self.render()
+        color = 94 if winner == 0 else 91
+        await self.play_countdown(
+            f"{set_text_color(color, message)} (Restarting in {self.countdown:g} seconds {{}})", self.countdown
+        )
+        self.screen.clear()
+        self.screen.print("Type 'stop' to end the game at any time.\n")
+
+    async def play(self):
+        """Play rounds until a player reaches 3 points or types 'stop'."""
+        first_name, second_name = self._names()
+        self.screen.print("Type 'stop' to end the game at any time.\n")
+        while True:
+            if self.scores[0] == 3 or self.scores[1] == 3:
+                self.screen.print(set_text_color(92, "Game over! Final scores:"))
+                self.screen.print(
+                    f"{set_text_color(94, first_name)}: {self.scores[0]} - {set_text_color(91, second_name)}: {self.scores[1]}"
+                )
+                self.screen.print()
+                await self.render()
+                return
+            first_choice = await self.read_move(
+                f"{set_text_color(34, 'First player')}: choose rock, paper, or scissors: "
+            )
+            if first_choice == "stop":
+                break
+            if first_choice is None:
+                self.screen.print(f"{set_text_color(34, 'First player')} ran out of time.")
+                await self._end_round(1, "Computer wins!" if self.playing_against_machine else "Second player wins!")
+                continue
+            if self.playing_against_machine:
+                second_choice = self.rng.choice(choices)
+                self.screen.print(f'{set_text_color(31, "Computer")} chose {second_choice}.')
+            else:
+                # hide the first choice from the second player
+                self.screen.set_line(
+                    -1, f"{set_text_color(34, 'First player')}: choose rock, paper, or scissors: ********"
+                )
+                second_choice = await self.read_move(
+                    f"{set_text_color(31, 'Second player')}: choose rock, paper, or scissors: "
+                )
+                if second_choice == "stop":
+                    break
+                if second_choice is None:
+                    self.screen.print(f"{set_text_color(31, 'Second player')} ran out of time.")
+                    await self._end_round(0, "First player wins!")
+                    continue
+                self.screen.pop_lines(2)
+                self.screen.print(
+                    f"{set_text_color(34, 'First player')}: choose rock, paper, or scissors: {first_choice}"
+                )
+                self.screen.print(
+                    f"{set_text_color(31, 'Second player')}: choose rock, paper, or scissors: {second_choice}"
+                )
+            if first_choice == second_choice:
+                self.screen.print(set_text_color(33, "It's a tie!"))
+                continue
+            if (choices.index(first_choice) - choices.index(second_choice)) % 3 == 1:
+                await self._end_round(0, "You win!" if self.playing_against_machine else "First player wins!")
+            else:
+                await self._end_round(1, "Computer wins!" if self.playing_against_machine else "Second player wins!")
+        self.screen.print("Game stopped.\n")
+        await self.render()
+
+    def show_welcome(self):
+        """Start the screen with the welcome message."""
+        self.screen.clear()
+        self.screen.print(set_text_color(92, _welcome_text()))
+
+    async def run(self) -> list[int]:
+        """
+        Play the game until a player reaches 3 points, types 'stop' or the input ends.
+
+        Returns:
+            The final scores [first player, second player/computer].
+        """
+        self.show_welcome()
+        with self.tracer.async_span("session", "terminal", id(self)):
+            try:
+                await self.choose_mode()
+                self.screen.clear()
+                await self.play()
+            except SessionClosed:
+                self.screen.print("Game stopped.\n")
+                await self.render()
+        return self.scores
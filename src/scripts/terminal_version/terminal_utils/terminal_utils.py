@@ -3,8 +3,8 @@
 import itertools
 import os
 import sys
-import threading
-from time import sleep, time
+from src.scripts.terminal_version.animation_scheduler.animation_scheduler import get_scheduler
+from src.scripts.terminal_version.terminal_renderer.terminal_renderer import CLEAR_SCREEN
 
 LOADING_STYLE1 = [".  ", ".. ", "..."]
 LOADING_STYLE2 = ["|", "/", "-", "\\"]
@@ -13,9 +13,31 @@ def get_input(prompt: str) -> str:
     """Helper function to get user input."""
     return input(prompt).strip().lower()
 
+def enable_ansi():
+    """
+    Enables ANSI escape sequences on the Windows console.
+
+    Spawning `cls` used to enable them as a side effect; without the subprocess the
+    console has to be switched to virtual terminal processing explicitly.
+    """
+    if os.name != 'nt':
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        pass
+
+enable_ansi()
+
 def clear_cmd():
-    """Clears the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    """Clears the terminal screen with escape sequences (no subprocess)."""
+    sys.stdout.write(CLEAR_SCREEN)
+    sys.stdout.flush()
 
 def move_cursor_up(lines: int = 1):
     """
@@ -75,7 +97,10 @@ def set_text_color(color_code: int, string: str = "") -> str:
 class LoadingAnimation:
     """
     Class to handle loading animations in the terminal.
-    
+
+    Every animation is driven by the shared animation scheduler: any number of them
+    runs on a single timer thread.
+
     Args:
         frames (list[str]): List of strings representing animation frames.
         delay (float): Time between frame updates in seconds.
@@ -83,37 +108,39 @@ class LoadingAnimation:
     def __init__(self, frames, delay=0.1):
         self.frames = itertools.cycle(frames)
         self.delay = delay
-        self.running = False
         self.current_frame = next(self.frames)
-        self.thread = None
+        self.task = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the animation is currently playing."""
+        return self.task is not None and not self.task.done
 
     def _animate(self):
-        while self.running:
-            self.current_frame = next(self.frames)
-            sleep(self.delay)
+        self.current_frame = next(self.frames)
 
     def start(self):
         """
-        Starts the loading animation in a separate thread.
+        Starts the loading animation on the animation scheduler.
 
         Returns:
             LoadingAnimation: The instance of the loading animation.
         """
         if not self.running:
-            self.running = True
-            self.thread = threading.Thread(target=self._animate)
-            self.thread.start()
+            self.task = get_scheduler().schedule(self._animate, self.delay)
         return self
 
     def stop(self):
         """
-        Stops the loading animation and waits for the thread to finish.
+        Stops the loading animation (no frame is updated once this returns).
+
         Returns:
             LoadingAnimation: The instance of the loading animation.
         """
-        if self.running:
-            self.running = False
-            self.thread.join(timeout = 0.1)
+        if self.task is not None:
+            self.task.cancel()
+            self.task.wait()
+            self.task = None
         return self
 
     def __str__(self):
@@ -129,29 +156,40 @@ class SpinnerAnimation(LoadingAnimation):
     def __init__(self, delay=0.1):
         super().__init__(LOADING_STYLE2, delay)
 
-def print_animation(template: str, duration, update_interval=0.2, animation_frames=None):
+def print_animation(template: str, duration, update_interval=0.2, animation_frames=None, wait=True):
     """
-    Print a terminal animation using a provided f-string template for a certain duration.        
+    Print a terminal animation using a provided f-string template for a certain duration.
+
+    The animation runs on the animation scheduler thread: with `wait=False` the caller gets
+    the task back right away and can keep reading input while it plays.
+
     Args:
         template (str): Template string with a placeholder {} for the animation frame.
         duration (int): Duration to run the animation in seconds.
         update_interval (float): Time between frame updates in seconds.
         animation_frames (list[str]): List of animation frames to cycle through.
+        wait (bool): Block until the animation is over.
+
+    Returns:
+        ScheduledTask: The running animation (can be cancelled or waited for).
     """
     if animation_frames is None:
         animation_frames = LOADING_STYLE1
 
-    start_time = time()
     frame_cycle = itertools.cycle(animation_frames)
 
-    while time() - start_time < duration:
-        current_frame = next(frame_cycle)
+    def _draw_frame():
         # Use format() to replace {} placeholder with the current frame
-        output = template.format(current_frame)
+        output = template.format(next(frame_cycle))
         sys.stdout.write(f"\r{output}")
         sys.stdout.flush()
-        sleep(update_interval)
 
-    # Clear the line and print newline when done
-    sys.stdout.write("\r" + " " * len(template.format("...")) + "\r")
-    sys.stdout.flush()
+    def _clear():
+        # Clear the line when done
+        sys.stdout.write("\r" + " " * len(template.format("...")) + "\r")
+        sys.stdout.flush()
+
+    task = get_scheduler().schedule(_draw_frame, update_interval, duration, on_done=_clear)
+    if wait:
+        task.wait()
+    return task
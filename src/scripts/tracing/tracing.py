@@ -0,0 +1,196 @@
+"""Module recording spans of the game in a ring buffer and writing them as a Chrome trace (JSON)."""
+
+import atexit
+import itertools
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Optional
+
+# Events kept in the ring buffer: the oldest ones are overwritten past this count
+TRACE_CAPACITY = 1 << 16
+
+
+class _Span:
+    """Context manager recording a complete event ("X") from its enter to its exit."""
+
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name: str, category: str, args: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+class _AsyncSpan:
+    """Context manager recording an async begin/end pair ("b"/"e"), for coroutines sharing a thread."""
+
+    __slots__ = ("tracer", "name", "category", "id", "args")
+
+    def __init__(self, tracer, name: str, category: str, id_: int, args: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.id = id_
+        self.args = args
+
+    def __enter__(self):
+        self.tracer._record("b", self.name, self.category, time.perf_counter(), 0.0, self.id, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._record("e", self.name, self.category, time.perf_counter(), 0.0, self.id, None)
+        return False
+
+
+class _NullSpan:
+    """Span of a disabled tracer: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Class recording trace events for the Chrome trace viewer / Perfetto.
+
+    - Events are tuples written to a fixed ring buffer: a writer takes the next index from an
+      `itertools.count` (atomic under the GIL) and stores its tuple in that slot, so any
+      thread records without a lock and a long session keeps its last `capacity` events.
+    - `flush` writes the buffer as a JSON trace (https://ui.perfetto.dev or chrome://tracing),
+      it can be called any number of times (on a hotkey and on exit).
+    - A disabled tracer (no path) hands out a shared span doing nothing.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = TRACE_CAPACITY):
+        self.path = path
+        self.enabled = path is not None
+        self.capacity = capacity
+        self._events = [None] * capacity if self.enabled else []
+        self._next = itertools.count()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._thread_ids = itertools.count(1)
+        self._thread_names = {}
+
+    def _thread_id(self) -> int:
+        """Number of the calling thread in the trace (thread idents are reused once a thread ends)."""
+        try:
+            return self._local.tid
+        except AttributeError:
+            tid = self._local.tid = next(self._thread_ids)
+            # kept for the threads gone by the time of the flush (worker pools)
+            self._thread_names[tid] = threading.current_thread().name
+            return tid
+
+    def _record(self, phase: str, name: str, category: str, start: float, duration: float, id_, args):
+        self._events[next(self._next) % self.capacity] = (
+            phase, name, category, start, duration, self._thread_id(), id_, args
+        )
+
+    def span(self, name: str, category: str, args: Optional[dict] = None):
+        """Context manager recording `name` from its enter to its exit on the calling thread."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def async_span(self, name: str, category: str, id_: int, args: Optional[dict] = None):
+        """Like `span`, for code that awaits inside (spans of the same `id_` nest in the viewer)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _AsyncSpan(self, name, category, id_, args)
+
+    def complete(self, name: str, category: str, start: float, duration: float, args: Optional[dict] = None):
+        """Record a span already measured (`start` from time.perf_counter, `duration` in seconds)."""
+        if self.enabled:
+            self._record("X", name, category, start, duration, None, args)
+
+    def instant(self, name: str, category: str, args: Optional[dict] = None):
+        """Record an instant event (a marker without duration)."""
+        if self.enabled:
+            self._record("i", name, category, time.perf_counter(), 0.0, None, args)
+
+    def events(self) -> list:
+        """The events of the buffer in the Chrome trace format (oldest first)."""
+        # the index taken here is left empty, the slot keeps an event older than the window
+        end = next(self._next)
+        slots = list(self._events)
+        thread_names = dict(self._thread_names)
+        events = [{"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": "RockPaperScissors"}}]
+        seen_threads = set()
+        for index in range(max(0, end - self.capacity), end):
+            event = slots[index % self.capacity]
+            if event is None:
+                continue
+            phase, name, category, start, duration, tid, id_, args = event
+            seen_threads.add(tid)
+            entry = {
+                "name": name, "cat": category, "ph": phase, "pid": self._pid, "tid": tid,
+                "ts": (start - self._origin) * 1e6,
+            }
+            if phase == "X":
+                entry["dur"] = duration * 1e6
+            elif phase == "i":
+                entry["s"] = "t"
+            elif id_ is not None:
+                entry["id"] = id_
+            if args:
+                entry["args"] = args
+            events.append(entry)
+        for tid in seen_threads:
+            events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                           "args": {"name": thread_names.get(tid, f"thread {tid}")}})
+        return events
+
+    def flush(self, path: Optional[str] = None) -> Optional[pathlib.Path]:
+        """Write the buffer to `path` (the tracer's by default), returns the file written or None."""
+        path = path or self.path
+        if not self.enabled or path is None:
+            return None
+        path = pathlib.Path(path)
+        try:
+            data = json.dumps({"traceEvents": self.events(), "displayTimeUnit": "ms"}, default=str)
+            # write to a temporary file first so a viewer never opens a truncated trace
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError as e:
+            print(f"Warning: could not write the trace: {e}")
+            return None
+        return path
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the tracer shared by the whole game (enabled with RPS_TRACE=<path>, flushed on exit)."""
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer(os.environ.get("RPS_TRACE") or None)
+            if _default_tracer.enabled:
+                atexit.register(_default_tracer.flush)
+        return _default_tracer